@@ -9,6 +9,7 @@ from apscheduler.triggers.cron import CronTrigger
 
 import log
 from app.downloader import Downloader
+from app.downloader.torrent_rule import TorrentSnapshot, TorrentRule, Condition
 from app.filter import Filter
 from app.helper import DbHelper, RssHelper
 from app.media.meta import MetaInfo
@@ -312,6 +313,13 @@ class BrushTask(object):
                         f"删除规则：{_delete_type.value}"
             self.message.send_brushtask_remove_message(title=_msg_title, text=_msg_text)
 
+        def __match_torrents(_snapshot, _rules):
+            """
+            批量匹配删种规则，返回命中规则的种子及删种类型
+            """
+            return [(_snapshot.row(i), rule.result)
+                    for i, rule in enumerate(TorrentRule.first_match(_snapshot, _rules)) if rule]
+
         # 遍历所有任务
         for taskid, taskinfo in self._brush_tasks.items():
             if taskinfo.get("state") == 'N':
@@ -323,6 +331,7 @@ class BrushTask(object):
                 total_downloaded = 0
                 # 可以删种的种子
                 delete_ids = []
+                delete_id_set = set()
                 # 需要更新状态的种子
                 update_torrents = []
                 # 任务信息
@@ -344,6 +353,33 @@ class BrushTask(object):
                     continue
                 # 下载器的类型
                 downloader_type = downloader_cfg.get("type")
+                # 删种规则，完成的种子和下载中的种子分别匹配
+                complete_rules = self.__get_remove_rules(remove_rule)
+                downloading_rules = self.__get_remove_rules(remove_rule, downloading=True)
+
+                def __delete_torrent(_torrent_info, _delete_type):
+                    """
+                    记录需要删除的种子并发送消息
+                    """
+                    _torrent_id = _torrent_info.get("id")
+                    _uploaded = _torrent_info.get("uploaded")
+                    _downloaded = _torrent_info.get("downloaded")
+                    if sendmessage:
+                        __send_message(_task_name=task_name,
+                                       _delete_type=_delete_type,
+                                       _torrent_name=_torrent_info.get("name"),
+                                       _download_name=downloader_cfg.get("name"),
+                                       _torrent_size=StringUtils.str_filesize(_torrent_info.get("total_size")),
+                                       _download_size=StringUtils.str_filesize(_downloaded),
+                                       _upload_size=StringUtils.str_filesize(_uploaded),
+                                       _ratio=round(_torrent_info.get("ratio") or 0, 2),
+                                       _add_time=time.strftime('%Y-%m-%d %H:%M:%S',
+                                                               time.localtime(_torrent_info.get("add_time"))))
+                    if _torrent_id not in delete_id_set:
+                        delete_id_set.add(_torrent_id)
+                        delete_ids.append(_torrent_id)
+                        update_torrents.append(("%s,%s" % (_uploaded, _downloaded), taskid, _torrent_id))
+
                 # 查询下载器中下载完成的所有种子
                 torrents = self.downloader.get_completed_torrents(downloader_id=downloader_id,
                                                                   ids=torrent_ids)
@@ -352,71 +388,17 @@ class BrushTask(object):
                     log.warn("【Brush】任务 %s 获取下载完成种子失败" % task_name)
                     continue
                 # 被手动从下载器删除的种子列表
+                snapshot = TorrentSnapshot.from_torrents(downloader_type, torrents)
                 remove_torrent_ids = list(
-                    set(torrent_ids).difference(
-                        set([(torrent.get("hash")
-                              if downloader_type == 'qbittorrent'
-                              else str(torrent.hashString)) for torrent in torrents])))
+                    set(torrent_ids).difference(set(snapshot.values("id"))))
+                # 总上传量、总下载量
+                total_uploaded += sum(snapshot.values("uploaded"))
+                total_downloaded += sum(snapshot.values("downloaded"))
                 # 完成的种子
-                for torrent in torrents:
-                    torrent_info = self.__get_torrent_dict(downloader_type=downloader_type,
-                                                           torrent=torrent)
-                    # ID
-                    torrent_id = torrent_info.get("id")
-                    # 总上传量
-                    total_uploaded += torrent_info.get("uploaded")
-                    # 总下载量
-                    total_downloaded += torrent_info.get("downloaded")
-                    # 种子名称
-                    torrent_name = torrent.get('name')
-                    # 下载器名称
-                    downlaod_name = downloader_cfg.get("name")
-                    # 种子大小
-                    torrent_size = StringUtils.str_filesize(torrent_info.get("total_size"))
-                    # 已下载
-                    download_size = StringUtils.str_filesize(torrent_info.get("downloaded"))
-                    # 已上传
-                    upload_size = StringUtils.str_filesize(torrent_info.get("uploaded"))
-                    # 分享率
-                    torrent_ratio = round(torrent_info.get("ratio") or 0, 2)
-                    # 种子添加时间
-                    add_time = torrent_info.get("add_time")
-                    # 做种时间
-                    seeding_time = torrent_info.get("seeding_time")
-                    # 上传量
-                    uploaded = torrent_info.get("uploaded")
-                    # 下载量
-                    downloaded = torrent_info.get("downloaded")
-                    # 平均上传速度
-                    avg_upspeed = torrent_info.get("avg_upspeed")
-                    # 未活跃时间
-                    iatime = torrent_info.get("iatime")
-                    # 判断是否符合删除条件
-                    need_delete, delete_type = self.__check_remove_rule(remove_rule=remove_rule,
-                                                                        seeding_time=seeding_time,
-                                                                        ratio=torrent_ratio,
-                                                                        uploaded=uploaded,
-                                                                        avg_upspeed=avg_upspeed,
-                                                                        iatime=iatime)
-                    if need_delete:
-                        log.info(
-                            "【Brush】%s 做种达到删种条件：%s，删除任务..." % (torrent_name, delete_type.value))
-                        if sendmessage:
-                            __send_message(_task_name=task_name,
-                                           _delete_type=delete_type,
-                                           _torrent_name=torrent_name,
-                                           _download_name=downlaod_name,
-                                           _torrent_size=torrent_size,
-                                           _download_size=download_size,
-                                           _upload_size=upload_size,
-                                           _ratio=torrent_ratio,
-                                           _add_time=add_time)
-
-                        if torrent_id not in delete_ids:
-                            delete_ids.append(torrent_id)
-                            update_torrents.append(("%s,%s" % (uploaded, downloaded),
-                                                    taskid,
-                                                    torrent_id))
+                for torrent_info, delete_type in __match_torrents(snapshot, complete_rules):
+                    log.info("【Brush】%s 做种达到删种条件：%s，删除任务..." % (
+                        torrent_info.get("name"), delete_type.value))
+                    __delete_torrent(torrent_info, delete_type)
                 # 检查下载中状态的
                 torrents = self.downloader.get_downloading_torrents(downloader_id=downloader_id,
                                                                     ids=torrent_ids)
@@ -425,79 +407,23 @@ class BrushTask(object):
                     log.warn("【BRUSH】任务 %s 获取下载中种子失败" % task_name)
                     continue
                 # 更新手动从下载器删除的种子列表
+                snapshot = TorrentSnapshot.from_torrents(downloader_type, torrents)
                 remove_torrent_ids = list(
-                    set(remove_torrent_ids).difference(
-                        set([(torrent.get("hash")
-                              if downloader_type == 'qbittorrent'
-                              else str(torrent.hashString)) for torrent in torrents])))
+                    set(remove_torrent_ids).difference(set(snapshot.values("id"))))
+                # 总上传量、总下载量
+                total_uploaded += sum(snapshot.values("uploaded"))
+                total_downloaded += sum(snapshot.values("downloaded"))
                 # 下载中的种子
-                for torrent in torrents:
-                    torrent_info = self.__get_torrent_dict(downloader_type=downloader_type,
-                                                           torrent=torrent)
-                    # ID
-                    torrent_id = torrent_info.get("id")
-                    # 总上传量
-                    total_uploaded += torrent_info.get("uploaded")
-                    # 总下载量
-                    total_downloaded += torrent_info.get("downloaded")
-                    # 分享率 上传量 / 种子大小
-                    ratio = float(torrent_info.get("uploaded")) / float(torrent_info.get("total_size"))
-                    # 种子名称
-                    torrent_name = torrent.get('name')
-                    # 下载器名称
-                    downlaod_name = downloader_cfg.get("name")
-                    # 种子大小
-                    torrent_size = StringUtils.str_filesize(torrent_info.get("total_size"))
-                    # 已下载
-                    download_size = StringUtils.str_filesize(torrent_info.get("downloaded"))
-                    # 已上传
-                    upload_size = StringUtils.str_filesize(torrent_info.get("uploaded"))
-                    # 分享率
-                    torrent_ratio = round(torrent_info.get("ratio") or 0, 2)
-                    # 种子添加时间
-                    add_time = torrent_info.get("add_time")
-                    # 下载耗时
-                    dltime = torrent_info.get("dltime")
-                    # 平均上传速度
-                    avg_upspeed = torrent_info.get("avg_upspeed")
-                    # 未活跃时间
-                    iatime = torrent_info.get("iatime")
-                    # 上传量
-                    uploaded = torrent_info.get("uploaded")
-                    # 下载量
-                    downloaded = torrent_info.get("downloaded")
-                    # 判断是否符合删除条件
-                    need_delete, delete_type = self.__check_remove_rule(remove_rule=remove_rule,
-                                                                        ratio=ratio,
-                                                                        dltime=dltime,
-                                                                        avg_upspeed=avg_upspeed,
-                                                                        iatime=iatime)
-                    if need_delete:
-                        log.info(
-                            "【Brush】%s 达到删种条件：%s，删除下载任务..." % (torrent_name, delete_type.value))
-                        if sendmessage:
-                            __send_message(_task_name=task_name,
-                                           _delete_type=delete_type,
-                                           _torrent_name=torrent_name,
-                                           _download_name=downlaod_name,
-                                           _torrent_size=torrent_size,
-                                           _download_size=download_size,
-                                           _upload_size=upload_size,
-                                           _ratio=torrent_ratio,
-                                           _add_time=add_time)
-
-                        if torrent_id not in delete_ids:
-                            delete_ids.append(torrent_id)
-                            update_torrents.append(("%s,%s" % (uploaded, downloaded),
-                                                    taskid,
-                                                    torrent_id))
+                for torrent_info, delete_type in __match_torrents(snapshot, downloading_rules):
+                    log.info("【Brush】%s 达到删种条件：%s，删除下载任务..." % (
+                        torrent_info.get("name"), delete_type.value))
+                    __delete_torrent(torrent_info, delete_type)
 
                 # 手工删除的种子，清除对应记录
                 if remove_torrent_ids:
                     log.info("【Brush】任务 %s 的这些下载任务在下载器中不存在，将删除任务记录：%s" % (
                         task_name, remove_torrent_ids))
-                    for remove_torrent_id in remove_torrent_ids:
-                        self.dbhelper.delete_brushtask_torrent(taskid, remove_torrent_id)
+                    self.dbhelper.delete_brushtask_torrents(taskid, remove_torrent_ids)
 
                 # 删除下载器种子
                 if delete_ids:
@@ -511,18 +437,14 @@ class BrushTask(object):
                         delete_ids = []
                         update_torrents = []
                     else:
-                        for torrent in torrents:
-                            torrent_info = self.__get_torrent_dict(downloader_type=downloader_type,
-                                                                   torrent=torrent)
-                            # ID
-                            torrent_id = torrent_info.get("id")
-                            # 依然存在下载器的种子移出删除列表
-                            if torrent_id in delete_ids:
-                                delete_ids.remove(torrent_id)
+                        # 依然存在下载器的种子移出删除列表
+                        remain_ids = set(TorrentSnapshot.from_torrents(downloader_type, torrents).values("id"))
+                        delete_ids = [torrent_id for torrent_id in delete_ids if torrent_id not in remain_ids]
                     if delete_ids:
                         # 更新种子状态为已删除
+                        delete_id_set = set(delete_ids)
                         update_torrents = [update_torrent for update_torrent in update_torrents
-                                           if update_torrent[2] in delete_ids]
+                                           if update_torrent[2] in delete_id_set]
                         self.dbhelper.update_brushtask_torrent_state(update_torrents)
                         log.info("【Brush】任务 %s 共删除 %s 个刷流下载任务" % (task_name, len(delete_ids)))
                     else:
@@ -828,145 +750,38 @@ class BrushTask(object):
         return True
 
     @staticmethod
-    def __check_remove_rule(remove_rule,
-                            seeding_time=None,
-                            ratio=None,
-                            uploaded=None,
-                            dltime=None,
-                            avg_upspeed=None,
-                            iatime=None):
+    def __get_remove_rules(remove_rule, downloading=False):
         """
-        检查是否符合删种规则
+        删种规则转换为按顺序匹配的种子规则，规则格式：条件#值
         :param remove_rule: 删种规则
-        :param seeding_time: 做种时间
-        :param ratio: 分享率
-        :param uploaded: 上传量
-        :param dltime: 下载耗时
-        :param avg_upspeed: 上传平均速度
-        :param iatime: 未活动时间
+        :param downloading: 是否为下载中的种子，下载中的种子分享率按上传量/种子大小计算，不检查做种时间和上传量
         """
         if not remove_rule:
-            return False
-        try:
-            if remove_rule.get("time") and seeding_time:
-                rule_times = remove_rule.get("time").split("#")
-                if rule_times[0]:
-                    if len(rule_times) > 1 and rule_times[1]:
-                        if float(seeding_time) > float(rule_times[1]) * 3600:
-                            return True, BrushDeleteType.SEEDTIME
-            if remove_rule.get("ratio") and ratio:
-                rule_ratios = remove_rule.get("ratio").split("#")
-                if rule_ratios[0]:
-                    if len(rule_ratios) > 1 and rule_ratios[1]:
-                        if float(ratio) > float(rule_ratios[1]):
-                            return True, BrushDeleteType.RATIO
-            if remove_rule.get("uploadsize") and uploaded:
-                rule_uploadsizes = remove_rule.get("uploadsize").split("#")
-                if rule_uploadsizes[0]:
-                    if len(rule_uploadsizes) > 1 and rule_uploadsizes[1]:
-                        if float(uploaded) > float(rule_uploadsizes[1]) * 1024 ** 3:
-                            return True, BrushDeleteType.UPLOADSIZE
-            if remove_rule.get("dltime") and dltime:
-                rule_times = remove_rule.get("dltime").split("#")
-                if rule_times[0]:
-                    if len(rule_times) > 1 and rule_times[1]:
-                        if float(dltime) > float(rule_times[1]) * 3600:
-                            return True, BrushDeleteType.DLTIME
-            if remove_rule.get("avg_upspeed") and avg_upspeed:
-                rule_avg_upspeeds = remove_rule.get("avg_upspeed").split("#")
-                if rule_avg_upspeeds[0]:
-                    if len(rule_avg_upspeeds) > 1 and rule_avg_upspeeds[1]:
-                        if float(avg_upspeed) < float(rule_avg_upspeeds[1]) * 1024:
-                            return True, BrushDeleteType.AVGUPSPEED
-            if remove_rule.get("iatime") and iatime:
-                rule_times = remove_rule.get("iatime").split("#")
-                if rule_times[0]:
-                    if len(rule_times) > 1 and rule_times[1]:
-                        if float(iatime) > float(rule_times[1]) * 3600:
-                            return True, BrushDeleteType.IATIME
-        except Exception as err:
-            ExceptionUtils.exception_traceback(err)
-        return False, BrushDeleteType.NOTDELETE
-
-    @staticmethod
-    def __get_torrent_dict(downloader_type, torrent):
-
-        # 当前时间戳
-        date_now = int(time.time())
-
-        if downloader_type == "qbittorrent":
-            # ID
-            torrent_id = torrent.get("hash")
-            # 下载时间
-            dltime = date_now - torrent.get("added_on") if torrent.get("added_on") else 0
-            # 做种时间
-            seeding_time = date_now - torrent.get("completion_on") if torrent.get("completion_on") else 0
-            # 分享率
-            ratio = torrent.get("ratio") or 0
-            # 上传量
-            uploaded = torrent.get("uploaded") or 0
-            # 平均上传速度 Byte/s
-            if dltime:
-                avg_upspeed = int(uploaded / dltime)
-            else:
-                avg_upspeed = uploaded
-            # 已未活动 秒
-            iatime = date_now - torrent.get("last_activity") if torrent.get("last_activity") else 0
-            # 下载量
-            downloaded = torrent.get("downloaded")
-            # 种子大小
-            total_size = torrent.get("total_size")
-            # 添加时间
-            add_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(torrent.get("added_on") or 0))
-
+            return []
+        if downloading:
+            # 规则名称, 种子字段, 比较方式, 单位, 删种类型
+            items = (("ratio", "upload_ratio", ">", 1, BrushDeleteType.RATIO),
+                     ("dltime", "dltime", ">", 3600, BrushDeleteType.DLTIME),
+                     ("avg_upspeed", "avg_upspeed", "<", 1024, BrushDeleteType.AVGUPSPEED),
+                     ("iatime", "iatime", ">", 3600, BrushDeleteType.IATIME))
         else:
-
-            # ID
-            torrent_id = torrent.hashString
-            # 做种时间
-            if not torrent.date_done or torrent.date_done.timestamp() < 1:
-                seeding_time = 0
-            else:
-                seeding_time = date_now - int(torrent.date_done.timestamp())
-            # 下载耗时
-            if not torrent.date_added or torrent.date_added.timestamp() < 1:
-                dltime = 0
-            else:
-                dltime = date_now - int(torrent.date_added.timestamp())
-            # 下载量
-            downloaded = int(torrent.total_size * torrent.progress / 100)
-            # 分享率
-            ratio = torrent.ratio or 0
-            # 上传量
-            uploaded = int(downloaded * torrent.ratio)
-            # 平均上传速度
-            if dltime:
-                avg_upspeed = int(uploaded / dltime)
-            else:
-                avg_upspeed = uploaded
-            # 未活动时间
-            if not torrent.date_active or torrent.date_active.timestamp() < 1:
-                iatime = 0
-            else:
-                iatime = date_now - int(torrent.date_active.timestamp())
-            # 种子大小
-            total_size = torrent.total_size
-            # 添加时间
-            add_time = time.strftime('%Y-%m-%d %H:%M:%S',
-                                     time.localtime(torrent.date_added.timestamp() if torrent.date_added else 0))
-
-        return {
-            "id": torrent_id,
-            "seeding_time": seeding_time,
-            "ratio": ratio,
-            "uploaded": uploaded,
-            "downloaded": downloaded,
-            "avg_upspeed": avg_upspeed,
-            "iatime": iatime,
-            "dltime": dltime,
-            "total_size": total_size,
-            "add_time": add_time
-        }
+            items = (("time", "seeding_time", ">", 3600, BrushDeleteType.SEEDTIME),
+                     ("ratio", "ratio", ">", 1, BrushDeleteType.RATIO),
+                     ("uploadsize", "uploaded", ">", 1024 ** 3, BrushDeleteType.UPLOADSIZE),
+                     ("avg_upspeed", "avg_upspeed", "<", 1024, BrushDeleteType.AVGUPSPEED),
+                     ("iatime", "iatime", ">", 3600, BrushDeleteType.IATIME))
+        rules = []
+        for key, field, op, unit, delete_type in items:
+            rule_values = (remove_rule.get(key) or "").split("#")
+            if not rule_values[0] or len(rule_values) < 2 or not rule_values[1]:
+                continue
+            try:
+                # 种子字段值为0时不匹配
+                rules.append(TorrentRule(conditions=[Condition(field, op, float(rule_values[1]) * unit, nonzero=True)],
+                                         result=delete_type))
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+        return rules
 
     def stop_service(self):
         """
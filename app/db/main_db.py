@@ -1,23 +1,15 @@
 import os
 import threading
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.pool import QueuePool
 
 from app.db.models import Base
+from app.db.sqlite_engine import create_sqlite_engine
 from app.utils import ExceptionUtils, PathUtils
 from config import Config
 
 lock = threading.Lock()
-_Engine = create_engine(
-    f"sqlite:///{os.path.join(Config().get_config_path(), 'user.db')}?check_same_thread=False",
-    echo=False,
-    poolclass=QueuePool,
-    pool_pre_ping=True,
-    pool_size=100,
-    pool_recycle=60 * 10,
-    max_overflow=0
-)
+_Engine, _WriteLock = create_sqlite_engine('user.db')
 _Session = scoped_session(sessionmaker(bind=_Engine,
                                        autoflush=True,
                                        autocommit=False,
@@ -30,6 +22,10 @@ class MainDb:
     def session(self):
         return _Session()
 
+    @property
+    def write_lock(self):
+        return _WriteLock
+
     def init_db(self):
         with lock:
             Base.metadata.create_all(_Engine)
@@ -120,13 +116,15 @@ class DbPersist(object):
 
     def __call__(self, f):
         def persist(*args, **kwargs):
-            try:
-                ret = f(*args, **kwargs)
-                self.db.commit()
-                return True if ret is None else ret
-            except Exception as e:
-                ExceptionUtils.exception_traceback(e)
-                self.db.rollback()
-                return False
+            # 写事务串行执行，避免多个写连接争用数据库锁
+            with self.db.write_lock:
+                try:
+                    ret = f(*args, **kwargs)
+                    self.db.commit()
+                    return True if ret is None else ret
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
+                    self.db.rollback()
+                    return False
 
         return persist
@@ -1,27 +1,16 @@
 import json
-import os
 import threading
 import time
 
 from cachetools import cached, TTLCache
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.pool import QueuePool
 
 from app.db.models import BaseMedia, MEDIASYNCITEMS, MEDIASYNCSTATISTIC
+from app.db.sqlite_engine import create_sqlite_engine
 from app.utils import ExceptionUtils
-from config import Config
 
 lock = threading.Lock()
-_Engine = create_engine(
-    f"sqlite:///{os.path.join(Config().get_config_path(), 'media.db')}?check_same_thread=False",
-    echo=False,
-    poolclass=QueuePool,
-    pool_pre_ping=True,
-    pool_size=100,
-    pool_recycle=60 * 10,
-    max_overflow=0
-)
+_Engine, _WriteLock = create_sqlite_engine('media.db')
 _Session = scoped_session(sessionmaker(bind=_Engine,
                                        autoflush=True,
                                        autocommit=False))
@@ -41,65 +30,68 @@ class MediaDb:
     def insert(self, server_type, iteminfo, seasoninfo):
         if not server_type or not iteminfo:
             return False
-        try:
-            self.session.query(MEDIASYNCITEMS).filter(MEDIASYNCITEMS.SERVER == server_type,
-                                                      MEDIASYNCITEMS.ITEM_ID == iteminfo.get("id")).delete()
-            self.session.flush()
-            self.session.add(MEDIASYNCITEMS(
-                SERVER=server_type,
-                LIBRARY=iteminfo.get("library"),
-                ITEM_ID=iteminfo.get("id"),
-                ITEM_TYPE=iteminfo.get("type"),
-                TITLE=iteminfo.get("title"),
-                ORGIN_TITLE=iteminfo.get("originalTitle"),
-                YEAR=iteminfo.get("year"),
-                TMDBID=iteminfo.get("tmdbid"),
-                IMDBID=iteminfo.get("imdbid"),
-                PATH=iteminfo.get("path"),
-                JSON=json.dumps(seasoninfo)
-            ))
-            self.session.commit()
-            return True
-        except Exception as e:
-            ExceptionUtils.exception_traceback(e)
-            self.session.rollback()
+        with _WriteLock:
+            try:
+                self.session.query(MEDIASYNCITEMS).filter(MEDIASYNCITEMS.SERVER == server_type,
+                                                          MEDIASYNCITEMS.ITEM_ID == iteminfo.get("id")).delete()
+                self.session.flush()
+                self.session.add(MEDIASYNCITEMS(
+                    SERVER=server_type,
+                    LIBRARY=iteminfo.get("library"),
+                    ITEM_ID=iteminfo.get("id"),
+                    ITEM_TYPE=iteminfo.get("type"),
+                    TITLE=iteminfo.get("title"),
+                    ORGIN_TITLE=iteminfo.get("originalTitle"),
+                    YEAR=iteminfo.get("year"),
+                    TMDBID=iteminfo.get("tmdbid"),
+                    IMDBID=iteminfo.get("imdbid"),
+                    PATH=iteminfo.get("path"),
+                    JSON=json.dumps(seasoninfo)
+                ))
+                self.session.commit()
+                return True
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                self.session.rollback()
         return False
 
     def empty(self, server_type=None, library=None):
-        try:
-            if server_type and library:
-                self.session.query(MEDIASYNCITEMS).filter(MEDIASYNCITEMS.SERVER == server_type,
-                                                          MEDIASYNCITEMS.LIBRARY == library).delete()
-            elif server_type:
-                self.session.query(MEDIASYNCITEMS).filter(MEDIASYNCITEMS.SERVER == server_type).delete()
-            else:
-                self.session.query(MEDIASYNCITEMS).delete()
-            self.session.commit()
-            return True
-        except Exception as e:
-            ExceptionUtils.exception_traceback(e)
-            self.session.rollback()
+        with _WriteLock:
+            try:
+                if server_type and library:
+                    self.session.query(MEDIASYNCITEMS).filter(MEDIASYNCITEMS.SERVER == server_type,
+                                                              MEDIASYNCITEMS.LIBRARY == library).delete()
+                elif server_type:
+                    self.session.query(MEDIASYNCITEMS).filter(MEDIASYNCITEMS.SERVER == server_type).delete()
+                else:
+                    self.session.query(MEDIASYNCITEMS).delete()
+                self.session.commit()
+                return True
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                self.session.rollback()
         return False
 
     def statistics(self, server_type, total_count, movie_count, tv_count):
         if not server_type:
             return False
-        try:
-            self.session.query(MEDIASYNCSTATISTIC).filter(MEDIASYNCSTATISTIC.SERVER == server_type).delete()
-            self.session.flush()
-            self.session.add(MEDIASYNCSTATISTIC(
-                SERVER=server_type,
-                TOTAL_COUNT=total_count,
-                MOVIE_COUNT=movie_count,
-                TV_COUNT=tv_count,
-                UPDATE_TIME=time.strftime('%Y-%m-%d %H:%M:%S',
-                                          time.localtime(time.time()))
-            ))
-            self.session.commit()
-            return True
-        except Exception as e:
-            ExceptionUtils.exception_traceback(e)
-            self.session.rollback()
+        with _WriteLock:
+            try:
+                self.session.query(MEDIASYNCSTATISTIC).filter(MEDIASYNCSTATISTIC.SERVER == server_type).delete()
+                self.session.flush()
+                self.session.add(MEDIASYNCSTATISTIC(
+                    SERVER=server_type,
+                    TOTAL_COUNT=total_count,
+                    MOVIE_COUNT=movie_count,
+                    TV_COUNT=tv_count,
+                    UPDATE_TIME=time.strftime('%Y-%m-%d %H:%M:%S',
+                                              time.localtime(time.time()))
+                ))
+                self.session.commit()
+                return True
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                self.session.rollback()
         return False
 
     @cached(cache=TTLCache(maxsize=128, ttl=60))
@@ -133,6 +133,23 @@ class CUSTOMWORDGROUPS(Base):
     NOTE = Column(Text)
 
 
+class DOUBANMEDIAS(Base):
+    __tablename__ = 'DOUBAN_MEDIAS'
+
+    ID = Column(Integer, Sequence('ID'), primary_key=True)
+    DOUBAN_ID = Column(Text, unique=True, index=True)
+    TMDB_ID = Column(Text)
+    TYPE = Column(Text)
+    TITLE = Column(Text)
+    ORIGINAL_TITLE = Column(Text)
+    YEAR = Column(Text)
+    IMDB_ID = Column(Text)
+    RATING = Column(Text)
+    IMAGE = Column(Text)
+    OVERVIEW = Column(Text)
+    DATE = Column(Text)
+
+
 class DOWNLOADER(Base):
     __tablename__ = 'DOWNLOADER'
 
@@ -423,6 +440,48 @@ class SITESTATISTICSHISTORY(Base):
     URL = Column(Text)
 
 
+class SITESTATISTICSDAILY(Base):
+    __tablename__ = 'SITE_STATISTICS_DAILY'
+    __table_args__ = (
+        Index('UN_INDX_SITE_STATISTICS_DAILY_UD', 'URL', 'DATE', unique=True),
+        Index('INDX_SITE_STATISTICS_DAILY_SD', 'SITE', 'DATE'),
+        Index('INDX_SITE_STATISTICS_DAILY_DATE', 'DATE')
+    )
+
+    ID = Column(Integer, Sequence('ID'), primary_key=True)
+    SITE = Column(Text)
+    URL = Column(Text)
+    DATE = Column(Text)
+    UPLOAD = Column(Integer, server_default=text("0"))
+    DOWNLOAD = Column(Integer, server_default=text("0"))
+    UPLOAD_INC = Column(Integer, server_default=text("0"))
+    DOWNLOAD_INC = Column(Integer, server_default=text("0"))
+    SEEDING = Column(Integer, server_default=text("0"))
+    SEEDING_SIZE = Column(Integer, server_default=text("0"))
+    BONUS = Column(Float, server_default=text("0.0"))
+
+
+class SITESTATISTICSMONTHLY(Base):
+    __tablename__ = 'SITE_STATISTICS_MONTHLY'
+    __table_args__ = (
+        Index('UN_INDX_SITE_STATISTICS_MONTHLY_UM', 'URL', 'MONTH', unique=True),
+        Index('INDX_SITE_STATISTICS_MONTHLY_MONTH', 'MONTH')
+    )
+
+    ID = Column(Integer, Sequence('ID'), primary_key=True)
+    SITE = Column(Text)
+    URL = Column(Text)
+    MONTH = Column(Text)
+    DAYS = Column(Integer, server_default=text("0"))
+    UPLOAD = Column(Integer, server_default=text("0"))
+    DOWNLOAD = Column(Integer, server_default=text("0"))
+    UPLOAD_INC = Column(Integer, server_default=text("0"))
+    DOWNLOAD_INC = Column(Integer, server_default=text("0"))
+    SEEDING = Column(Integer, server_default=text("0"))
+    SEEDING_SIZE = Column(Integer, server_default=text("0"))
+    BONUS = Column(Float, server_default=text("0.0"))
+
+
 class SITEUSERINFOSTATS(Base):
     __tablename__ = 'SITE_USER_INFO_STATS'
     __table_args__ = (
@@ -496,6 +555,9 @@ class TRANSFERBLACKLIST(Base):
 
 class TRANSFERHISTORY(Base):
     __tablename__ = 'TRANSFER_HISTORY'
+    __table_args__ = (
+        Index('INDX_TRANSFER_HISTORY_TMDBID_SEASON', 'TMDBID', 'SEASON', 'EPISODE_START'),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     MODE = Column(Text)
@@ -505,6 +567,9 @@ class TRANSFERHISTORY(Base):
     TITLE = Column(Text, index=True)
     YEAR = Column(Text)
     SEASON_EPISODE = Column(Text)
+    SEASON = Column(Integer)
+    EPISODE_START = Column(Integer)
+    EPISODE_END = Column(Integer)
     SOURCE = Column(Text)
     SOURCE_PATH = Column(Text, index=True)
     SOURCE_FILENAME = Column(Text, index=True)
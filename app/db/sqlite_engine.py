@@ -0,0 +1,79 @@
+import os
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+from config import Config
+
+# SQLite默认参数，可在config.yaml的app.sqlite中覆盖
+DEFAULT_SQLITE_CONF = {
+    # 日志模式，WAL模式下读写互不阻塞
+    "journal_mode": "WAL",
+    # 同步模式，WAL模式下NORMAL即可保证一致性
+    "synchronous": "NORMAL",
+    # 页缓存大小，负数表示KB
+    "cache_size": -64000,
+    # 内存映射大小（字节）
+    "mmap_size": 256 * 1024 * 1024,
+    # 数据库被锁时的等待时间（毫秒）
+    "busy_timeout": 30000,
+    # 连接池大小，会话按线程持有连接，各常驻线程都会占用一个连接，不宜过小
+    "pool_size": 100
+}
+
+# 写入锁，每个数据库文件同一时间只允许一个写事务
+_write_locks = {}
+_write_locks_lock = threading.Lock()
+
+
+def get_sqlite_conf():
+    """
+    读取SQLite参数配置
+    """
+    sqlite_conf = dict(DEFAULT_SQLITE_CONF)
+    user_conf = (Config().get_config('app') or {}).get('sqlite') or {}
+    sqlite_conf.update({k: v for k, v in user_conf.items() if v is not None and v != ''})
+    return sqlite_conf
+
+
+def get_write_lock(db_file):
+    """
+    获取数据库文件的写入锁
+    """
+    with _write_locks_lock:
+        if db_file not in _write_locks:
+            _write_locks[db_file] = threading.RLock()
+        return _write_locks[db_file]
+
+
+def create_sqlite_engine(db_name):
+    """
+    创建SQLite引擎，并在每个新连接上设置PRAGMA参数
+    :param db_name: 配置目录下的数据库文件名
+    """
+    db_file = os.path.join(Config().get_config_path(), db_name)
+    sqlite_conf = get_sqlite_conf()
+    engine = create_engine(
+        f"sqlite:///{db_file}?check_same_thread=False",
+        echo=False,
+        poolclass=QueuePool,
+        pool_pre_ping=True,
+        pool_size=int(sqlite_conf.get("pool_size")),
+        pool_recycle=60 * 10,
+        max_overflow=0,
+        connect_args={"timeout": int(sqlite_conf.get("busy_timeout")) / 1000}
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragma(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=%s" % sqlite_conf.get("journal_mode"))
+        cursor.execute("PRAGMA synchronous=%s" % sqlite_conf.get("synchronous"))
+        cursor.execute("PRAGMA cache_size=%d" % int(sqlite_conf.get("cache_size")))
+        cursor.execute("PRAGMA mmap_size=%d" % int(sqlite_conf.get("mmap_size")))
+        cursor.execute("PRAGMA busy_timeout=%d" % int(sqlite_conf.get("busy_timeout")))
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    return engine, get_write_lock(db_file)
@@ -1,11 +1,10 @@
 import os
-import re
 import time
-from datetime import datetime
 
 import log
 import qbittorrentapi
 from app.downloader.client._base import _IDownloadClient
+from app.downloader.torrent_rule import TorrentSnapshot, TorrentRule
 from app.utils import ExceptionUtils, StringUtils
 from app.utils.types import DownloaderType
 
@@ -305,64 +304,37 @@ class Qbittorrent(_IDownloadClient):
         if not config:
             return []
         remove_torrents = []
-        remove_torrents_ids = []
+        remove_torrents_ids = set()
         torrents, error_flag = self.get_torrents(tag=config.get("filter_tags"))
         if error_flag:
             return []
-        ratio = config.get("ratio")
-        # 做种时间 单位：小时
-        seeding_time = config.get("seeding_time")
-        # 大小 单位：GB
-        size = config.get("size")
-        minsize = size[0] * 1024 * 1024 * 1024 if size else 0
-        maxsize = size[-1] * 1024 * 1024 * 1024 if size else 0
-        # 平均上传速度 单位 KB/s
-        upload_avs = config.get("upload_avs")
-        savepath_key = config.get("savepath_key")
-        tracker_key = config.get("tracker_key")
-        qb_state = config.get("qb_state")
-        qb_category = config.get("qb_category")
-        for torrent in torrents:
-            date_done = torrent.completion_on if torrent.completion_on > 0 else torrent.added_on
-            date_now = int(time.mktime(datetime.now().timetuple()))
-            torrent_seeding_time = date_now - date_done if date_done else 0
-            torrent_upload_avs = torrent.uploaded / torrent_seeding_time if torrent_seeding_time else 0
-            if ratio and torrent.ratio <= ratio:
-                continue
-            if seeding_time and torrent_seeding_time <= seeding_time * 3600:
-                continue
-            if size and (torrent.size >= maxsize or torrent.size <= minsize):
-                continue
-            if upload_avs and torrent_upload_avs >= upload_avs * 1024:
-                continue
-            if savepath_key and not re.findall(savepath_key, torrent.save_path, re.I):
-                continue
-            if tracker_key and not re.findall(tracker_key, torrent.tracker, re.I):
-                continue
-            if qb_state and torrent.state not in qb_state:
-                continue
-            if qb_category and torrent.category not in qb_category:
-                continue
+        snapshot = TorrentSnapshot.from_torrents("qbittorrent", torrents)
+        for i in TorrentRule.from_remove_config(config).filter(snapshot):
+            torrent = snapshot.torrents[i]
             remove_torrents.append({
                 "id": torrent.hash,
                 "name": torrent.name,
                 "site": StringUtils.get_url_sld(torrent.tracker),
                 "size": torrent.size
             })
-            remove_torrents_ids.append(torrent.hash)
+            remove_torrents_ids.add(torrent.hash)
         if config.get("samedata") and remove_torrents:
+            # 按名称和大小索引，查找辅种
+            same_torrents = {}
+            for torrent in torrents:
+                same_torrents.setdefault((torrent.name, torrent.size), []).append(torrent)
             remove_torrents_plus = []
             for remove_torrent in remove_torrents:
-                name = remove_torrent.get("name")
-                size = remove_torrent.get("size")
-                for torrent in torrents:
-                    if torrent.name == name and torrent.size == size and torrent.hash not in remove_torrents_ids:
-                        remove_torrents_plus.append({
-                            "id": torrent.hash,
-                            "name": torrent.name,
-                            "site": StringUtils.get_url_sld(torrent.tracker),
-                            "size": torrent.size
-                        })
+                for torrent in same_torrents.get((remove_torrent.get("name"), remove_torrent.get("size")), []):
+                    if torrent.hash in remove_torrents_ids:
+                        continue
+                    remove_torrents_plus.append({
+                        "id": torrent.hash,
+                        "name": torrent.name,
+                        "site": StringUtils.get_url_sld(torrent.tracker),
+                        "size": torrent.size
+                    })
+                    remove_torrents_ids.add(torrent.hash)
             remove_torrents_plus += remove_torrents
             return remove_torrents_plus
         return remove_torrents
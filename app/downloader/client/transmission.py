@@ -1,7 +1,4 @@
 import os.path
-import re
-import time
-from datetime import datetime
 
 import transmission_rpc
 
@@ -9,6 +6,7 @@ import log
 from app.utils import ExceptionUtils, StringUtils
 from app.utils.types import DownloaderType
 from app.downloader.client._base import _IDownloadClient
+from app.downloader.torrent_rule import TorrentSnapshot, TorrentRule
 
 
 class Transmission(_IDownloadClient):
@@ -301,78 +299,38 @@ class Transmission(_IDownloadClient):
         if not config:
             return []
         remove_torrents = []
-        remove_torrents_ids = []
+        remove_torrents_ids = set()
         torrents, error_flag = self.get_torrents(tag=config.get("filter_tags"),
                                                  status=config.get("tr_state"))
         if error_flag:
             return []
-        ratio = config.get("ratio")
-        # 做种时间 单位：小时
-        seeding_time = config.get("seeding_time")
-        # 大小 单位：GB
-        size = config.get("size")
-        minsize = size[0] * 1024 * 1024 * 1024 if size else 0
-        maxsize = size[-1] * 1024 * 1024 * 1024 if size else 0
-        # 平均上传速度 单位 KB/s
-        upload_avs = config.get("upload_avs")
-        savepath_key = config.get("savepath_key")
-        tracker_key = config.get("tracker_key")
-        tr_error_key = config.get("tr_error_key")
-        for torrent in torrents:
-            date_done = torrent.date_done or torrent.date_added
-            date_now = int(time.mktime(datetime.now().timetuple()))
-            torrent_seeding_time = date_now - int(time.mktime(date_done.timetuple())) if date_done else 0
-            torrent_uploaded = torrent.ratio * torrent.total_size
-            torrent_upload_avs = torrent_uploaded / torrent_seeding_time if torrent_seeding_time else 0
-            if ratio and torrent.ratio <= ratio:
-                continue
-            if seeding_time and torrent_seeding_time <= seeding_time * 3600:
-                continue
-            if size and (torrent.total_size >= maxsize or torrent.total_size <= minsize):
-                continue
-            if upload_avs and torrent_upload_avs >= upload_avs * 1024:
-                continue
-            if savepath_key and not re.findall(savepath_key, torrent.download_dir, re.I):
-                continue
-            if tracker_key:
-                if not torrent.trackers:
-                    continue
-                else:
-                    tacker_key_flag = False
-                    for tracker in torrent.trackers:
-                        if re.findall(tracker_key, tracker.get("announce", ""), re.I):
-                            tacker_key_flag = True
-                            break
-                    if not tacker_key_flag:
-                        continue
-            if tr_error_key:
-                announce_results = [x.last_announce_result for x in torrent.tracker_stats]
-                announce_results.append(torrent.error_string)
-
-                # 如果announce_results中均不匹配tr_error_key，则跳过
-                if not any([re.findall(tr_error_key, x, re.I) for x in announce_results]):
-                    continue
-
+        snapshot = TorrentSnapshot.from_torrents("transmission", torrents)
+        for i in TorrentRule.from_remove_config(config).filter(snapshot):
+            torrent = snapshot.torrents[i]
             remove_torrents.append({
                 "id": torrent.hashString,
                 "name": torrent.name,
-                "site": torrent.trackers[0].get("sitename") if torrent.trackers else "",
+                "site": snapshot.values("sitename")[i],
                 "size": torrent.total_size
             })
-            remove_torrents_ids.append(torrent.hashString)
+            remove_torrents_ids.add(torrent.hashString)
         if config.get("samedata") and remove_torrents:
+            # 按名称和大小索引，查找辅种
+            same_torrents = {}
+            for torrent in torrents:
+                same_torrents.setdefault((torrent.name, torrent.total_size), []).append(torrent)
             remove_torrents_plus = []
             for remove_torrent in remove_torrents:
-                name = remove_torrent.get("name")
-                size = remove_torrent.get("size")
-                for torrent in torrents:
-                    if torrent.name == name and torrent.total_size == size and torrent.hashString not in remove_torrents_ids:
-                        remove_torrents_plus.append({
-                            "id": torrent.hashString,
-                            "name": torrent.name,
-                            "site": torrent.trackers[0].get("sitename") if torrent.trackers else "",
-                            "size": torrent.total_size
-                        })
+                for torrent in same_torrents.get((remove_torrent.get("name"), remove_torrent.get("size")), []):
+                    if torrent.hashString in remove_torrents_ids:
+                        continue
+                    remove_torrents_plus.append({
+                        "id": torrent.hashString,
+                        "name": torrent.name,
+                        "site": torrent.trackers[0].get("sitename") if torrent.trackers else "",
+                        "size": torrent.total_size
+                    })
+                    remove_torrents_ids.add(torrent.hashString)
             remove_torrents_plus += remove_torrents
             return remove_torrents_plus
         return remove_torrents
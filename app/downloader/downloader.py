@@ -9,7 +9,7 @@ import log
 from app.conf import ModuleConf
 from app.conf import SystemConfig
 from app.filetransfer import FileTransfer
-from app.helper import DbHelper, ThreadHelper, SubmoduleHelper
+from app.helper import DbHelper, ThreadHelper, SubmoduleHelper, ExistsCacheHelper
 from app.media import Media
 from app.media.meta import MetaInfo
 from app.mediaserver import MediaServer
@@ -39,6 +39,8 @@ class Downloader:
     # 下载器ID-名称枚举类
     _DownloaderEnum = None
     _scheduler = None
+    # 批量暂停、删除种子时每次调用下载器的种子数
+    _batch_size = 100
 
     message = None
     mediaserver = None
@@ -690,7 +692,11 @@ class Downloader:
         _client = self.__get_client(downloader_id) if downloader_id else self.default_client
         if not _client:
             return False
-        return _client.stop_torrents(ids)
+        if not isinstance(ids, list):
+            return _client.stop_torrents(ids)
+        # 分批调用，每批处理多个种子
+        return all([_client.stop_torrents(ids[i:i + self._batch_size])
+                    for i in range(0, len(ids), self._batch_size)])
 
     def delete_torrents(self, downloader_id=None, ids=None, delete_file=False):
         """
@@ -705,7 +711,11 @@ class Downloader:
         _client = self.__get_client(downloader_id) if downloader_id else self.default_client
         if not _client:
             return False
-        return _client.delete_torrents(delete_file=delete_file, ids=ids)
+        if not isinstance(ids, list):
+            return _client.delete_torrents(delete_file=delete_file, ids=ids)
+        # 分批调用，每批处理多个种子
+        return all([_client.delete_torrents(delete_file=delete_file, ids=ids[i:i + self._batch_size])
+                    for i in range(0, len(ids), self._batch_size)])
 
     def batch_download(self,
                        in_from: SearchType,
@@ -997,15 +1007,11 @@ class Downloader:
                         episode_count = season.get("episode_count")
                         if not season_number or not episode_count:
                             continue
-                        # 检查Emby
-                        no_exists_episodes = self.mediaserver.get_no_exists_episodes(meta_info,
-                                                                                     season_number,
-                                                                                     episode_count)
-                        # 没有配置Emby
-                        if no_exists_episodes is None:
-                            no_exists_episodes = self.filetransfer.get_no_exists_medias(meta_info,
-                                                                                        season_number,
-                                                                                        episode_count)
+                        # 检查媒体库，短时间内重复检查时使用缓存
+                        no_exists_episodes = ExistsCacheHelper().get(
+                            key=(meta_info.tmdb_id, season_number, episode_count),
+                            loader=lambda: self.__get_no_exists_episodes(meta_info, season_number, episode_count))
+                        no_exists_episodes = list(no_exists_episodes) if no_exists_episodes else no_exists_episodes
                         if no_exists_episodes:
                             # 排序
                             no_exists_episodes.sort()
@@ -1069,9 +1075,8 @@ class Downloader:
             return return_flag, no_exists, message_list
         # 检查电影
         else:
-            exists_movies = self.mediaserver.get_movies(meta_info.title, meta_info.year)
-            if exists_movies is None:
-                exists_movies = self.filetransfer.get_no_exists_medias(meta_info)
+            exists_movies = ExistsCacheHelper().get(key=(meta_info.tmdb_id, None),
+                                                    loader=lambda: self.__get_exists_movies(meta_info))
             if exists_movies:
                 movies_str = "\n • ".join(["%s (%s)" % (m.get('title'), m.get('year')) for m in exists_movies])
                 msg = f"媒体库中已存在电影：\n • {movies_str}"
@@ -1080,6 +1085,30 @@ class Downloader:
                 return True, {}, message_list
             return False, {}, message_list
 
+    def __get_no_exists_episodes(self, meta_info, season_number, episode_count):
+        """
+        查询媒体库中缺失的集
+        """
+        # 检查Emby
+        no_exists_episodes = self.mediaserver.get_no_exists_episodes(meta_info,
+                                                                     season_number,
+                                                                     episode_count)
+        # 没有配置Emby
+        if no_exists_episodes is None:
+            no_exists_episodes = self.filetransfer.get_no_exists_medias(meta_info,
+                                                                        season_number,
+                                                                        episode_count)
+        return no_exists_episodes
+
+    def __get_exists_movies(self, meta_info):
+        """
+        查询媒体库中已存在的电影
+        """
+        exists_movies = self.mediaserver.get_movies(meta_info.title, meta_info.year)
+        if exists_movies is None:
+            exists_movies = self.filetransfer.get_no_exists_medias(meta_info)
+        return exists_movies
+
     def get_files(self, tid, downloader_id=None):
         """
         获取种子文件列表
@@ -0,0 +1,307 @@
+import operator
+import re
+import time
+from functools import partial
+
+# 多值字段，匹配任意一个值即命中
+LIST_FIELDS = ("trackers", "errors")
+
+# 比较运算，参数互换后绑定条件值，如 v > x 即 x < v
+_COMPARE_OPS = {
+    ">": operator.lt,
+    ">=": operator.le,
+    "<": operator.gt,
+    "<=": operator.ge,
+    "==": operator.eq
+}
+
+
+def _timestamp(value):
+    """
+    Transmission的时间字段转换为时间戳，未设置时返回0
+    """
+    if not value:
+        return 0
+    timestamp = int(value.timestamp())
+    return timestamp if timestamp >= 1 else 0
+
+
+def _tr_field(torrent, name, default=None):
+    """
+    读取Transmission种子属性，查询时未请求的字段返回默认值
+    """
+    try:
+        value = getattr(torrent, name)
+    except (KeyError, AttributeError):
+        return default
+    return default if value is None else value
+
+
+def _since(date_now, timestamp):
+    """
+    距今秒数，时间未设置时为0
+    """
+    return date_now - timestamp if timestamp else 0
+
+
+def _qb_done_on(torrent):
+    """
+    完成时间，未完成时按添加时间计算
+    """
+    completion_on = torrent.get("completion_on") or 0
+    return completion_on if completion_on > 0 else torrent.get("added_on") or 0
+
+
+def _tr_done_on(torrent):
+    return _timestamp(_tr_field(torrent, "date_done")) or _timestamp(_tr_field(torrent, "date_added"))
+
+
+def _tr_downloaded(torrent):
+    return int(_tr_field(torrent, "total_size", 0) * _tr_field(torrent, "progress", 0) / 100)
+
+
+def _tr_uploaded(torrent):
+    return int(_tr_downloaded(torrent) * _tr_field(torrent, "ratio", 0))
+
+
+def _tr_errors(torrent):
+    errors = [stat.last_announce_result for stat in _tr_field(torrent, "tracker_stats", [])]
+    errors.append(_tr_field(torrent, "error_string", ""))
+    return errors
+
+
+def _avg_speed(uploaded, seconds):
+    return uploaded / seconds if seconds else 0
+
+
+# qBittorrent字段计算：字段 -> f(种子, 当前时间戳)
+QB_FIELDS = {
+    "id": lambda t, now: t.get("hash"),
+    "name": lambda t, now: t.get("name"),
+    "size": lambda t, now: t.get("size") or 0,
+    "total_size": lambda t, now: t.get("total_size") or 0,
+    "ratio": lambda t, now: t.get("ratio") or 0,
+    "uploaded": lambda t, now: t.get("uploaded") or 0,
+    "downloaded": lambda t, now: t.get("downloaded") or 0,
+    # 上传量/种子大小
+    "upload_ratio": lambda t, now: _avg_speed(t.get("uploaded") or 0, t.get("total_size")),
+    # 下载耗时
+    "dltime": lambda t, now: _since(now, t.get("added_on")),
+    # 做种时间
+    "seeding_time": lambda t, now: _since(now, t.get("completion_on")),
+    # 完成至今时间，未完成时按添加时间计算
+    "done_time": lambda t, now: _since(now, _qb_done_on(t)),
+    # 未活动时间
+    "iatime": lambda t, now: _since(now, t.get("last_activity")),
+    # 平均上传速度 Byte/s，按下载耗时计算
+    "avg_upspeed": lambda t, now: int(_avg_speed(t.get("uploaded") or 0, _since(now, t.get("added_on"))))
+    if t.get("added_on") else t.get("uploaded") or 0,
+    # 完成后平均上传速度 Byte/s
+    "done_upspeed": lambda t, now: _avg_speed(t.get("uploaded") or 0, _since(now, _qb_done_on(t))),
+    "add_time": lambda t, now: t.get("added_on") or 0,
+    "save_path": lambda t, now: t.get("save_path") or "",
+    "trackers": lambda t, now: [t.get("tracker")] if t.get("tracker") else [],
+    "errors": lambda t, now: [],
+    "state": lambda t, now: t.get("state"),
+    "category": lambda t, now: t.get("category")
+}
+
+# Transmission字段计算
+TR_FIELDS = {
+    "id": lambda t, now: str(t.hashString),
+    "name": lambda t, now: t.name,
+    "size": lambda t, now: _tr_field(t, "total_size", 0),
+    "total_size": lambda t, now: _tr_field(t, "total_size", 0),
+    "ratio": lambda t, now: _tr_field(t, "ratio", 0),
+    "uploaded": lambda t, now: _tr_uploaded(t),
+    "downloaded": lambda t, now: _tr_downloaded(t),
+    "upload_ratio": lambda t, now: _avg_speed(_tr_uploaded(t), _tr_field(t, "total_size", 0)),
+    "dltime": lambda t, now: _since(now, _timestamp(_tr_field(t, "date_added"))),
+    "seeding_time": lambda t, now: _since(now, _timestamp(_tr_field(t, "date_done"))),
+    "done_time": lambda t, now: _since(now, _tr_done_on(t)),
+    "iatime": lambda t, now: _since(now, _timestamp(_tr_field(t, "date_active"))),
+    "avg_upspeed": lambda t, now: int(_avg_speed(_tr_uploaded(t), _since(now, _timestamp(_tr_field(t, "date_added")))))
+    if _timestamp(_tr_field(t, "date_added")) else _tr_uploaded(t),
+    # 完成后平均上传速度，上传量按分享率*种子大小计算
+    "done_upspeed": lambda t, now: _avg_speed(_tr_field(t, "ratio", 0) * _tr_field(t, "total_size", 0),
+                                              _since(now, _tr_done_on(t))),
+    "add_time": lambda t, now: _timestamp(_tr_field(t, "date_added")),
+    "save_path": lambda t, now: _tr_field(t, "download_dir", ""),
+    "trackers": lambda t, now: [tracker.get("announce", "") for tracker in _tr_field(t, "trackers", [])],
+    "sitename": lambda t, now: (_tr_field(t, "trackers", []) or [{}])[0].get("sitename") or "",
+    "errors": lambda t, now: _tr_errors(t),
+    "state": lambda t, now: _tr_field(t, "status"),
+    "category": lambda t, now: None
+}
+
+
+class TorrentSnapshot(object):
+    """
+    下载器种子快照，按列计算统一字段，只计算规则用到的列，供规则批量计算
+    """
+    _fields = {
+        "qbittorrent": QB_FIELDS,
+        "transmission": TR_FIELDS
+    }
+
+    def __init__(self, downloader_type, torrents, date_now=None):
+        """
+        :param downloader_type: 下载器类型 qbittorrent/transmission
+        :param torrents: 下载器返回的种子列表
+        :param date_now: 计算时长使用的当前时间戳
+        """
+        self.torrents = list(torrents or [])
+        self.date_now = date_now or int(time.time())
+        self._getters = self._fields.get(downloader_type) or TR_FIELDS
+        # 已计算的列：字段 -> 值列表
+        self._values = {}
+
+    def __len__(self):
+        return len(self.torrents)
+
+    @classmethod
+    def from_torrents(cls, downloader_type, torrents, date_now=None):
+        return cls(downloader_type, torrents, date_now)
+
+    def values(self, field):
+        """
+        获取一列数据的值列表
+        """
+        values = self._values.get(field)
+        if values is None:
+            getter = self._getters[field]
+            date_now = self.date_now
+            values = self._values[field] = [getter(torrent, date_now) for torrent in self.torrents]
+        return values
+
+    def row(self, index):
+        """
+        获取单个种子的全部统一字段
+        """
+        torrent = self.torrents[index]
+        return {field: getter(torrent, self.date_now) for field, getter in self._getters.items()}
+
+    def filter_indexes(self, field, indexes, test):
+        """
+        从部分种子中筛选字段值满足条件的种子，列未计算时只计算这些种子
+        """
+        values = self._values.get(field)
+        if values is not None:
+            return [i for i in indexes if test(values[i])]
+        getter = self._getters[field]
+        date_now = self.date_now
+        torrents = self.torrents
+        return [i for i in indexes if test(getter(torrents[i], date_now))]
+
+
+class Condition(object):
+    """
+    单个字段条件
+    数值字段：> >= < <= ==，nonzero为真时字段值为0的不命中
+    文本字段：regex 正则匹配（忽略大小写），in 取值在列表中，多值字段任意一个值命中即可
+    """
+
+    def __init__(self, field, op, value, nonzero=False):
+        self.field = field
+        self.op = op
+        self.value = value
+        self.nonzero = nonzero
+        # 判断单个字段值是否满足条件
+        self.test = self.__make_test()
+
+    def __make_test(self):
+        """
+        生成判断单个字段值的函数
+        """
+        if self.op in _COMPARE_OPS:
+            test = partial(_COMPARE_OPS[self.op], self.value)
+            if self.nonzero:
+                return lambda value: bool(value) and test(value)
+            return test
+        if self.op == "regex":
+            matcher = re.compile(self.value, re.I).search
+        elif self.op == "in":
+            matcher = set(self.value).__contains__
+        else:
+            raise ValueError("不支持的条件运算：%s" % self.op)
+        if self.field in LIST_FIELDS:
+            return lambda value: any(matcher(item or "") for item in value) if value else False
+        if self.op == "regex":
+            return lambda value: bool(matcher(value or ""))
+        return matcher
+
+
+class TorrentRule(object):
+    """
+    种子规则，所有条件同时满足时命中，没有条件时全部命中
+    目前用于刷流任务删种规则和自动删种任务
+    """
+
+    def __init__(self, conditions=None, result=None):
+        self.conditions = conditions or []
+        # 命中后的处理结果，如删种原因
+        self.result = result
+
+    def filter(self, snapshot, indexes=None):
+        """
+        逐个条件缩小候选范围，后面的条件只计算剩余的种子
+        :param indexes: 候选种子序号，为空时为全部种子
+        :return: 命中规则的种子序号
+        """
+        if indexes is None:
+            indexes = range(len(snapshot))
+        indexes = list(indexes)
+        for condition in self.conditions:
+            if not indexes:
+                break
+            indexes = snapshot.filter_indexes(condition.field, indexes, condition.test)
+        return indexes
+
+    @staticmethod
+    def first_match(snapshot, rules):
+        """
+        按顺序匹配多条规则，每个种子取第一条命中的规则，已命中的种子不再计算后面的规则
+        :return: 每个种子命中的规则，未命中为None
+        """
+        matches = [None] * len(snapshot)
+        remain = set(range(len(snapshot)))
+        for rule in rules or []:
+            if not remain:
+                break
+            for i in rule.filter(snapshot, sorted(remain)):
+                matches[i] = rule
+                remain.discard(i)
+        return matches
+
+    @classmethod
+    def from_remove_config(cls, config):
+        """
+        自动删种任务配置转换为规则
+        """
+        # 直接读取的字段在前，需要计算的字段和正则匹配在后，尽早缩小候选范围
+        conditions = []
+        # 分享率
+        if config.get("ratio"):
+            conditions.append(Condition("ratio", ">", config.get("ratio")))
+        # 大小 单位：GB
+        size = config.get("size")
+        if size:
+            conditions.append(Condition("size", ">", size[0] * 1024 ** 3))
+            conditions.append(Condition("size", "<", size[-1] * 1024 ** 3))
+        if config.get("qb_state"):
+            conditions.append(Condition("state", "in", config.get("qb_state")))
+        if config.get("qb_category"):
+            conditions.append(Condition("category", "in", config.get("qb_category")))
+        # 做种时间 单位：小时
+        if config.get("seeding_time"):
+            conditions.append(Condition("done_time", ">", config.get("seeding_time") * 3600))
+        # 平均上传速度 单位：KB/s
+        if config.get("upload_avs"):
+            conditions.append(Condition("done_upspeed", "<", config.get("upload_avs") * 1024))
+        if config.get("savepath_key"):
+            conditions.append(Condition("save_path", "regex", config.get("savepath_key")))
+        if config.get("tracker_key"):
+            conditions.append(Condition("trackers", "regex", config.get("tracker_key")))
+        if config.get("tr_error_key"):
+            conditions.append(Condition("errors", "regex", config.get("tr_error_key")))
+        return cls(conditions)
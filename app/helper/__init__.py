@@ -1,6 +1,7 @@
 from .chrome_helper import ChromeHelper, init_chrome
 from .meta_helper import MetaHelper
 from .progress_helper import ProgressHelper
+from .exists_cache_helper import ExistsCacheHelper
 from .security_helper import SecurityHelper
 from .thread_helper import ThreadHelper
 from .db_helper import DbHelper
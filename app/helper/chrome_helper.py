@@ -1,13 +1,13 @@
+import atexit
 import json
 import os.path
 import tempfile
-from functools import reduce
+import threading
+from functools import reduce, lru_cache
 from threading import Lock
 
-import undetected_chromedriver as uc
-from webdriver_manager.chrome import ChromeDriverManager
-
 import app.helper.cloudflare_helper as CloudflareHelper
+from app.helper.chrome_pool import ChromePool
 from app.utils import SystemUtils, RequestUtils
 from config import Config
 
@@ -15,8 +15,14 @@ lock = Lock()
 
 driver_executable_path = None
 
+# 浏览器实例池
+_pool = None
+
 
 class ChromeHelper(object):
+    """
+    浏览器，首次使用时从实例池借出，quit或对象回收时归还
+    """
     _executable_path = None
 
     _chrome = None
@@ -27,6 +33,7 @@ class ChromeHelper(object):
     def __init__(self, headless=False):
 
         self._executable_path = SystemUtils.get_webdriver_path() or driver_executable_path
+        self._lock = Lock()
 
         if SystemUtils.is_windows() or SystemUtils.is_macos():
             self._headless = False
@@ -38,30 +45,57 @@ class ChromeHelper(object):
     def init_driver(self):
         if self._executable_path:
             return
-        if not uc.find_chrome_executable():
+        if not _uc().find_chrome_executable():
             return
+        from webdriver_manager.chrome import ChromeDriverManager
         global driver_executable_path
         driver_executable_path = ChromeDriverManager().install()
 
     @property
     def browser(self):
-        with lock:
-            if not self._chrome:
-                self._chrome = self.__get_browser()
+        with self._lock:
+            if not self._chrome and self.get_status():
+                self._chrome = get_pool().lease(key=(self._headless, self.__get_proxy_server(),
+                                                     self._executable_path))
             return self._chrome
 
+    def warm_pool(self):
+        """
+        后台预先启动常驻浏览器
+        """
+        if not (Config().get_config('laboratory') or {}).get('chrome_pool_warm'):
+            return
+        if not self.get_status():
+            return
+        threading.Thread(target=get_pool().prestart,
+                         args=((self._headless, None, self._executable_path),),
+                         name="ChromePoolWarm",
+                         daemon=True).start()
+
     def get_status(self):
         if self._executable_path \
                 and not os.path.exists(self._executable_path):
             return False
-        if not uc.find_chrome_executable():
+        if not _uc().find_chrome_executable():
             return False
         return True
 
-    def __get_browser(self):
-        if not self.get_status():
+    def __get_proxy_server(self):
+        if not self._proxy:
             return None
-        options = uc.ChromeOptions()
+        proxy = Config().get_proxies().get("https")
+        if proxy:
+            proxy = proxy.split('/')[-1]
+        return proxy or None
+
+    @staticmethod
+    def create_browser(key):
+        """
+        启动浏览器，供实例池调用
+        :param key: (是否无头, 代理服务器, chromedriver路径)
+        """
+        headless, proxy, executable_path = key
+        options = _uc().ChromeOptions()
         options.add_argument('--disable-gpu')
         options.add_argument('--no-sandbox')
         options.add_argument('--ignore-certificate-errors')
@@ -76,21 +110,18 @@ class ChromeHelper(object):
         options.add_argument('--password-store=basic')
         if SystemUtils.is_windows() or SystemUtils.is_macos():
             options.add_argument("--window-position=-32000,-32000")
-        if self._proxy:
-            proxy = Config().get_proxies().get("https")
-            if proxy:
-                proxy = proxy.split('/')[-1]
-            options.add_argument('--proxy-server=%s' % proxy or '')
-        if self._headless:
+        if proxy:
+            options.add_argument('--proxy-server=%s' % proxy)
+        if headless:
             options.add_argument('--headless')
         prefs = {
             "useAutomationExtension": False,
-            "profile.managed_default_content_settings.images": 2 if self._headless else 1,
+            "profile.managed_default_content_settings.images": 2 if headless else 1,
             "excludeSwitches": ["enable-automation"]
         }
         options.add_argument('−−lang=zh-CN')
         options.add_experimental_option("prefs", prefs)
-        chrome = ChromeWithPrefs(options=options, driver_executable_path=self._executable_path)
+        chrome = _chrome_with_prefs()(options=options, driver_executable_path=executable_path)
         chrome.set_page_load_timeout(30)
         return chrome
 
@@ -178,71 +209,94 @@ class ChromeHelper(object):
             print(str(err))
             return None
 
-    def quit(self):
-        if self._chrome:
-            self._chrome.close()
-            self._chrome.quit()
-            self._fixup_uc_pid_leak()
-            self._chrome = None
-
-    def _fixup_uc_pid_leak(self):
+    def quit(self, discard=False):
         """
-        uc 在处理退出时为强制kill进程，没有调用wait，会导致出现僵尸进程，此处增加wait，确保系统正常回收
-        :return:
+        归还浏览器到实例池
+        :param discard: 是否直接关闭，浏览器状态异常时使用
         """
-        try:
-            # chromedriver 进程
-            if hasattr(self._chrome, "service") and getattr(self._chrome.service, "process", None):
-                self._chrome.service.process.wait(3)
-            # chrome 进程
-            os.waitpid(self._chrome.browser_pid, 0)
-        except Exception as e:
-            print(str(e))
-            pass
+        if self._chrome:
+            chrome, self._chrome = self._chrome, None
+            get_pool().release(chrome, discard=discard)
 
     def __del__(self):
         self.quit()
 
 
-class ChromeWithPrefs(uc.Chrome):
-    def __init__(self, *args, options=None, **kwargs):
-        if options:
-            self._handle_prefs(options)
-        super().__init__(*args, options=options, **kwargs)
-        # remove the user_data_dir when quitting
-        self.keep_user_data_dir = False
+def _uc():
+    """
+    延迟导入undetected_chromedriver，首次使用浏览器时才加载
+    """
+    import undetected_chromedriver as uc
+    return uc
+
+
+@lru_cache(maxsize=1)
+def _chrome_with_prefs():
+    """
+    支持prefs参数的Chrome类，依赖undetected_chromedriver，首次使用时创建
+    """
 
-    @staticmethod
-    def _handle_prefs(options):
-        if prefs := options.experimental_options.get("prefs"):
-            # turn a (dotted key, value) into a proper nested dict
-            def undot_key(key, value):
-                if "." in key:
-                    key, rest = key.split(".", 1)
-                    value = undot_key(rest, value)
-                return {key: value}
-
-            # undot prefs dict keys
-            undot_prefs = reduce(
-                lambda d1, d2: {**d1, **d2},  # merge dicts
-                (undot_key(key, value) for key, value in prefs.items()),
-            )
-
-            # create a user_data_dir and add its path to the options
-            user_data_dir = os.path.normpath(tempfile.mkdtemp())
-            options.add_argument(f"--user-data-dir={user_data_dir}")
-
-            # create the preferences json file in its default directory
-            default_dir = os.path.join(user_data_dir, "Default")
-            os.mkdir(default_dir)
-
-            prefs_file = os.path.join(default_dir, "Preferences")
-            with open(prefs_file, encoding="latin1", mode="w") as f:
-                json.dump(undot_prefs, f)
-
-            # pylint: disable=protected-access
-            # remove the experimental_options to avoid an error
-            del options._experimental_options["prefs"]
+    class ChromeWithPrefs(_uc().Chrome):
+        def __init__(self, *args, options=None, **kwargs):
+            if options:
+                self._handle_prefs(options)
+            super().__init__(*args, options=options, **kwargs)
+            # remove the user_data_dir when quitting
+            self.keep_user_data_dir = False
+
+        @staticmethod
+        def _handle_prefs(options):
+            if prefs := options.experimental_options.get("prefs"):
+                # turn a (dotted key, value) into a proper nested dict
+                def undot_key(key, value):
+                    if "." in key:
+                        key, rest = key.split(".", 1)
+                        value = undot_key(rest, value)
+                    return {key: value}
+
+                # undot prefs dict keys
+                undot_prefs = reduce(
+                    lambda d1, d2: {**d1, **d2},  # merge dicts
+                    (undot_key(key, value) for key, value in prefs.items()),
+                )
+
+                # create a user_data_dir and add its path to the options
+                user_data_dir = os.path.normpath(tempfile.mkdtemp())
+                options.add_argument(f"--user-data-dir={user_data_dir}")
+
+                # create the preferences json file in its default directory
+                default_dir = os.path.join(user_data_dir, "Default")
+                os.mkdir(default_dir)
+
+                prefs_file = os.path.join(default_dir, "Preferences")
+                with open(prefs_file, encoding="latin1", mode="w") as f:
+                    json.dump(undot_prefs, f)
+
+                # pylint: disable=protected-access
+                # remove the experimental_options to avoid an error
+                del options._experimental_options["prefs"]
+
+    return ChromeWithPrefs
+
+
+def get_pool():
+    """
+    获取浏览器实例池，大小和空闲回收时间读取实验室配置
+    """
+    global _pool
+    if _pool:
+        return _pool
+    with lock:
+        if not _pool:
+            laboratory = Config().get_config('laboratory') or {}
+            pool_size = laboratory.get('chrome_pool_size')
+            _pool = ChromePool(factory=ChromeHelper.create_browser,
+                               max_size=2 if pool_size is None else pool_size,
+                               warm_size=laboratory.get('chrome_pool_warm') or 0,
+                               idle_timeout=laboratory.get('chrome_pool_idle') or 300,
+                               lease_timeout=laboratory.get('chrome_pool_wait') or 0)
+            atexit.register(_pool.shutdown)
+    return _pool
 
 
 def init_chrome():
@@ -250,3 +304,4 @@ def init_chrome():
     初始化chrome驱动
     """
     ChromeHelper().init_driver()
+    ChromeHelper().warm_pool()
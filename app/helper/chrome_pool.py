@@ -0,0 +1,295 @@
+import os
+import threading
+import time
+
+import log
+from app.utils import ExceptionUtils
+
+
+class _PooledBrowser(object):
+    """
+    池中的浏览器实例
+    """
+
+    def __init__(self, key, driver):
+        self.key = key
+        self.driver = driver
+        # 最近一次归还的时间
+        self.released = time.time()
+        # 创建时的UA，归还时恢复
+        self.user_agent = None
+        try:
+            self.user_agent = driver.execute_script("return navigator.userAgent")
+        except Exception as err:
+            print(str(err))
+
+
+class ChromePool(object):
+    """
+    浏览器实例池：按启动参数（是否无头、代理）分组复用浏览器，借出时检查可用性，归还时清理Cookie、标签页和UA，
+    空闲超时的实例由后台线程关闭，池大小为0时不复用，每次借出新建、归还即关闭
+    """
+
+    def __init__(self, factory, max_size=2, warm_size=0, idle_timeout=300, reap_interval=60, lease_timeout=0):
+        """
+        :param factory: 创建浏览器的函数，参数为分组KEY，返回浏览器实例，失败返回None
+        :param max_size: 最多同时存在的浏览器实例数
+        :param warm_size: 常驻实例数，可预先启动，空闲超时后仍保留
+        :param idle_timeout: 空闲超时时间（秒）
+        :param reap_interval: 检查空闲实例的间隔（秒）
+        :param lease_timeout: 默认的最长等待可用实例时间（秒），0为一直等待到有实例归还
+        """
+        self._factory = factory
+        self._max_size = max(int(max_size or 0), 0)
+        self._warm_size = min(max(int(warm_size or 0), 0), self._max_size)
+        self._idle_timeout = idle_timeout
+        self._reap_interval = reap_interval
+        self._lease_timeout = lease_timeout
+        self._cond = threading.Condition()
+        # 空闲实例，最近归还的在后面
+        self._idle = []
+        # 借出中的实例：id(driver) -> _PooledBrowser
+        self._leased = {}
+        # 正在创建的实例数
+        self._creating = 0
+        self._reaper = None
+        self._closed = False
+        self._shutdown_event = threading.Event()
+
+    @property
+    def size(self):
+        return len(self._idle) + len(self._leased) + self._creating
+
+    def lease(self, key=None, timeout=None):
+        """
+        借出一个浏览器实例，没有空闲实例且已达上限时等待归还
+        :param key: 分组KEY，启动参数相同的浏览器才能复用
+        :param timeout: 最长等待时间（秒），为None时使用默认值，0为一直等待
+        :return: 浏览器实例，失败返回None
+        """
+        if timeout is None:
+            timeout = self._lease_timeout
+        deadline = time.time() + timeout if timeout else None
+        waiting = False
+        while True:
+            discards = []
+            browser = None
+            create = False
+            with self._cond:
+                if self._closed:
+                    return None
+                # 优先复用同组最近归还的实例
+                for i in range(len(self._idle) - 1, -1, -1):
+                    if self._idle[i].key == key:
+                        browser = self._idle.pop(i)
+                        break
+                if not browser:
+                    if self.size >= self._max_size and self._max_size and self._idle:
+                        # 已达上限时关闭其它分组最久未用的空闲实例
+                        discards.append(self._idle.pop(0))
+                    if not self._max_size or self.size < self._max_size:
+                        self._creating += 1
+                        create = True
+                    elif not discards:
+                        if not waiting:
+                            waiting = True
+                            log.debug(f"【Chrome】浏览器已全部占用（{len(self._leased)}/{self._max_size}），等待归还")
+                        if deadline is None:
+                            self._cond.wait()
+                            continue
+                        remain = deadline - time.time()
+                        if remain <= 0:
+                            log.warn(f"【Chrome】浏览器已全部占用（{len(self._leased)}/{self._max_size}），"
+                                     f"等待 {timeout} 秒后仍无可用浏览器，可调大浏览器实例池")
+                            return None
+                        self._cond.wait(remain)
+                        continue
+            for discard in discards:
+                self.__quit(discard.driver)
+            if browser:
+                # 检查实例是否可用，不可用时关闭后重新借出
+                if self.__is_alive(browser.driver):
+                    with self._cond:
+                        self._leased[id(browser.driver)] = browser
+                    return browser.driver
+                self.__quit(browser.driver)
+                with self._cond:
+                    self._cond.notify_all()
+                continue
+            if create:
+                return self.__create(key)
+
+    def release(self, driver, discard=False):
+        """
+        归还浏览器实例，清理失败或池大小为0时关闭
+        :param driver: 借出的浏览器实例
+        :param discard: 是否直接关闭
+        """
+        if not driver:
+            return
+        with self._cond:
+            browser = self._leased.pop(id(driver), None)
+        if not browser:
+            return
+        if discard or not self._max_size or self._closed or not self.__reset(browser):
+            self.__quit(driver)
+        else:
+            browser.released = time.time()
+            with self._cond:
+                self._idle.append(browser)
+                self.__start_reaper()
+        with self._cond:
+            self._cond.notify_all()
+
+    def prestart(self, key=None):
+        """
+        预先启动常驻实例，补足warm_size个空闲实例
+        :param key: 分组KEY
+        :return: 启动的实例数
+        """
+        count = 0
+        while True:
+            with self._cond:
+                if self._closed \
+                        or len(self._idle) + self._creating >= self._warm_size \
+                        or self.size >= self._max_size:
+                    return count
+                self._creating += 1
+            driver = self.__create(key)
+            if not driver:
+                return count
+            self.release(driver)
+            count += 1
+
+    def shutdown(self):
+        """
+        关闭所有空闲实例，借出中的实例归还时关闭
+        """
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        self._shutdown_event.set()
+        for browser in idle:
+            self.__quit(browser.driver)
+
+    def reap(self):
+        """
+        关闭空闲超时的实例，保留warm_size个实例
+        """
+        expired = []
+        with self._cond:
+            now = time.time()
+            keep = self._warm_size
+            # 从最近归还的开始保留
+            for browser in reversed(list(self._idle)):
+                if keep > 0:
+                    keep -= 1
+                    continue
+                if now - browser.released > self._idle_timeout:
+                    expired.append(browser)
+            for browser in expired:
+                self._idle.remove(browser)
+            if expired:
+                self._cond.notify_all()
+        for browser in expired:
+            log.debug("【Chrome】关闭空闲浏览器")
+            self.__quit(browser.driver)
+        return len(expired)
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                "max": self._max_size,
+                "idle": len(self._idle),
+                "leased": len(self._leased),
+                "creating": self._creating
+            }
+
+    def __create(self, key):
+        driver = None
+        try:
+            driver = self._factory(key)
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            log.error(f"【Chrome】浏览器启动失败：{str(err)}")
+        with self._cond:
+            self._creating -= 1
+            if driver:
+                self._leased[id(driver)] = _PooledBrowser(key, driver)
+            self._cond.notify_all()
+        return driver
+
+    def __start_reaper(self):
+        """
+        启动空闲回收线程，需在加锁后调用
+        """
+        if self._reaper and self._reaper.is_alive():
+            return
+        self._reaper = threading.Thread(target=self.__reap_loop, name="ChromePoolReaper", daemon=True)
+        self._reaper.start()
+
+    def __reap_loop(self):
+        """
+        定期回收空闲实例，没有可回收的实例后退出
+        """
+        while True:
+            self._shutdown_event.wait(self._reap_interval)
+            with self._cond:
+                if self._closed or len(self._idle) <= self._warm_size:
+                    self._reaper = None
+                    return
+            self.reap()
+
+    @staticmethod
+    def __is_alive(driver):
+        try:
+            _ = driver.current_url
+            return True
+        except Exception as err:
+            print(str(err))
+            return False
+
+    @staticmethod
+    def __reset(browser):
+        """
+        清理浏览器状态，避免下一个站点使用上一个站点的Cookie和UA
+        """
+        driver = browser.driver
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            if browser.user_agent:
+                driver.execute_cdp_cmd("Emulation.setUserAgentOverride", {
+                    "userAgent": browser.user_agent
+                })
+            driver.implicitly_wait(0)
+            driver.get("about:blank")
+            return True
+        except Exception as err:
+            print(str(err))
+            return False
+
+    @staticmethod
+    def __quit(driver):
+        """
+        关闭浏览器
+        uc 在处理退出时为强制kill进程，没有调用wait，会导致出现僵尸进程，此处增加wait，确保系统正常回收
+        """
+        try:
+            driver.quit()
+        except Exception as err:
+            print(str(err))
+        try:
+            # chromedriver 进程
+            if hasattr(driver, "service") and getattr(driver.service, "process", None):
+                driver.service.process.wait(3)
+            # chrome 进程
+            if getattr(driver, "browser_pid", None):
+                os.waitpid(driver.browser_pid, 0)
+        except Exception as err:
+            print(str(err))
@@ -1,9 +1,10 @@
 import datetime
 import os.path
+import re
 import time
 import json
 from enum import Enum
-from sqlalchemy import cast, func, and_, case
+from sqlalchemy import cast, func, and_, or_, case
 
 from app.db import MainDb, DbPersist
 from app.db.models import *
@@ -132,6 +133,7 @@ class DbHelper:
             dest_filename = ""
             season_episode = media_info.get_season_string()
         title = media_info.title
+        season, episode_start, episode_end = self.parse_season_episode(season_episode)
         timestr = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
         if self.is_transfer_history_exists(source_path, source_filename, dest_path, dest_filename):
             # 更新历史转移记录的时间
@@ -147,6 +149,9 @@ class DbHelper:
                 TITLE=title,
                 YEAR=media_info.year,
                 SEASON_EPISODE=season_episode,
+                SEASON=season,
+                EPISODE_START=episode_start,
+                EPISODE_END=episode_end,
                 SOURCE=str(in_from.value),
                 SOURCE_PATH=source_path,
                 SOURCE_FILENAME=source_filename,
@@ -184,22 +189,43 @@ class DbHelper:
         """
         return self._db.query(TRANSFERHISTORY).filter(TRANSFERHISTORY.ID == int(logid)).first()
 
+    @staticmethod
+    def parse_season_episode(season_episode):
+        """
+        将季集字符串（S01、S01 E02、S01 E02-E05）解析为季号、开始集号、结束集号
+        """
+        season, episode_start, episode_end = None, None, None
+        if not season_episode:
+            return season, episode_start, episode_end
+        season_match = re.search(r"S(\d+)", str(season_episode), re.IGNORECASE)
+        if season_match:
+            season = int(season_match.group(1))
+        episode_match = re.search(r"E(\d+)(?:-E(\d+))?", str(season_episode), re.IGNORECASE)
+        if episode_match:
+            episode_start = int(episode_match.group(1))
+            episode_end = int(episode_match.group(2) or episode_match.group(1))
+        return season, episode_start, episode_end
+
     def get_transfer_info_by(self, tmdbid, season=None, season_episode=None):
         """
         据tmdbid、season、season_episode查询转移记录
         """
+        if not tmdbid:
+            return None
         # 电视剧所有季集｜电影
-        if tmdbid and not season and not season_episode:
+        if not season and not season_episode:
             return self._db.query(TRANSFERHISTORY).filter(TRANSFERHISTORY.TMDBID == int(tmdbid)).all()
         # 电视剧某季
-        if tmdbid and season:
-            season = f"%{season}%"
+        if season:
+            season_num, _, _ = self.parse_season_episode(season)
             return self._db.query(TRANSFERHISTORY).filter(TRANSFERHISTORY.TMDBID == int(tmdbid),
-                                                          TRANSFERHISTORY.SEASON_EPISODE.like(season)).all()
+                                                          TRANSFERHISTORY.SEASON == season_num).all()
         # 电视剧某季某集
-        if tmdbid and season_episode:
-            return self._db.query(TRANSFERHISTORY).filter(TRANSFERHISTORY.TMDBID == int(tmdbid),
-                                                          TRANSFERHISTORY.SEASON_EPISODE == season_episode).all()
+        season_num, episode_num, _ = self.parse_season_episode(season_episode)
+        return self._db.query(TRANSFERHISTORY).filter(TRANSFERHISTORY.TMDBID == int(tmdbid),
+                                                      TRANSFERHISTORY.SEASON == season_num,
+                                                      TRANSFERHISTORY.EPISODE_START <= episode_num,
+                                                      TRANSFERHISTORY.EPISODE_END >= episode_num).all()
 
     def is_transfer_history_exists_by_source_full_path(self, source_full_path):
         """
@@ -1322,6 +1348,16 @@ class DbHelper:
                 "SITE": new_name
             }
         )
+        self._db.query(SITESTATISTICSDAILY).filter(SITESTATISTICSDAILY.SITE == old_name).update(
+            {
+                "SITE": new_name
+            }
+        )
+        self._db.query(SITESTATISTICSMONTHLY).filter(SITESTATISTICSMONTHLY.SITE == old_name).update(
+            {
+                "SITE": new_name
+            }
+        )
 
     @DbPersist(_db)
     def insert_site_statistics_history(self, site_user_infos: list):
@@ -1372,14 +1408,91 @@ class DbHelper:
                     }
                 )
 
+    @DbPersist(_db)
+    def update_site_statistics_rollup(self, site_user_infos: list, date=None):
+        """
+        更新站点数据日汇总和月汇总，与站点数据历史同时写入
+        日增量为当日总量减去之前最近一天总量不为0的数据，没有之前数据时增量为0
+        Cookie失效等原因总量为0的日期不作为基准，恢复后的增量包含中间缺失的日期
+        """
+        if not site_user_infos:
+            return
+        date = date or time.strftime('%Y-%m-%d', time.localtime(time.time()))
+        month = date[:7]
+        for site_user_info in site_user_infos:
+            url = site_user_info.site_url
+            upload = self.__num(site_user_info.upload)
+            download = self.__num(site_user_info.download)
+            prev = self._db.query(SITESTATISTICSDAILY).filter(
+                SITESTATISTICSDAILY.URL == url,
+                SITESTATISTICSDAILY.DATE < date,
+                or_(SITESTATISTICSDAILY.UPLOAD > 0, SITESTATISTICSDAILY.DOWNLOAD > 0)
+            ).order_by(SITESTATISTICSDAILY.DATE.desc()).first()
+            upload_inc = max(upload - prev.UPLOAD, 0) if prev and prev.UPLOAD else 0
+            download_inc = max(download - prev.DOWNLOAD, 0) if prev and prev.DOWNLOAD else 0
+            daily = {
+                "SITE": site_user_info.site_name,
+                "UPLOAD": upload,
+                "DOWNLOAD": download,
+                "UPLOAD_INC": upload_inc,
+                "DOWNLOAD_INC": download_inc,
+                "SEEDING": self.__num(site_user_info.seeding),
+                "SEEDING_SIZE": self.__num(site_user_info.seeding_size),
+                "BONUS": self.__num(site_user_info.bonus, float)
+            }
+            if not self._db.query(SITESTATISTICSDAILY).filter(SITESTATISTICSDAILY.URL == url,
+                                                              SITESTATISTICSDAILY.DATE == date).update(daily):
+                self._db.insert(SITESTATISTICSDAILY(URL=url, DATE=date, **daily))
+            # 月汇总只重新计算当月的日汇总
+            upload_inc, download_inc, days = self._db.query(
+                func.sum(SITESTATISTICSDAILY.UPLOAD_INC),
+                func.sum(SITESTATISTICSDAILY.DOWNLOAD_INC),
+                func.count(SITESTATISTICSDAILY.ID)
+            ).filter(SITESTATISTICSDAILY.URL == url,
+                     SITESTATISTICSDAILY.DATE.like(f"{month}-%")).first()
+            monthly = dict(daily,
+                           UPLOAD_INC=upload_inc or 0,
+                           DOWNLOAD_INC=download_inc or 0,
+                           DAYS=days or 0)
+            if not self._db.query(SITESTATISTICSMONTHLY).filter(SITESTATISTICSMONTHLY.URL == url,
+                                                                SITESTATISTICSMONTHLY.MONTH == month).update(monthly):
+                self._db.insert(SITESTATISTICSMONTHLY(URL=url, MONTH=month, **monthly))
+
+    @staticmethod
+    def __num(value, num_type=int):
+        """
+        站点数据转换为数值，无法转换时为0
+        """
+        try:
+            return num_type(float(value or 0))
+        except (TypeError, ValueError):
+            return num_type(0)
+
     def get_site_statistics_history(self, site, days=30):
         """
-        查询站点数据历史
+        查询站点数据历史，从日汇总中取最近的天数，按日期升序
         """
-        return self._db.query(SITESTATISTICSHISTORY).filter(
-            SITESTATISTICSHISTORY.SITE == site).order_by(
-            SITESTATISTICSHISTORY.DATE.asc()
-        ).limit(days)
+        rows = self._db.query(SITESTATISTICSDAILY).filter(
+            SITESTATISTICSDAILY.SITE == site).order_by(
+            SITESTATISTICSDAILY.DATE.desc()
+        ).limit(days).all()
+        return rows[::-1]
+
+    def get_site_statistics_monthly(self, months=12, strict_urls=None):
+        """
+        查询站点数据月汇总
+        :param months: 最近几个月
+        :param strict_urls: 需要的站点URL的列表
+        """
+        month_list = self._db.query(SITESTATISTICSMONTHLY.MONTH).distinct().order_by(
+            SITESTATISTICSMONTHLY.MONTH.desc()).limit(months).all()
+        if not month_list:
+            return []
+        query = self._db.query(SITESTATISTICSMONTHLY).filter(
+            SITESTATISTICSMONTHLY.MONTH >= month_list[-1][0])
+        if strict_urls:
+            query = query.filter(SITESTATISTICSMONTHLY.URL.in_(tuple(strict_urls)))
+        return query.order_by(SITESTATISTICSMONTHLY.MONTH.asc(), SITESTATISTICSMONTHLY.SITE.asc()).all()
 
     def get_site_seeding_info(self, site):
         """
@@ -1421,62 +1534,32 @@ class DbHelper:
         b_date = (end - datetime.timedelta(days=days)).strftime("%Y-%m-%d")
         # 结束时间
         e_date = end.strftime("%Y-%m-%d")
-        # 大于开始时间范围里的最大日期与最小日期
-        date_ret = self._db.query(func.max(SITESTATISTICSHISTORY.DATE),
-                                  func.MIN(SITESTATISTICSHISTORY.DATE)).filter(
-            SITESTATISTICSHISTORY.DATE > b_date, SITESTATISTICSHISTORY.DATE <= e_date).all()
-        if date_ret and date_ret[0][0]:
-            total_upload = 0
-            total_download = 0
-            ret_site_uploads = []
-            ret_site_downloads = []
-            min_date = date_ret[0][1]
-            max_date = date_ret[0][0]
-            # 查询开始值
-            if strict_urls:
-                subquery = self._db.query(SITESTATISTICSHISTORY.SITE.label("SITE"),
-                                          SITESTATISTICSHISTORY.DATE.label("DATE"),
-                                          func.sum(SITESTATISTICSHISTORY.UPLOAD).label("UPLOAD"),
-                                          func.sum(SITESTATISTICSHISTORY.DOWNLOAD).label("DOWNLOAD")).filter(
-                    SITESTATISTICSHISTORY.DATE >= min_date,
-                    SITESTATISTICSHISTORY.DATE <= max_date,
-                    SITESTATISTICSHISTORY.URL.in_(tuple(strict_urls + ["__DUMMY__"]))
-                ).group_by(SITESTATISTICSHISTORY.SITE, SITESTATISTICSHISTORY.DATE).subquery()
-            else:
-                subquery = self._db.query(SITESTATISTICSHISTORY.SITE.label("SITE"),
-                                          SITESTATISTICSHISTORY.DATE.label("DATE"),
-                                          func.sum(SITESTATISTICSHISTORY.UPLOAD).label("UPLOAD"),
-                                          func.sum(SITESTATISTICSHISTORY.DOWNLOAD).label("DOWNLOAD")).filter(
-                    SITESTATISTICSHISTORY.DATE >= min_date,
-                    SITESTATISTICSHISTORY.DATE <= max_date
-                ).group_by(SITESTATISTICSHISTORY.SITE, SITESTATISTICSHISTORY.DATE).subquery()
-            # 查询大于开始时间范围里的单日,单站点 最大值与最小值
-            rets = self._db.query(subquery.c.SITE,
-                                  func.min(subquery.c.UPLOAD),
-                                  func.min(subquery.c.DOWNLOAD),
-                                  func.max(subquery.c.UPLOAD),
-                                  func.max(subquery.c.DOWNLOAD)).group_by(subquery.c.SITE).all()
-            ret_sites = []
-            for ret_b in rets:
-                # 如果最小值都是0，可能时由于近几日没有更新数据，或者cookie过期，正常有数据的话，第二天能正常
-                ret_b = list(ret_b)
-                if ret_b[1] == 0 and ret_b[2] == 0:
-                    ret_b[1] = ret_b[3]
-                    ret_b[2] = ret_b[4]
-                ret_sites.append(ret_b[0])
-                if int(ret_b[1]) < int(ret_b[3]):
-                    total_upload += int(ret_b[3]) - int(ret_b[1])
-                    ret_site_uploads.append(int(ret_b[3]) - int(ret_b[1]))
-                else:
-                    ret_site_uploads.append(0)
-                if int(ret_b[2]) < int(ret_b[4]):
-                    total_download += int(ret_b[4]) - int(ret_b[2])
-                    ret_site_downloads.append(int(ret_b[4]) - int(ret_b[2]))
-                else:
-                    ret_site_downloads.append(0)
-            return total_upload, total_download, ret_sites, ret_site_uploads, ret_site_downloads
-        else:
+        # 开始时间范围里的最小日期，其增量是相对范围外的数据，不计入
+        min_date = self._db.query(func.min(SITESTATISTICSDAILY.DATE)).filter(
+            SITESTATISTICSDAILY.DATE > b_date, SITESTATISTICSDAILY.DATE <= e_date).scalar()
+        if not min_date:
             return 0, 0, [], [], []
+        # 按站点汇总日增量
+        query = self._db.query(SITESTATISTICSDAILY.SITE,
+                               func.sum(SITESTATISTICSDAILY.UPLOAD_INC),
+                               func.sum(SITESTATISTICSDAILY.DOWNLOAD_INC)).filter(
+            SITESTATISTICSDAILY.DATE > min_date,
+            SITESTATISTICSDAILY.DATE <= e_date)
+        if strict_urls:
+            query = query.filter(SITESTATISTICSDAILY.URL.in_(tuple(strict_urls + ["__DUMMY__"])))
+        rets = query.group_by(SITESTATISTICSDAILY.SITE).all()
+        total_upload = 0
+        total_download = 0
+        ret_sites = []
+        ret_site_uploads = []
+        ret_site_downloads = []
+        for site, upload_inc, download_inc in rets:
+            ret_sites.append(site)
+            ret_site_uploads.append(upload_inc or 0)
+            ret_site_downloads.append(download_inc or 0)
+            total_upload += upload_inc or 0
+            total_download += download_inc or 0
+        return total_upload, total_download, ret_sites, ret_site_uploads, ret_site_downloads
 
     def is_exists_download_history(self, enclosure, downloader, download_id):
         """
@@ -1825,6 +1908,17 @@ class DbHelper:
         self._db.query(SITEBRUSHTORRENTS).filter(SITEBRUSHTORRENTS.TASK_ID == brush_id,
                                                  SITEBRUSHTORRENTS.DOWNLOAD_ID == download_id).delete()
 
+    @DbPersist(_db)
+    def delete_brushtask_torrents(self, brush_id, download_ids):
+        """
+        批量删除刷流种子记录
+        """
+        if not download_ids or not brush_id:
+            return
+        self._db.query(SITEBRUSHTORRENTS).filter(SITEBRUSHTORRENTS.TASK_ID == brush_id,
+                                                 SITEBRUSHTORRENTS.DOWNLOAD_ID.in_(download_ids)
+                                                 ).delete(synchronize_session=False)
+
     @DbPersist(_db)
     def add_filter_group(self, name, default='N'):
         """
@@ -2710,3 +2804,82 @@ class DbHelper:
         """
         self._db.query(PLUGINHISTORY).filter(PLUGINHISTORY.PLUGIN_ID == plugin_id,
                                              PLUGINHISTORY.KEY == key).delete()
+
+    @DbPersist(_db)
+    def save_plugin_histories(self, histories):
+        """
+        在一个事务中批量写入插件运行记录
+        :param histories: [(插件ID, {KEY: 新增的值}, {KEY: 更新的值}, [删除的KEY])]
+        """
+        date = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
+        for plugin_id, inserts, updates, deletes in histories:
+            for i in range(0, len(deletes), 500):
+                self._db.query(PLUGINHISTORY).filter(PLUGINHISTORY.PLUGIN_ID == plugin_id,
+                                                     PLUGINHISTORY.KEY.in_(deletes[i:i + 500])
+                                                     ).delete(synchronize_session=False)
+            for key, value in updates.items():
+                self._db.query(PLUGINHISTORY).filter(PLUGINHISTORY.PLUGIN_ID == plugin_id,
+                                                     PLUGINHISTORY.KEY == key).update(
+                    {
+                        "VALUE": value
+                    }
+                )
+            if inserts:
+                self._db.insert([PLUGINHISTORY(
+                    PLUGIN_ID=plugin_id,
+                    KEY=key,
+                    VALUE=value,
+                    DATE=date
+                ) for key, value in inserts.items()])
+
+    def get_douban_medias(self, douban_ids):
+        """
+        批量查询已保存的豆瓣条目信息
+        :param douban_ids: 豆瓣ID列表
+        :return: {豆瓣ID: 条目信息}
+        """
+        if not douban_ids:
+            return {}
+        douban_ids = [str(douban_id) for douban_id in douban_ids]
+        medias = {}
+        # SQLite单条语句的参数数量有限，分批查询
+        for i in range(0, len(douban_ids), 500):
+            for media in self._db.query(DOUBANMEDIAS).filter(
+                    DOUBANMEDIAS.DOUBAN_ID.in_(douban_ids[i:i + 500])).all():
+                medias[media.DOUBAN_ID] = media
+        return medias
+
+    @DbPersist(_db)
+    def insert_douban_media(self, douban_id, mtype, title, year=None, imdb_id=None, rating=None, image=None,
+                            overview=None, original_title=None):
+        """
+        保存豆瓣条目信息，已存在时更新
+        """
+        if not douban_id:
+            return
+        values = {
+            "TYPE": mtype,
+            "TITLE": title,
+            "ORIGINAL_TITLE": original_title,
+            "YEAR": year,
+            "IMDB_ID": imdb_id,
+            "RATING": rating,
+            "IMAGE": image,
+            "OVERVIEW": overview,
+            "DATE": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
+        }
+        if not self._db.query(DOUBANMEDIAS).filter(DOUBANMEDIAS.DOUBAN_ID == str(douban_id)).update(values):
+            self._db.insert(DOUBANMEDIAS(DOUBAN_ID=str(douban_id), **values))
+
+    @DbPersist(_db)
+    def update_douban_media_tmdbid(self, douban_id, tmdb_id):
+        """
+        记录豆瓣条目识别到的TMDBID
+        """
+        if not douban_id or not tmdb_id:
+            return
+        self._db.query(DOUBANMEDIAS).filter(DOUBANMEDIAS.DOUBAN_ID == str(douban_id)).update(
+            {
+                "TMDB_ID": str(tmdb_id)
+            }
+        )
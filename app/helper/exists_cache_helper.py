@@ -0,0 +1,111 @@
+import threading
+import time
+
+from cacheout import Cache
+
+import log
+from app.utils.commons import singleton
+from app.utils.types import EventType
+
+
+class _Flight(object):
+    """
+    进行中的查询，同一KEY的并发调用方共用查询结果
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        # 查询期间缓存被置为失效，结果不写入缓存
+        self.stale = False
+
+
+@singleton
+class ExistsCacheHelper(object):
+    """
+    媒体库存在性查询缓存：以 (TMDBID, 季, ...) 为KEY缓存媒体服务器和文件系统的查询结果，
+    短时间内重复检查同一媒体时直接返回，同一KEY并发查询时只查询一次；
+    转移完成、媒体库文件删除、媒体服务器入库/删除通知和刷新媒体库时使对应缓存失效
+    """
+    # 缓存时间（秒）
+    _ttl = 300
+    # 媒体服务器中表示媒体库变化的通知
+    _library_events = ["library.new", "library.deleted", "ItemAdded", "ItemDeleted"]
+
+    def __init__(self):
+        self._cache = Cache(maxsize=1024, ttl=self._ttl, timer=time.time, default=None)
+        self._lock = threading.Lock()
+        # KEY -> 进行中的查询
+        self._flights = {}
+
+    def get(self, key, loader):
+        """
+        查询缓存，未命中时调用loader查询并缓存结果，TMDBID为空时不缓存
+        :param key: 元组，第一个元素为TMDBID
+        :param loader: 查询函数
+        """
+        if not key or not key[0]:
+            return loader()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached[0]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.event.wait()
+            if flight.error is None:
+                return flight.result
+            # 查询出错时各自重新查询
+            return loader()
+        try:
+            flight.result = loader()
+        except Exception as err:
+            flight.error = err
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                if flight.error is None and not flight.stale:
+                    # 查询结果可能为None，包装后缓存
+                    self._cache.set(key, (flight.result,))
+            flight.event.set()
+        return flight.result
+
+    def invalidate(self, tmdbid=None):
+        """
+        使缓存失效
+        :param tmdbid: 为空时全部失效
+        """
+        with self._lock:
+            if tmdbid:
+                tmdbid = str(tmdbid)
+                self._cache.delete_many(lambda key: str(key[0]) == tmdbid)
+                flights = [flight for key, flight in self._flights.items() if str(key[0]) == tmdbid]
+            else:
+                self._cache.clear()
+                flights = list(self._flights.values())
+            for flight in flights:
+                flight.stale = True
+        log.debug(f"【Downloader】媒体库存在性缓存已失效：{tmdbid or '全部'}")
+
+    def invalidate_by_event(self, etype, data):
+        """
+        根据事件使缓存失效
+        """
+        if etype in [EventType.TransferFinished, EventType.LibraryFileDeleted]:
+            media_info = (data or {}).get("media_info")
+            # 媒体库文件删除事件中为tmdbid
+            tmdbid = (media_info.get("tmdb_id") or media_info.get("tmdbid")) \
+                if isinstance(media_info, dict) else None
+            self.invalidate(tmdbid)
+        elif etype in [EventType.EmbyWebhook, EventType.JellyfinWebhook, EventType.PlexWebhook]:
+            data = data or {}
+            event = data.get("Event") or data.get("NotificationType") or data.get("event")
+            if event in self._library_events:
+                self.invalidate()
+        elif etype == EventType.RefreshMediaServer:
+            self.invalidate()
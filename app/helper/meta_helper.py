@@ -25,7 +25,7 @@ class MetaHelper(object):
         "type": MediaType
     }
     """
-    _meta_data = {}
+    _cache_data = None
 
     _meta_path = None
     _tmdb_cache_expire = False
@@ -38,7 +38,30 @@ class MetaHelper(object):
         if laboratory:
             self._tmdb_cache_expire = laboratory.get("tmdb_cache_expire")
         self._meta_path = os.path.join(Config().get_config_path(), 'tmdb.dat')
-        self._meta_data = self.__load_meta_data(self._meta_path)
+        # 缓存文件在首次使用或后台预热时加载
+        self._cache_data = None
+
+    @property
+    def _meta_data(self):
+        """
+        缓存数据，未加载时从文件加载
+        """
+        if self._cache_data is None:
+            with lock:
+                if self._cache_data is None:
+                    self._cache_data = self.__load_meta_data(self._meta_path)
+        return self._cache_data
+
+    @_meta_data.setter
+    def _meta_data(self, meta_data):
+        self._cache_data = meta_data
+
+    def warmup(self):
+        """
+        预加载缓存文件
+        :return: 缓存条目数
+        """
+        return len(self._meta_data)
 
     def clear_meta_data(self):
         """
@@ -164,6 +187,9 @@ class MetaHelper(object):
         """
         保存缓存数据到文件
         """
+        # 缓存未加载过，没有需要保存的数据
+        if self._cache_data is None:
+            return
         meta_data = self.__load_meta_data(self._meta_path)
         new_meta_data = {k: v for k, v in self._meta_data.items() if str(v.get("id")) != '0'}
 
@@ -1,7 +1,5 @@
 import json
 
-import openai
-
 from app.utils import OpenAISessionCache
 from app.utils.commons import singleton
 from config import Config
@@ -17,9 +15,12 @@ class OpenAiHelper:
 
     def init_config(self):
         self._api_key = Config().get_config("openai").get("api_key")
-        if self._api_key:
-            openai.api_key = self._api_key
         self._api_url = Config().get_config("openai").get("api_url")
+        if not self._api_key:
+            return
+        # 配置了api_key才加载openai库
+        import openai
+        openai.api_key = self._api_key
         if self._api_url:
             openai.api_base = self._api_url + "/v1"
         else:
@@ -99,6 +100,7 @@ class OpenAiHelper:
                         "content": message
                     }
                 ]
+        import openai
         return openai.ChatCompletion.create(
             model="gpt-3.5-turbo",
             user=user,
@@ -145,6 +147,7 @@ class OpenAiHelper:
         """
         if not self.get_state():
             return ""
+        import openai
         try:
             if not userid:
                 return "用户信息错误"
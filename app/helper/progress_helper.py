@@ -1,3 +1,4 @@
+import threading
 from enum import Enum
 
 from app.utils.commons import singleton
@@ -6,10 +7,16 @@ from app.utils.types import ProgressKey
 
 @singleton
 class ProgressHelper(object):
+    """
+    进度信息，每次变化时版本号加一并唤醒等待的订阅方，订阅方按各自的版本号判断是否有更新
+    """
     _process_detail = {}
 
     def __init__(self):
         self._process_detail = {}
+        # 进度类型 -> 版本号
+        self._versions = {}
+        self._cond = threading.Condition()
 
     def init_config(self):
         pass
@@ -23,11 +30,20 @@ class ProgressHelper(object):
             "text": "请稍候..."
         }
 
+    def __publish(self, ptype):
+        """
+        发布进度变化
+        """
+        with self._cond:
+            self._versions[ptype] = self._versions.get(ptype, 0) + 1
+            self._cond.notify_all()
+
     def start(self, ptype=ProgressKey.Search):
         self.__reset(ptype)
         if isinstance(ptype, Enum):
             ptype = ptype.value
         self._process_detail[ptype]['enable'] = True
+        self.__publish(ptype)
 
     def end(self, ptype=ProgressKey.Search):
         if isinstance(ptype, Enum):
@@ -35,6 +51,7 @@ class ProgressHelper(object):
         if not self._process_detail.get(ptype):
             return
         self._process_detail[ptype]['enable'] = False
+        self.__publish(ptype)
 
     def update(self, value=None, text=None, ptype=ProgressKey.Search):
         if isinstance(ptype, Enum):
@@ -45,8 +62,24 @@ class ProgressHelper(object):
             self._process_detail[ptype]['value'] = value
         if text:
             self._process_detail[ptype]['text'] = text
+        if value or text:
+            self.__publish(ptype)
 
     def get_process(self, ptype=ProgressKey.Search):
         if isinstance(ptype, Enum):
             ptype = ptype.value
         return self._process_detail.get(ptype)
+
+    def wait(self, ptype=ProgressKey.Search, version=0, timeout=None):
+        """
+        等待进度变化
+        :param ptype: 进度类型
+        :param version: 订阅方已读取的版本号
+        :param timeout: 最长等待时间（秒）
+        :return: 当前版本号，超时未变化时与传入的版本号相同
+        """
+        if isinstance(ptype, Enum):
+            ptype = ptype.value
+        with self._cond:
+            self._cond.wait_for(lambda: self._versions.get(ptype, 0) != version, timeout)
+            return self._versions.get(ptype, 0)
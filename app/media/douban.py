@@ -1,11 +1,9 @@
-import random
 from threading import Lock
-from time import sleep
 
 import zhconv
 
 import log
-from app.media.doubanapi import DoubanApi, DoubanWeb
+from app.media.doubanapi import DoubanApi, DoubanWeb, douban_rate_limiter
 from app.media.meta import MetaInfo
 from app.utils import ExceptionUtils, StringUtils
 from app.utils import RequestUtils
@@ -40,14 +38,11 @@ class DouBan:
 
     def get_douban_detail(self, doubanid, mtype=None, wait=False):
         """
-        根据豆瓣ID返回豆瓣详情，带休眠
+        根据豆瓣ID返回豆瓣详情，wait为真时按共用的限流器控制访问频率
         """
         log.info("【Douban】正在通过API查询豆瓣详情：%s" % doubanid)
-        # 随机休眠
         if wait:
-            time = round(random.uniform(1, 5), 1)
-            log.info("【Douban】随机休眠：%s 秒" % time)
-            sleep(time)
+            self.__wait()
         if mtype == MediaType.MOVIE:
             douban_info = self.doubanapi.movie_detail(doubanid)
         elif mtype:
@@ -58,10 +53,16 @@ class DouBan:
                 douban_info = self.doubanapi.tv_detail(doubanid)
         if not douban_info:
             log.warn("【Douban】%s 未找到豆瓣详细信息" % doubanid)
+            if wait:
+                douban_rate_limiter.failure()
             return None
         if douban_info.get("localized_message"):
             log.warn("【Douban】查询豆瓣详情错误：%s" % douban_info.get("localized_message"))
+            if wait:
+                douban_rate_limiter.failure()
             return None
+        if wait:
+            douban_rate_limiter.success()
         if not douban_info.get("title"):
             return None
         if douban_info.get("title") == "未知电影" or douban_info.get("title") == "未知电视剧":
@@ -69,6 +70,15 @@ class DouBan:
         log.info("【Douban】查询到数据：%s" % douban_info.get("title"))
         return douban_info
 
+    @staticmethod
+    def __wait():
+        """
+        按共用的限流器等待，取代固定的随机休眠
+        """
+        wait = douban_rate_limiter.acquire()
+        if wait:
+            log.debug("【Douban】限流等待：%.1f 秒" % wait)
+
     def __search_douban_id(self, metainfo):
         """
         给定名称和年份，查询一条豆瓣信息返回对应ID
@@ -130,9 +140,7 @@ class DouBan:
         获取最新动态中的想看/在看/看过数据
         """
         if wait:
-            time = round(random.uniform(1, 5), 1)
-            log.info("【Douban】随机休眠：%s 秒" % time)
-            sleep(time)
+            self.__wait()
         if dtype == "do":
             web_infos = self.doubanweb.do_in_interests(userid=userid)
         elif dtype == "collect":
@@ -143,6 +151,8 @@ class DouBan:
             web_infos = self.doubanweb.interests(userid=userid)
         if not web_infos:
             return []
+        if wait:
+            douban_rate_limiter.success()
         for web_info in web_infos:
             web_info["id"] = web_info.get("url").split("/")[-2]
         return web_infos
@@ -153,9 +163,7 @@ class DouBan:
         获取豆瓣想看列表数据
         """
         if wait:
-            time = round(random.uniform(1, 5), 1)
-            log.info("【Douban】随机休眠：%s 秒" % time)
-            sleep(time)
+            self.__wait()
         if dtype == "do":
             web_infos = self.doubanweb.do(cookie=self.cookie, userid=userid, start=start)
         elif dtype == "collect":
@@ -164,15 +172,15 @@ class DouBan:
             web_infos = self.doubanweb.wish(cookie=self.cookie, userid=userid, start=start)
         if not web_infos:
             return []
+        if wait:
+            douban_rate_limiter.success()
         for web_info in web_infos:
             web_info["id"] = web_info.get("url").split("/")[-2]
         return web_infos
 
     def get_user_info(self, userid, wait=False):
         if wait:
-            time = round(random.uniform(1, 5), 1)
-            log.info("【Douban】随机休眠：%s 秒" % time)
-            sleep(time)
+            self.__wait()
         return self.doubanweb.user(cookie=self.cookie, userid=userid)
 
     def search_douban_medias(self, keyword, mtype: MediaType = None, season=None, episode=None, page=1):
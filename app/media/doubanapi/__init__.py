@@ -1,2 +1,3 @@
 from .apiv2 import DoubanApi
 from .webapi import DoubanWeb
+from .ratelimit import DoubanRateLimiter, douban_rate_limiter
@@ -2,8 +2,10 @@
 import base64
 import hashlib
 import hmac
-from datetime import datetime
-from functools import lru_cache
+import os
+import threading
+import time
+from datetime import datetime, timedelta
 from random import choice
 from urllib import parse
 
@@ -11,6 +13,13 @@ import requests
 
 from app.utils import RequestUtils
 from app.utils.commons import singleton
+from config import Config
+from .cache import ResponseCache
+
+lock = threading.Lock()
+
+# 详情类接口缓存时间（秒），列表类接口当天有效
+DETAIL_CACHE_EXPIRE = 3 * 24 * 3600
 
 
 @singleton
@@ -150,10 +159,38 @@ class DoubanApi(object):
     _base_url = "https://frodo.douban.com/api/v2"
     _api_url = "https://api.douban.com/v2"
     _session = requests.Session()
+    _cache = None
 
     def __init__(self):
         pass
 
+    @classmethod
+    def __get_cache(cls):
+        """
+        获取响应缓存，缓存文件存放在配置目录下
+        """
+        if cls._cache is None:
+            with lock:
+                if cls._cache is None:
+                    cls._cache = ResponseCache(path=os.path.join(Config().get_config_path(), "douban_api.db"))
+        return cls._cache
+
+    @staticmethod
+    def __get_expires(params):
+        """
+        计算缓存过期时间：带分页参数的列表类接口到当天结束过期，其它接口按固定时间过期
+        """
+        if "start" in params or "count" in params:
+            tomorrow = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            return tomorrow.timestamp()
+        return time.time() + DETAIL_CACHE_EXPIRE
+
+    def clear_cache(self):
+        """
+        清空响应缓存
+        """
+        self.__get_cache().clear()
+
     @classmethod
     def __sign(cls, url: str, ts: int, method='GET') -> str:
         url_path = parse.urlparse(url).path
@@ -162,23 +199,27 @@ class DoubanApi(object):
                                 ).decode()
 
     @classmethod
-    @lru_cache(maxsize=256)
     def __invoke(cls, url, **kwargs):
         req_url = cls._base_url + url
 
         params = {'apiKey': cls._api_key}
         if kwargs:
             params.update(kwargs)
+        # 签名时间戳按调用时计算，不参与缓存KEY
+        ts = params.pop('_ts', None) or int(datetime.strftime(datetime.now(), '%Y%m%d'))
 
-        ts = params.pop('_ts', int(datetime.strftime(datetime.now(), '%Y%m%d')))
-        params.update({'os_rom': 'android', 'apiKey': cls._api_key, '_ts': ts, '_sig': cls.__sign(url=req_url, ts=ts)})
-
-        headers = {'User-Agent': choice(cls._user_agents)}
-        resp = RequestUtils(headers=headers, session=cls._session).get_res(url=req_url, params=params)
+        def fetch():
+            req_params = dict(params)
+            req_params.update({'os_rom': 'android', 'apiKey': cls._api_key, '_ts': ts,
+                               '_sig': cls.__sign(url=req_url, ts=ts)})
+            headers = {'User-Agent': choice(cls._user_agents)}
+            resp = RequestUtils(headers=headers, session=cls._session).get_res(url=req_url, params=req_params)
+            return resp.json() if resp else {}
 
-        return resp.json() if resp else {}
+        return cls.__get_cache().get_or_fetch(key=ResponseCache.make_key("GET", req_url, params),
+                                              fetch=fetch,
+                                              expires=cls.__get_expires(params))
 
-    @lru_cache(maxsize=512)
     def __post(self, url: str, **kwargs) -> dict:
         """
         POST请求
@@ -199,55 +240,69 @@ class DoubanApi(object):
             params.update(kwargs)
         if '_ts' in params:
             params.pop('_ts')
-        headers = {'User-Agent': choice(cls._user_agents)}
-        resp = RequestUtils(headers=headers, session=self._session).post_res(url=req_url, data=params)
-        if resp.status_code == 400 and "rate_limit" in resp.text:
-            return resp.json()
-        return resp.json() if resp else {}
 
-    def search(self, keyword, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+        def fetch():
+            headers = {'User-Agent': choice(self._user_agents)}
+            resp = RequestUtils(headers=headers, session=self._session).post_res(url=req_url, data=params)
+            if resp is None:
+                return {}
+            if resp.status_code == 400 and "rate_limit" in resp.text:
+                return resp.json()
+            return resp.json() if resp else {}
+
+        def expires(result):
+            # 触发流控的结果不缓存
+            if "rate_limit" in str(result.get("msg") or ""):
+                return None
+            return self.__get_expires(params)
+
+        return self.__get_cache().get_or_fetch(key=ResponseCache.make_key("POST", req_url, params),
+                                               fetch=fetch,
+                                               expires=expires)
+
+    def search(self, keyword, start=0, count=20, ts=None):
         return self.__invoke(self._urls["search"], q=keyword, start=start, count=count, _ts=ts)
 
-    def imdbid(self, imdbid: str, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def imdbid(self, imdbid: str, ts=None):
         """
         IMDBID搜索
         """
         return self.__post(self._urls["imdbid"] % imdbid, _ts=ts)
 
-    def movie_search(self, keyword, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def movie_search(self, keyword, start=0, count=20, ts=None):
         return self.__invoke(self._urls["movie_search"], q=keyword, start=start, count=count, _ts=ts)
 
-    def tv_search(self, keyword, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def tv_search(self, keyword, start=0, count=20, ts=None):
         return self.__invoke(self._urls["tv_search"], q=keyword, start=start, count=count, _ts=ts)
 
-    def book_search(self, keyword, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def book_search(self, keyword, start=0, count=20, ts=None):
         return self.__invoke(self._urls["book_search"], q=keyword, start=start, count=count, _ts=ts)
 
-    def group_search(self, keyword, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def group_search(self, keyword, start=0, count=20, ts=None):
         return self.__invoke(self._urls["group_search"], q=keyword, start=start, count=count, _ts=ts)
 
-    def movie_showing(self, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def movie_showing(self, start=0, count=20, ts=None):
         return self.__invoke(self._urls["movie_showing"], start=start, count=count, _ts=ts)
 
-    def movie_soon(self, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def movie_soon(self, start=0, count=20, ts=None):
         return self.__invoke(self._urls["movie_soon"], start=start, count=count, _ts=ts)
 
-    def movie_hot_gaia(self, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def movie_hot_gaia(self, start=0, count=20, ts=None):
         return self.__invoke(self._urls["movie_hot_gaia"], start=start, count=count, _ts=ts)
 
-    def tv_hot(self, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def tv_hot(self, start=0, count=20, ts=None):
         return self.__invoke(self._urls["tv_hot"], start=start, count=count, _ts=ts)
 
-    def tv_animation(self, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def tv_animation(self, start=0, count=20, ts=None):
         return self.__invoke(self._urls["tv_animation"], start=start, count=count, _ts=ts)
 
-    def tv_variety_show(self, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def tv_variety_show(self, start=0, count=20, ts=None):
         return self.__invoke(self._urls["tv_variety_show"], start=start, count=count, _ts=ts)
 
-    def tv_rank_list(self, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def tv_rank_list(self, start=0, count=20, ts=None):
         return self.__invoke(self._urls["tv_rank_list"], start=start, count=count, _ts=ts)
 
-    def show_hot(self, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def show_hot(self, start=0, count=20, ts=None):
         return self.__invoke(self._urls["show_hot"], start=start, count=count, _ts=ts)
 
     def movie_detail(self, subject_id):
@@ -265,19 +320,19 @@ class DoubanApi(object):
     def book_detail(self, subject_id):
         return self.__invoke(self._urls["book_detail"] + subject_id)
 
-    def movie_top250(self, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def movie_top250(self, start=0, count=20, ts=None):
         return self.__invoke(self._urls["movie_top250"], start=start, count=count, _ts=ts)
 
-    def movie_recommend(self, tags='', sort='R', start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def movie_recommend(self, tags='', sort='R', start=0, count=20, ts=None):
         return self.__invoke(self._urls["movie_recommend"], tags=tags, sort=sort, start=start, count=count, _ts=ts)
 
-    def tv_recommend(self, tags='', sort='R', start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def tv_recommend(self, tags='', sort='R', start=0, count=20, ts=None):
         return self.__invoke(self._urls["tv_recommend"], tags=tags, sort=sort, start=start, count=count, _ts=ts)
 
-    def tv_chinese_best_weekly(self, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def tv_chinese_best_weekly(self, start=0, count=20, ts=None):
         return self.__invoke(self._urls["tv_chinese_best_weekly"], start=start, count=count, _ts=ts)
 
-    def tv_global_best_weekly(self, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def tv_global_best_weekly(self, start=0, count=20, ts=None):
         return self.__invoke(self._urls["tv_global_best_weekly"], start=start, count=count, _ts=ts)
 
     def doulist_detail(self, subject_id):
@@ -331,7 +386,7 @@ class DoubanApi(object):
         """
         return self.__invoke(self._urls["doulist"] + subject_id)
 
-    def doulist_items(self, subject_id, start=0, count=20, ts=datetime.strftime(datetime.now(), '%Y%m%d')):
+    def doulist_items(self, subject_id, start=0, count=20, ts=None):
         """
         豆列列表
         :param subject_id: 豆列id
@@ -0,0 +1,152 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class ResponseCache(object):
+    """
+    豆瓣接口响应缓存，内存+SQLite两级存储，多线程共享，相同请求并发时只发起一次
+    """
+
+    # 每写入多少条检查一次数据库条数
+    _evict_interval = 100
+
+    def __init__(self, path=None, maxsize=1024, max_rows=20000):
+        """
+        :param path: SQLite文件路径，为空时只缓存在内存中
+        :param maxsize: 内存缓存条数
+        :param max_rows: 数据库缓存条数上限，超过后删除最早过期的缓存
+        """
+        self._path = path
+        self._maxsize = maxsize
+        self._max_rows = max_rows
+        # 上次检查后的写入条数
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        # 内存缓存：key -> (过期时间, 响应)
+        self._memory = {}
+        # 正在进行的请求：key -> Event
+        self._inflight = {}
+
+    def _get_conn(self):
+        if not self._path:
+            return None
+        if self._conn is None:
+            self._conn = sqlite3.connect(self._path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS RESPONSE_CACHE ("
+                "KEY TEXT PRIMARY KEY, "
+                "BODY TEXT NOT NULL, "
+                "EXPIRES INTEGER NOT NULL)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS INDX_RESPONSE_CACHE_EXPIRES ON RESPONSE_CACHE (EXPIRES)")
+            self._conn.execute("DELETE FROM RESPONSE_CACHE WHERE EXPIRES <= ?", (int(time.time()),))
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(method, url, params):
+        """
+        生成缓存KEY，参数排序后参与计算
+        """
+        return "%s %s?%s" % (method, url, "&".join("%s=%s" % (k, params[k]) for k in sorted(params)))
+
+    def get(self, key):
+        """
+        查询未过期的缓存
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached:
+                if cached[0] > now:
+                    return cached[1]
+                self._memory.pop(key, None)
+            conn = self._get_conn()
+            if not conn:
+                return None
+            row = conn.execute("SELECT BODY, EXPIRES FROM RESPONSE_CACHE WHERE KEY = ?", (key,)).fetchone()
+            if not row or row[1] <= now:
+                return None
+            value = json.loads(row[0])
+            self.__set_memory(key, row[1], value)
+            return value
+
+    def set(self, key, value, expires):
+        """
+        写入缓存
+        :param expires: 过期时间戳
+        """
+        with self._lock:
+            self.__set_memory(key, expires, value)
+            conn = self._get_conn()
+            if conn:
+                conn.execute("INSERT OR REPLACE INTO RESPONSE_CACHE (KEY, BODY, EXPIRES) VALUES (?, ?, ?)",
+                             (key, json.dumps(value, ensure_ascii=False), int(expires)))
+                self._writes += 1
+                if self._writes >= self._evict_interval:
+                    self._writes = 0
+                    self.__evict(conn)
+                conn.commit()
+
+    def __evict(self, conn):
+        """
+        删除过期缓存，超过条数上限时删除最早过期的缓存，需在加锁后调用
+        :return: 删除的条数
+        """
+        removed = conn.execute("DELETE FROM RESPONSE_CACHE WHERE EXPIRES <= ?", (int(time.time()),)).rowcount
+        count = conn.execute("SELECT COUNT(1) FROM RESPONSE_CACHE").fetchone()[0]
+        if count > self._max_rows:
+            removed += conn.execute(
+                "DELETE FROM RESPONSE_CACHE WHERE KEY IN "
+                "(SELECT KEY FROM RESPONSE_CACHE ORDER BY EXPIRES LIMIT ?)", (count - self._max_rows,)).rowcount
+        return removed
+
+    def __set_memory(self, key, expires, value):
+        if len(self._memory) >= self._maxsize:
+            # 淘汰最早过期的一半
+            for k, _ in sorted(self._memory.items(), key=lambda x: x[1][0])[:self._maxsize // 2]:
+                self._memory.pop(k, None)
+        self._memory[key] = (expires, value)
+
+    def get_or_fetch(self, key, fetch, expires):
+        """
+        查询缓存，没有时调用fetch获取并缓存，相同KEY并发调用时共用一次请求
+        :param fetch: 获取数据的函数
+        :param expires: 过期时间戳，或根据结果计算过期时间的函数，返回空时不缓存
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            event = self._inflight.get(key)
+            owner = event is None
+            if owner:
+                event = self._inflight[key] = threading.Event()
+        if not owner:
+            # 等待其它线程的请求完成后读取其结果，请求失败时返回空结果，不重复请求
+            event.wait()
+            value = self.get(key)
+            return value if value is not None else {}
+        try:
+            value = fetch()
+            if value:
+                expire_time = expires(value) if callable(expires) else expires
+                if expire_time:
+                    self.set(key, value, expire_time)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def clear(self):
+        with self._lock:
+            self._memory = {}
+            conn = self._get_conn()
+            if conn:
+                conn.execute("DELETE FROM RESPONSE_CACHE")
+                conn.commit()
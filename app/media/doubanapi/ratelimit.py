@@ -0,0 +1,53 @@
+import threading
+import time
+
+
+class DoubanRateLimiter(object):
+    """
+    豆瓣访问限流，所有调用方共用，按请求结果自适应调整请求间隔：
+    请求失败（疑似被限制访问）时间隔加倍，成功时逐步缩短至最小间隔
+    """
+
+    def __init__(self, min_interval=1.0, max_interval=60.0, interval=None):
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._interval = interval or min_interval
+        # 下一次允许请求的时间
+        self._next_time = 0
+        self._lock = threading.Lock()
+
+    @property
+    def interval(self):
+        return self._interval
+
+    def acquire(self):
+        """
+        等待直到允许下一次请求
+        :return: 等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self._next_time - now, 0)
+            self._next_time = now + wait + self._interval
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def success(self):
+        """
+        请求成功，缩短请求间隔
+        """
+        with self._lock:
+            self._interval = max(self._min_interval, self._interval * 0.8)
+
+    def failure(self):
+        """
+        请求失败，加倍请求间隔
+        """
+        with self._lock:
+            self._interval = min(self._max_interval, self._interval * 2)
+            self._next_time = max(self._next_time, time.monotonic() + self._interval)
+
+
+# 豆瓣接口和网页共用的限流器
+douban_rate_limiter = DoubanRateLimiter(min_interval=1.0, max_interval=60.0, interval=2.0)
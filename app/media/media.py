@@ -3,6 +3,7 @@ import os
 import random
 import re
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 
 import zhconv
@@ -38,6 +39,8 @@ class Media:
     _search_tmdbweb = None
     _chatgpt_enable = None
     _default_language = None
+    # 文件识别并发数
+    _search_workers = 5
 
     def __init__(self):
         self.init_config()
@@ -62,6 +65,8 @@ class Media:
             self.tmdb.domain = Config().get_tmdbapi_url()
             # 开启缓存
             self.tmdb.cache = True
+            # 缓存文件
+            self.tmdb.cache_path = os.path.join(Config().get_config_path(), 'tmdb_request.db')
             # APIKEY
             self.tmdb.api_key = app.get('rmt_tmdbkey')
             # 语种
@@ -882,7 +887,9 @@ class Media:
         # 不是list的转为list
         if not isinstance(file_list, list):
             file_list = [file_list]
-        # 遍历每个文件，看得出来的名称是不是不一样，不一样的先搜索媒体信息
+        # 需要识别的文件：文件路径 -> (MetaInfo, 缓存KEY)
+        file_metas = {}
+        # 遍历每个文件，解析名称
         for file_path in file_list:
             try:
                 if not os.path.exists(file_path):
@@ -891,8 +898,6 @@ class Media:
                 # 解析媒体名称
                 # 先用自己的名称
                 file_name = os.path.basename(file_path)
-                parent_name = os.path.basename(os.path.dirname(file_path))
-                parent_parent_name = os.path.basename(PathUtils.get_parent_paths(file_path, 2))
                 # 过滤掉蓝光原盘目录下的子文件
                 if not os.path.isdir(file_path) \
                         and PathUtils.get_bluray_dir(file_path):
@@ -900,93 +905,11 @@ class Media:
                     continue
                 # 没有自带TMDB信息
                 if not tmdb_info:
-                    # 识别名称
-                    meta_info = MetaInfo(title=file_name)
-                    # 识别不到则使用上级的名称
-                    if not meta_info.get_name() or not meta_info.year:
-                        parent_info = MetaInfo(parent_name)
-                        if not parent_info.get_name() or not parent_info.year:
-                            parent_parent_info = MetaInfo(parent_parent_name)
-                            parent_info.type = parent_parent_info.type if parent_parent_info.type and parent_info.type != MediaType.TV else parent_info.type
-                            parent_info.cn_name = parent_parent_info.cn_name if parent_parent_info.cn_name else parent_info.cn_name
-                            parent_info.en_name = parent_parent_info.en_name if parent_parent_info.en_name else parent_info.en_name
-                            parent_info.year = parent_parent_info.year if parent_parent_info.year else parent_info.year
-                            parent_info.begin_season = NumberUtils.max_ele(parent_info.begin_season,
-                                                                           parent_parent_info.begin_season)
-                        if not meta_info.get_name():
-                            meta_info.cn_name = parent_info.cn_name
-                            meta_info.en_name = parent_info.en_name
-                        if not meta_info.year:
-                            meta_info.year = parent_info.year
-                        if parent_info.type and parent_info.type == MediaType.TV \
-                                and meta_info.type != MediaType.TV:
-                            meta_info.type = parent_info.type
-                        if meta_info.type == MediaType.TV:
-                            meta_info.begin_season = NumberUtils.max_ele(parent_info.begin_season,
-                                                                         meta_info.begin_season)
+                    meta_info = self.__get_file_meta_info(file_path)
                     if not meta_info.get_name() or not meta_info.type:
                         log.warn("【Rmt】%s 未识别出有效信息！" % meta_info.org_string)
                         continue
-                    # 区配缓存及TMDB
-                    media_key = self.__make_cache_key(meta_info)
-                    if not self.meta.get_meta_data_by_key(media_key):
-                        # 没有缓存数据
-                        file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
-                                                             first_media_year=meta_info.year,
-                                                             search_type=meta_info.type,
-                                                             media_year=meta_info.year,
-                                                             season_number=meta_info.begin_season)
-                        if not file_media_info:
-                            if self._rmt_match_mode == MatchMode.NORMAL:
-                                # 去掉年份再查一次，有可能是年份错误
-                                file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
-                                                                     search_type=meta_info.type)
-                        if not file_media_info and self._chatgpt_enable:
-                            # 从ChatGPT查询
-                            mtype, seaons, episodes, file_media_info = self.__search_chatgpt(file_name=file_path,
-                                                                                             mtype=meta_info.type)
-                            # 修正类型和集数
-                            meta_info.type = mtype
-                            if not meta_info.get_season_string():
-                                meta_info.set_season(seaons)
-                            if not meta_info.get_episode_string():
-                                meta_info.set_episode(episodes)
-                        if not file_media_info and self._search_keyword:
-                            cache_name = cacheman["tmdb_supply"].get(meta_info.get_name())
-                            is_movie = False
-                            if not cache_name:
-                                cache_name, is_movie = self.__search_engine(meta_info.get_name())
-                                cacheman["tmdb_supply"].set(meta_info.get_name(), cache_name)
-                            if cache_name:
-                                log.info("【Meta】开始辅助查询：%s ..." % cache_name)
-                                if is_movie:
-                                    file_media_info = self.__search_tmdb(file_media_name=cache_name,
-                                                                         search_type=MediaType.MOVIE)
-                                else:
-                                    file_media_info = self.__search_multi_tmdb(file_media_name=cache_name)
-                        # 补全TMDB信息
-                        if file_media_info and not file_media_info.get("genres"):
-                            file_media_info = self.get_tmdb_info(mtype=file_media_info.get("media_type"),
-                                                                 tmdbid=file_media_info.get("id"),
-                                                                 chinese=chinese,
-                                                                 append_to_response=append_to_response)
-                        # 保存到缓存
-                        if file_media_info is not None:
-                            self.__insert_media_cache(media_key=media_key,
-                                                      file_media_info=file_media_info)
-                    else:
-                        # 使用缓存信息
-                        cache_info = self.meta.get_meta_data_by_key(media_key)
-                        if cache_info.get("id"):
-                            file_media_info = self.get_tmdb_info(mtype=cache_info.get("type"),
-                                                                 tmdbid=cache_info.get("id"),
-                                                                 chinese=chinese,
-                                                                 append_to_response=append_to_response)
-                        else:
-                            # 缓存为未识别
-                            file_media_info = None
-                    # 赋值TMDB信息
-                    meta_info.set_tmdb_info(file_media_info)
+                    file_metas[file_path] = (meta_info, self.__make_cache_key(meta_info))
                 # 自带TMDB信息
                 else:
                     meta_info = MetaInfo(title=file_name, mtype=media_type)
@@ -1007,9 +930,135 @@ class Media:
             except Exception as err:
                 print(str(err))
                 log.error("【Rmt】发生错误：%s - %s" % (str(err), traceback.format_exc()))
+        if not file_metas:
+            return return_media_infos
+        # 相同名称、年份、类型、季的文件只识别一次，取第一个文件作为代表
+        key_files = {}
+        for file_path, (meta_info, media_key) in file_metas.items():
+            key_files.setdefault(media_key, file_path)
+        # 并发识别缓存中没有的KEY
+        search_files = {media_key: file_path for media_key, file_path in key_files.items()
+                        if not self.meta.get_meta_data_by_key(media_key)}
+        if search_files:
+            with ThreadPoolExecutor(max_workers=min(len(search_files), self._search_workers)) as executor:
+                futures = {media_key: executor.submit(self.__search_file_media_info,
+                                                      file_path,
+                                                      file_metas[file_path][0])
+                           for media_key, file_path in search_files.items()}
+            for media_key, future in futures.items():
+                try:
+                    file_media_info = future.result()
+                except Exception as err:
+                    log.error("【Rmt】发生错误：%s - %s" % (str(err), traceback.format_exc()))
+                    continue
+                # 保存到缓存
+                if file_media_info is not None:
+                    self.__insert_media_cache(media_key=media_key,
+                                              file_media_info=file_media_info)
+        # 相同TMDBID只查询一次详情
+        tmdb_keys = {}
+        for media_key in key_files:
+            cache_info = self.meta.get_meta_data_by_key(media_key)
+            if cache_info.get("id"):
+                tmdb_keys[media_key] = (cache_info.get("type"), cache_info.get("id"))
+        tmdb_infos = {}
+        detail_keys = set(tmdb_keys.values())
+        if detail_keys:
+            with ThreadPoolExecutor(max_workers=min(len(detail_keys), self._search_workers)) as executor:
+                futures = {(mtype, tmdbid): executor.submit(self.get_tmdb_info,
+                                                            mtype=mtype,
+                                                            tmdbid=tmdbid,
+                                                            chinese=chinese,
+                                                            append_to_response=append_to_response)
+                           for mtype, tmdbid in detail_keys}
+            for detail_key, future in futures.items():
+                try:
+                    tmdb_infos[detail_key] = future.result()
+                except Exception as err:
+                    log.error("【Rmt】发生错误：%s - %s" % (str(err), traceback.format_exc()))
+        # 赋值TMDB信息，保持文件原有顺序
+        for file_path in file_list:
+            if file_path not in file_metas:
+                continue
+            meta_info, media_key = file_metas[file_path]
+            meta_info.set_tmdb_info(tmdb_infos.get(tmdb_keys.get(media_key)))
+            return_media_infos[file_path] = meta_info
         # 循环结束
         return return_media_infos
 
+    @staticmethod
+    def __get_file_meta_info(file_path):
+        """
+        识别文件名称，识别不到则使用上级目录的名称
+        """
+        file_name = os.path.basename(file_path)
+        parent_name = os.path.basename(os.path.dirname(file_path))
+        parent_parent_name = os.path.basename(PathUtils.get_parent_paths(file_path, 2))
+        # 识别名称
+        meta_info = MetaInfo(title=file_name)
+        # 识别不到则使用上级的名称
+        if not meta_info.get_name() or not meta_info.year:
+            parent_info = MetaInfo(parent_name)
+            if not parent_info.get_name() or not parent_info.year:
+                parent_parent_info = MetaInfo(parent_parent_name)
+                parent_info.type = parent_parent_info.type if parent_parent_info.type and parent_info.type != MediaType.TV else parent_info.type
+                parent_info.cn_name = parent_parent_info.cn_name if parent_parent_info.cn_name else parent_info.cn_name
+                parent_info.en_name = parent_parent_info.en_name if parent_parent_info.en_name else parent_info.en_name
+                parent_info.year = parent_parent_info.year if parent_parent_info.year else parent_info.year
+                parent_info.begin_season = NumberUtils.max_ele(parent_info.begin_season,
+                                                               parent_parent_info.begin_season)
+            if not meta_info.get_name():
+                meta_info.cn_name = parent_info.cn_name
+                meta_info.en_name = parent_info.en_name
+            if not meta_info.year:
+                meta_info.year = parent_info.year
+            if parent_info.type and parent_info.type == MediaType.TV \
+                    and meta_info.type != MediaType.TV:
+                meta_info.type = parent_info.type
+            if meta_info.type == MediaType.TV:
+                meta_info.begin_season = NumberUtils.max_ele(parent_info.begin_season,
+                                                             meta_info.begin_season)
+        return meta_info
+
+    def __search_file_media_info(self, file_path, meta_info):
+        """
+        按文件识别的名称搜索TMDB，返回不含详情的媒体信息，未识别到时返回空字典
+        """
+        file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
+                                             first_media_year=meta_info.year,
+                                             search_type=meta_info.type,
+                                             media_year=meta_info.year,
+                                             season_number=meta_info.begin_season)
+        if not file_media_info:
+            if self._rmt_match_mode == MatchMode.NORMAL:
+                # 去掉年份再查一次，有可能是年份错误
+                file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
+                                                     search_type=meta_info.type)
+        if not file_media_info and self._chatgpt_enable:
+            # 从ChatGPT查询
+            mtype, seaons, episodes, file_media_info = self.__search_chatgpt(file_name=file_path,
+                                                                             mtype=meta_info.type)
+            # 修正类型和集数
+            meta_info.type = mtype
+            if not meta_info.get_season_string():
+                meta_info.set_season(seaons)
+            if not meta_info.get_episode_string():
+                meta_info.set_episode(episodes)
+        if not file_media_info and self._search_keyword:
+            cache_name = cacheman["tmdb_supply"].get(meta_info.get_name())
+            is_movie = False
+            if not cache_name:
+                cache_name, is_movie = self.__search_engine(meta_info.get_name())
+                cacheman["tmdb_supply"].set(meta_info.get_name(), cache_name)
+            if cache_name:
+                log.info("【Meta】开始辅助查询：%s ..." % cache_name)
+                if is_movie:
+                    file_media_info = self.__search_tmdb(file_media_name=cache_name,
+                                                         search_type=MediaType.MOVIE)
+                else:
+                    file_media_info = self.__search_multi_tmdb(file_media_name=cache_name)
+        return file_media_info
+
     def __dict_tmdbpersons(self, infos, chinese=True):
         """
         TMDB人员信息转为字典
@@ -2352,3 +2401,18 @@ class Media:
             result.append({"制作公司": production_company})
 
         return result
+
+    def get_tmdb_request_cache_stats(self):
+        """
+        获取TMDB接口响应缓存统计信息
+        """
+        if not self.tmdb:
+            return {}
+        return self.tmdb.cache_info()
+
+    def clear_tmdb_request_cache(self):
+        """
+        清空TMDB接口响应缓存
+        """
+        if self.tmdb:
+            self.tmdb.cache_clear()
@@ -1,6 +1,9 @@
+import hashlib
 import os.path
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, Future
 from xml.dom import minidom
 
 import zhconv
@@ -17,6 +20,17 @@ from app.utils.commons import retry
 from app.utils.types import MediaType, SystemConfigKey, RmtMode
 from config import Config, RMT_MEDIAEXT
 
+# NFO中的添加时间，比较内容时忽略
+_NFO_DATEADDED_RE = re.compile(rb"\s*<dateadded>[^<]*</dateadded>")
+# 季目录名称：Season 1、S01、第1季、Specials
+_SEASON_DIR_RE = re.compile(r"^(Season\s*\d+|S\d+|第\s*[0-9一二三四五六七八九十]+\s*季|Specials)$", re.IGNORECASE)
+# 图片下载锁
+_image_lock = threading.Lock()
+# 下载中的图片：缓存文件 -> [锁, 使用数]，下载完成后移除
+_image_url_locks = {}
+# 图片缓存上次清理时间
+_image_cache_cleaned = 0
+
 
 class Scraper:
     media = None
@@ -25,6 +39,15 @@ class Scraper:
     _scraper_pic = {}
     _rmt_mode = None
     _temp_path = None
+    _image_cache_path = None
+    # 媒体库刮削并发数
+    _scraper_workers = 4
+    # 图片缓存最大占用空间（字节）
+    _image_cache_max_size = 500 * 1024 * 1024
+    # 图片缓存保留时间（秒）
+    _image_cache_max_age = 7 * 24 * 3600
+    # 图片缓存清理间隔（秒）
+    _image_cache_clean_interval = 3600
 
     def __init__(self):
         self.media = Media()
@@ -38,6 +61,9 @@ class Scraper:
         self._temp_path = os.path.join(Config().get_temp_path(), "scraper")
         if not os.path.exists(self._temp_path):
             os.makedirs(self._temp_path)
+        self._image_cache_path = os.path.join(Config().get_temp_path(), "scraper_images")
+        if not os.path.exists(self._image_cache_path):
+            os.makedirs(self._image_cache_path)
 
     def folder_scraper(self, path, exclude_path=None, mode=None):
         """
@@ -50,45 +76,59 @@ class Scraper:
         # 模式
         force_nfo = True if mode in ["force_nfo", "force_all"] else False
         force_pic = True if mode in ["force_all"] else False
-        # 每个媒体库下的所有文件
+        # 按剧集/电影目录分组，同一组内共用元数据，并按顺序刮削以避免并发写入相同的文件
+        groups = {}
         for file in self.__get_library_files(path, exclude_path):
             if not file:
                 continue
-            log.info(f"【Scraper】开始刮削媒体库文件：{file} ...")
-            # 识别媒体文件
             meta_info = MetaInfo(os.path.basename(file))
-            # 优先读取本地文件
-            tmdbid = None
-            if meta_info.type == MediaType.MOVIE:
-                # 电影
-                movie_nfo = os.path.join(os.path.dirname(file), "movie.nfo")
-                if os.path.exists(movie_nfo):
-                    tmdbid = self.__get_tmdbid_from_nfo(movie_nfo)
-                file_nfo = os.path.join(os.path.splitext(file)[0] + ".nfo")
-                if not tmdbid and os.path.exists(file_nfo):
-                    tmdbid = self.__get_tmdbid_from_nfo(file_nfo)
-            else:
-                # 电视剧
-                tv_nfo = os.path.join(os.path.dirname(os.path.dirname(file)), "tvshow.nfo")
-                if os.path.exists(tv_nfo):
-                    tmdbid = self.__get_tmdbid_from_nfo(tv_nfo)
-            if tmdbid and not force_nfo:
+            group_path = os.path.dirname(file)
+            # 剧集按剧集目录分组，文件在季目录下时取上一级目录
+            if meta_info.type != MediaType.MOVIE and _SEASON_DIR_RE.match(os.path.basename(group_path)):
+                group_path = os.path.dirname(group_path)
+            groups.setdefault(group_path, []).append((file, meta_info))
+        if not groups:
+            return
+        # 同一次刮削中相同TMDBID只查询一次
+        tmdb_infos = {}
+        tmdb_lock = threading.Lock()
+        with ThreadPoolExecutor(max_workers=min(len(groups), self._scraper_workers)) as executor:
+            futures = [executor.submit(self.__scrape_group,
+                                       files, tmdb_infos, tmdb_lock, force_nfo, force_pic)
+                       for files in groups.values()]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as err:
+                    ExceptionUtils.exception_traceback(err)
+
+    def __scrape_group(self, files, tmdb_infos, tmdb_lock, force_nfo, force_pic):
+        """
+        刮削同一剧集或电影目录下的文件
+        :param files: (文件路径, MetaInfo)列表
+        :param tmdb_infos: 本次刮削共用的TMDB信息缓存
+        :param tmdb_lock: TMDB信息缓存的锁
+        """
+        # 优先读取本地文件中的tmdbid，没有的合并后一次识别
+        media_infos = {}
+        recognize_files = []
+        for file, meta_info in files:
+            tmdbid = None if force_nfo else self.__get_tmdbid_from_local(file, meta_info)
+            if tmdbid:
                 log.info(f"【Scraper】读取到本地nfo文件的tmdbid：{tmdbid}")
-                meta_info.set_tmdb_info(self.media.get_tmdb_info(mtype=meta_info.type,
-                                                                 tmdbid=tmdbid,
-                                                                 append_to_response='all'))
-                media_info = meta_info
+                meta_info.set_tmdb_info(self.__get_shared_tmdb_info(tmdb_infos, tmdb_lock,
+                                                                    meta_info.type, tmdbid))
+                media_infos[file] = meta_info
             else:
-                medias = self.media.get_media_info_on_files(file_list=[file],
-                                                            append_to_response="all")
-                if not medias:
-                    continue
-                media_info = None
-                for _, media in medias.items():
-                    media_info = media
-                    break
+                recognize_files.append(file)
+        if recognize_files:
+            media_infos.update(self.media.get_media_info_on_files(file_list=recognize_files,
+                                                                  append_to_response="all"))
+        for file, _ in files:
+            media_info = media_infos.get(file)
             if not media_info or not media_info.tmdb_info:
                 continue
+            log.info(f"【Scraper】开始刮削媒体库文件：{file} ...")
             self.gen_scraper_files(media=media_info,
                                    dir_path=os.path.dirname(file),
                                    file_name=os.path.splitext(os.path.basename(file))[0],
@@ -98,6 +138,45 @@ class Scraper:
                                    force_pic=force_pic)
             log.info(f"【Scraper】{file} 刮削完成")
 
+    def __get_shared_tmdb_info(self, tmdb_infos, tmdb_lock, mtype, tmdbid):
+        """
+        查询TMDB信息，同一次刮削中相同TMDBID只查询一次，并发查询时等待先查询的结果
+        """
+        tmdb_key = (mtype, str(tmdbid))
+        with tmdb_lock:
+            future = tmdb_infos.get(tmdb_key)
+            leader = future is None
+            if leader:
+                future = tmdb_infos[tmdb_key] = Future()
+        if leader:
+            try:
+                future.set_result(self.media.get_tmdb_info(mtype=mtype,
+                                                           tmdbid=tmdbid,
+                                                           append_to_response='all'))
+            except Exception as err:
+                future.set_exception(err)
+        return future.result()
+
+    def __get_tmdbid_from_local(self, file, meta_info):
+        """
+        从本地nfo文件中读取tmdbid
+        """
+        tmdbid = None
+        if meta_info.type == MediaType.MOVIE:
+            # 电影
+            movie_nfo = os.path.join(os.path.dirname(file), "movie.nfo")
+            if os.path.exists(movie_nfo):
+                tmdbid = self.__get_tmdbid_from_nfo(movie_nfo)
+            file_nfo = os.path.join(os.path.splitext(file)[0] + ".nfo")
+            if not tmdbid and os.path.exists(file_nfo):
+                tmdbid = self.__get_tmdbid_from_nfo(file_nfo)
+        else:
+            # 电视剧
+            tv_nfo = os.path.join(os.path.dirname(os.path.dirname(file)), "tvshow.nfo")
+            if os.path.exists(tv_nfo):
+                tmdbid = self.__get_tmdbid_from_nfo(tv_nfo)
+        return tmdbid
+
     @staticmethod
     def __get_library_files(in_path, exclude_path=None):
         """
@@ -403,6 +482,69 @@ class Scraper:
         else:
             SystemUtils.move(temp_file, out_file)
 
+    def __get_image_content(self, url):
+        """
+        下载图片，已下载过的图片从本地缓存读取，同一图片并发下载时只下载一次
+        """
+        cache_file = os.path.join(self._image_cache_path,
+                                  "%s.%s" % (hashlib.sha1(url.encode("utf-8")).hexdigest(),
+                                             str(url).split('.')[-1][:5]))
+        with _image_lock:
+            url_lock = _image_url_locks.setdefault(cache_file, [threading.Lock(), 0])
+            url_lock[1] += 1
+        try:
+            with url_lock[0]:
+                if os.path.exists(cache_file):
+                    # 更新修改时间，清理时优先保留最近使用的图片
+                    os.utime(cache_file)
+                    with open(cache_file, "rb") as f:
+                        return f.read()
+                r = RequestUtils().get_res(url=url, raise_exception=True)
+                if not r:
+                    return None
+                with open(cache_file, "wb") as f:
+                    f.write(r.content)
+        finally:
+            with _image_lock:
+                url_lock[1] -= 1
+                if not url_lock[1]:
+                    _image_url_locks.pop(cache_file, None)
+        self.__clean_image_cache()
+        return r.content
+
+    def __clean_image_cache(self):
+        """
+        定期清理图片缓存：删除超过保留时间的图片，超过最大占用空间时从最久未使用的开始删除
+        """
+        global _image_cache_cleaned
+        with _image_lock:
+            if time.time() - _image_cache_cleaned < self._image_cache_clean_interval:
+                return
+            _image_cache_cleaned = time.time()
+        try:
+            files = []
+            with os.scandir(self._image_cache_path) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+            expire_time = time.time() - self._image_cache_max_age
+            total_size = sum(size for _, size, _ in files)
+            removed = 0
+            for mtime, size, path in sorted(files):
+                if mtime >= expire_time and total_size <= self._image_cache_max_size:
+                    break
+                try:
+                    os.remove(path)
+                    total_size -= size
+                    removed += 1
+                except OSError as err:
+                    print(str(err))
+            if removed:
+                log.info(f"【Scraper】已清理 {removed} 个图片缓存文件")
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+
     @retry(RequestException, logger=log)
     def __save_image(self, url, out_path, itype='', force=False):
         """
@@ -418,14 +560,14 @@ class Scraper:
             return
         try:
             log.info(f"【Scraper】正在下载{itype}图片：{url} ...")
-            r = RequestUtils().get_res(url=url, raise_exception=True)
-            if r:
+            content = self.__get_image_content(url)
+            if content:
                 # 下载到temp目录，远程则先存到temp再远程移动，本地则直接保存
                 if self._rmt_mode in ModuleConf.REMOTE_RMT_MODES:
-                    self.__save_remove_file(image_path, r.content)
+                    self.__save_remove_file(image_path, content)
                 else:
                     with open(file=image_path, mode="wb") as img:
-                        img.write(r.content)
+                        img.write(content)
                 log.info(f"【Scraper】{itype}图片已保存：{image_path}")
             else:
                 log.info(f"【Scraper】{itype}图片下载失败，请检查网络连通性")
@@ -434,9 +576,28 @@ class Scraper:
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
 
+    @staticmethod
+    def __is_same_nfo(xml_str, out_file):
+        """
+        判断NFO内容与已有文件是否一致，忽略添加时间
+        """
+        if not os.path.exists(out_file):
+            return False
+        try:
+            with open(out_file, "rb") as f:
+                old_xml_str = f.read()
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return False
+        return _NFO_DATEADDED_RE.sub(b"", old_xml_str) == _NFO_DATEADDED_RE.sub(b"", xml_str)
+
     def __save_nfo(self, doc, out_file):
         log.info("【Scraper】正在保存NFO文件：%s" % out_file)
         xml_str = doc.toprettyxml(indent="  ", encoding="utf-8")
+        if self._rmt_mode not in ModuleConf.REMOTE_RMT_MODES \
+                and self.__is_same_nfo(xml_str, out_file):
+            log.info("【Scraper】NFO文件内容未变化，跳过保存：%s" % out_file)
+            return
         # 下载到temp目录，远程则先存到temp再远程移动，本地则直接保存
         if self._rmt_mode in ModuleConf.REMOTE_RMT_MODES:
             self.__save_remove_file(out_file, xml_str)
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+# 不参与缓存KEY计算的参数
+IGNORED_PARAMS = ("api_key",)
+
+# 按接口路径设置缓存时间（秒），按顺序匹配，第一个命中的生效
+ENDPOINT_TTLS = (
+    (re.compile(r"^/trending/"), 2 * 3600),
+    (re.compile(r"^/discover/"), 6 * 3600),
+    (re.compile(r"^/(movie|tv)/(popular|top_rated|upcoming|now_playing|on_the_air|airing_today)"), 6 * 3600),
+    (re.compile(r"^/search/"), 24 * 3600),
+    (re.compile(r"^/find/"), 3 * 24 * 3600),
+    (re.compile(r"^/tv/\d+/season/\d+"), 3 * 24 * 3600),
+    (re.compile(r"^/(movie|tv|person)/\d+"), 7 * 24 * 3600),
+    (re.compile(r"^/genre/"), 30 * 24 * 3600),
+)
+DEFAULT_TTL = 24 * 3600
+
+# 缓存总大小上限
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+# 命中时更新访问时间的最小间隔（秒），淘汰只需要大致的访问顺序，避免每次命中都写库
+ACCESSED_UPDATE_INTERVAL = 10 * 60
+
+
+class CachedResponse(object):
+    """
+    从缓存中还原的响应，提供与requests.Response相同的headers/json()接口
+    """
+
+    def __init__(self, text, headers=None, status_code=200):
+        self.text = text
+        self.headers = headers or {}
+        self.status_code = status_code
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class RequestCache(object):
+    """
+    基于SQLite的TMDB接口响应缓存，支持按接口设置过期时间、ETag条件校验、按大小淘汰
+    """
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        self._path = path
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._conn = None
+        self._hits = 0
+        self._misses = 0
+        self._revalidated = 0
+        self._evicted = 0
+
+    @property
+    def path(self):
+        return self._path
+
+    def _get_conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self._path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS RESPONSE_CACHE ("
+                "KEY TEXT PRIMARY KEY, "
+                "BODY TEXT NOT NULL, "
+                "ETAG TEXT, "
+                "LAST_MODIFIED TEXT, "
+                "EXPIRES INTEGER NOT NULL, "
+                "ACCESSED INTEGER NOT NULL, "
+                "SIZE INTEGER NOT NULL)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS INDX_RESPONSE_CACHE_ACCESSED ON RESPONSE_CACHE (ACCESSED)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(method, url, data=None):
+        """
+        规范化URL生成缓存KEY：去掉api_key并对参数排序
+        """
+        parts = urlsplit(url)
+        params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=False)
+                        if k not in IGNORED_PARAMS)
+        key = "%s %s%s?%s" % (method.upper(), parts.netloc, parts.path, urlencode(params))
+        if data:
+            key = "%s#%s" % (key, data)
+        return key
+
+    @staticmethod
+    def get_ttl(path):
+        """
+        根据接口路径获取缓存时间
+        """
+        for pattern, ttl in ENDPOINT_TTLS:
+            if pattern.search(path):
+                return ttl
+        return DEFAULT_TTL
+
+    def get(self, key):
+        """
+        查询缓存
+        :return: (响应内容, 是否过期, etag, last_modified)，未命中时返回None
+        """
+        now = int(time.time())
+        with self._lock:
+            row = self._get_conn().execute(
+                "SELECT BODY, ETAG, LAST_MODIFIED, EXPIRES, ACCESSED FROM RESPONSE_CACHE WHERE KEY = ?",
+                (key,)).fetchone()
+            if not row:
+                return None
+            if now - row[4] >= ACCESSED_UPDATE_INTERVAL:
+                self._get_conn().execute(
+                    "UPDATE RESPONSE_CACHE SET ACCESSED = ? WHERE KEY = ?", (now, key))
+                self._get_conn().commit()
+        body, etag, last_modified, expires, _ = row
+        return body, now >= expires, etag, last_modified
+
+    def set(self, key, body, ttl, etag=None, last_modified=None):
+        """
+        写入缓存，超出大小上限时淘汰最久未访问的记录
+        """
+        now = int(time.time())
+        size = len(body.encode("utf-8"))
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO RESPONSE_CACHE "
+                "(KEY, BODY, ETAG, LAST_MODIFIED, EXPIRES, ACCESSED, SIZE) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, body, etag, last_modified, now + ttl, now, size))
+            self.__evict(conn)
+            conn.commit()
+
+    def touch(self, key, ttl):
+        """
+        条件校验未变化时，延长缓存有效期
+        """
+        now = int(time.time())
+        with self._lock:
+            self._get_conn().execute(
+                "UPDATE RESPONSE_CACHE SET EXPIRES = ?, ACCESSED = ? WHERE KEY = ?", (now + ttl, now, key))
+            self._get_conn().commit()
+
+    def __evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(SIZE), 0) FROM RESPONSE_CACHE").fetchone()[0]
+        if total <= self._max_size:
+            return
+        # 淘汰到上限的90%，避免每次写入都触发淘汰
+        target = total - int(self._max_size * 0.9)
+        freed = 0
+        keys = []
+        for key, size in conn.execute("SELECT KEY, SIZE FROM RESPONSE_CACHE ORDER BY ACCESSED"):
+            keys.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        conn.executemany("DELETE FROM RESPONSE_CACHE WHERE KEY = ?", keys)
+        self._evicted += len(keys)
+
+    def record(self, hit=False, revalidated=False):
+        """
+        记录命中统计
+        """
+        if revalidated:
+            self._revalidated += 1
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+
+    def clear(self):
+        with self._lock:
+            self._get_conn().execute("DELETE FROM RESPONSE_CACHE")
+            self._get_conn().commit()
+            self._hits = self._misses = self._revalidated = self._evicted = 0
+
+    def stats(self):
+        """
+        缓存统计信息
+        """
+        with self._lock:
+            count, size = self._get_conn().execute(
+                "SELECT COUNT(1), COALESCE(SUM(SIZE), 0) FROM RESPONSE_CACHE").fetchone()
+        total = self._hits + self._misses
+        return {
+            "count": count,
+            "size": size,
+            "max_size": self._max_size,
+            "hits": self._hits,
+            "misses": self._misses,
+            "revalidated": self._revalidated,
+            "evicted": self._evicted,
+            "hit_rate": round(self._hits * 100 / total, 1) if total else 0
+        }
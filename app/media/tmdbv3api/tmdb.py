@@ -2,18 +2,45 @@
 
 import logging
 import os
+import threading
 import time
-from functools import lru_cache
+from urllib.parse import urlsplit
 
 import requests
 import requests.exceptions
 
 from .as_obj import AsObj
+from .cache import RequestCache, CachedResponse
 from .exceptions import TMDbException
 
 logger = logging.getLogger(__name__)
 
 
+class RateLimiter(object):
+    """
+    令牌桶限流，所有TMDb实例共用，控制并发请求时对TMDB的访问频率
+    """
+
+    def __init__(self, rate, capacity=None):
+        self._rate = rate
+        self._capacity = capacity or rate
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+
 class TMDb(object):
     TMDB_API_KEY = "TMDB_API_KEY"
     TMDB_LANGUAGE = "TMDB_LANGUAGE"
@@ -22,7 +49,13 @@ class TMDb(object):
     TMDB_CACHE_ENABLED = "TMDB_CACHE_ENABLED"
     TMDB_PROXIES = "TMDB_PROXIES"
     TMDB_DOMAIN = "TMDB_DOMAIN"
-    REQUEST_CACHE_MAXSIZE = 512
+    TMDB_CACHE_PATH = "TMDB_CACHE_PATH"
+    REQUEST_CACHE_MAXSIZE = 256 * 1024 * 1024
+    REQUEST_RATE_LIMIT = 20
+
+    _rate_limiter = RateLimiter(REQUEST_RATE_LIMIT)
+    _request_cache = None
+    _request_cache_lock = threading.Lock()
 
     def __init__(self, obj_cached=True, session=None):
         self._session = requests.Session() if session is None else session
@@ -120,6 +153,23 @@ class TMDb(object):
     def cache(self, cache):
         os.environ[self.TMDB_CACHE_ENABLED] = str(cache)
 
+    @property
+    def cache_path(self):
+        return os.environ.get(self.TMDB_CACHE_PATH)
+
+    @cache_path.setter
+    def cache_path(self, cache_path):
+        os.environ[self.TMDB_CACHE_PATH] = str(cache_path or '')
+
+    @property
+    def request_cache(self):
+        if not self.cache_path:
+            return None
+        with TMDb._request_cache_lock:
+            if TMDb._request_cache is None or TMDb._request_cache.path != self.cache_path:
+                TMDb._request_cache = RequestCache(self.cache_path, max_size=self.REQUEST_CACHE_MAXSIZE)
+            return TMDb._request_cache
+
     @staticmethod
     def _get_obj(result, key="results", all_details=False):
         if "success" in result and result["success"] is False:
@@ -129,13 +179,48 @@ class TMDb(object):
         else:
             return [AsObj(**res) for res in result[key]]
 
-    @staticmethod
-    @lru_cache(maxsize=REQUEST_CACHE_MAXSIZE)
-    def cached_request(method, url, data, proxies):
-        return requests.request(method, url, data=data, proxies=eval(proxies), verify=False, timeout=10)
+    def _request(self, method, url, data, proxies, headers=None):
+        self._rate_limiter.acquire()
+        return self._session.request(method, url, data=data, headers=headers,
+                                     proxies=eval(proxies), verify=False, timeout=10)
+
+    def cached_request(self, method, url, data, proxies):
+        request_cache = self.request_cache
+        if not request_cache:
+            return self._request(method, url, data, proxies)
+        key = request_cache.make_key(method, url, data)
+        cached = request_cache.get(key)
+        headers = {}
+        if cached:
+            body, expired, etag, last_modified = cached
+            if not expired:
+                request_cache.record(hit=True)
+                return CachedResponse(body)
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        req = self._request(method, url, data, proxies, headers=headers or None)
+        ttl = request_cache.get_ttl(urlsplit(url).path.replace(urlsplit(self.domain).path, "", 1))
+        if cached and req.status_code == 304:
+            request_cache.touch(key, ttl)
+            request_cache.record(hit=True, revalidated=True)
+            return CachedResponse(cached[0], headers=req.headers)
+        request_cache.record(hit=False)
+        if req.status_code == 200:
+            request_cache.set(key, req.text, ttl,
+                              etag=req.headers.get("ETag"),
+                              last_modified=req.headers.get("Last-Modified"))
+        return req
 
     def cache_clear(self):
-        return self.cached_request.cache_clear()
+        if self.request_cache:
+            self.request_cache.clear()
+
+    def cache_info(self):
+        if self.request_cache:
+            return self.request_cache.stats()
+        return {}
 
     def _call(
             self, action, append_to_response, call_cached=True, method="GET", data=None
@@ -154,7 +239,7 @@ class TMDb(object):
         if self.cache and self.obj_cached and call_cached and method != "POST":
             req = self.cached_request(method, url, data, self.proxies)
         else:
-            req = self._session.request(method, url, data=data, proxies=eval(self.proxies), timeout=10, verify=False)
+            req = self._request(method, url, data, self.proxies)
 
         headers = req.headers
 
@@ -190,7 +275,7 @@ class TMDb(object):
 
         if self.debug:
             logger.info(json)
-            logger.info(self.cached_request.cache_info())
+            logger.info(self.cache_info())
 
         if "errors" in json:
             raise TMDbException(json["errors"])
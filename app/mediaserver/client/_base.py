@@ -1,6 +1,9 @@
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
 
+import log
+from app.utils import RequestUtils, ExceptionUtils
 from config import Config
 
 
@@ -12,6 +15,10 @@ class _IMediaClient(metaclass=ABCMeta):
     client_type = ""
     # 媒体服务器名称
     client_name = ""
+    # 分页查询每页数量
+    _page_size = 200
+    # 分页并发查询数
+    _page_workers = 2
 
     @abstractmethod
     def match(self, ctype):
@@ -178,3 +185,41 @@ class _IMediaClient(metaclass=ABCMeta):
                 return ""
         else:
             return f"img?url={quote(url)}"
+
+    def _get_paged_items(self, req_url, params):
+        """
+        分页查询Items接口，首页获取总数后其余页按并发数分批查询，按顺序逐条返回，不一次性加载全部数据
+        :param req_url: Items接口地址
+        :param params: 查询参数，不含StartIndex和Limit
+        """
+        def __get_page(start):
+            res = RequestUtils().get_res(req_url, params=dict(params, StartIndex=start, Limit=self._page_size))
+            if not res or res.status_code != 200:
+                raise Exception(f"状态码：{res.status_code if res is not None else '无返回'}")
+            return res.json()
+
+        try:
+            page = __get_page(0)
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            log.error(f"【{self.client_name}】连接Items出错：" + str(e))
+            return
+        for item in page.get("Items") or []:
+            yield item
+        total = page.get("TotalRecordCount") or 0
+        starts = list(range(self._page_size, total, self._page_size))
+        if not starts:
+            return
+        workers = max(self._page_workers, 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for i in range(0, len(starts), workers):
+                futures = [(start, executor.submit(__get_page, start)) for start in starts[i:i + workers]]
+                for start, future in futures:
+                    try:
+                        page = future.result()
+                    except Exception as e:
+                        ExceptionUtils.exception_traceback(e)
+                        log.error(f"【{self.client_name}】分页查询Items出错，跳过第 {start} 条起的数据：" + str(e))
+                        continue
+                    for item in page.get("Items") or []:
+                        yield item
@@ -620,38 +620,37 @@ class Emby(_IMediaClient):
 
     def get_items(self, parent):
         """
-        获取媒体服务器所有媒体库列表
+        获取媒体库中的所有电影和电视剧，递归分页查询，一次返回完整的媒体信息，逐条返回
         """
         if not parent:
             yield {}
+            return
         if not self._host or not self._apikey:
             yield {}
-        req_url = "%semby/Users/%s/Items?ParentId=%s&api_key=%s" % (self._host, self._user, parent, self._apikey)
-        try:
-            res = RequestUtils().get_res(req_url)
-            if res and res.status_code == 200:
-                results = res.json().get("Items") or []
-                for result in results:
-                    if not result:
-                        continue
-                    if result.get("Type") in ["Movie", "Series"]:
-                        item_info = self.get_iteminfo(result.get("Id"))
-                        yield {"id": result.get("Id"),
-                               "library": item_info.get("ParentId"),
-                               "type": item_info.get("Type"),
-                               "title": item_info.get("Name"),
-                               "originalTitle": item_info.get("OriginalTitle"),
-                               "year": item_info.get("ProductionYear"),
-                               "tmdbid": item_info.get("ProviderIds", {}).get("Tmdb"),
-                               "imdbid": item_info.get("ProviderIds", {}).get("Imdb"),
-                               "path": item_info.get("Path"),
-                               "json": str(item_info)}
-                    elif "Folder" in result.get("Type"):
-                        for item in self.get_items(parent=result.get('Id')):
-                            yield item
-        except Exception as e:
-            ExceptionUtils.exception_traceback(e)
-            log.error(f"【{self.client_name}】连接Users/Items出错：" + str(e))
+            return
+        req_url = "%semby/Users/%s/Items" % (self._host, self._user)
+        params = {
+            "ParentId": parent,
+            "Recursive": "true",
+            "IncludeItemTypes": "Movie,Series",
+            "Fields": "ProviderIds,Path,ProductionYear,OriginalTitle,ParentId",
+            "EnableImages": "false",
+            "EnableUserData": "false",
+            "api_key": self._apikey
+        }
+        for item_info in self._get_paged_items(req_url, params):
+            if not item_info or item_info.get("Type") not in ["Movie", "Series"]:
+                continue
+            yield {"id": item_info.get("Id"),
+                   "library": item_info.get("ParentId"),
+                   "type": item_info.get("Type"),
+                   "title": item_info.get("Name"),
+                   "originalTitle": item_info.get("OriginalTitle"),
+                   "year": item_info.get("ProductionYear"),
+                   "tmdbid": (item_info.get("ProviderIds") or {}).get("Tmdb"),
+                   "imdbid": (item_info.get("ProviderIds") or {}).get("Imdb"),
+                   "path": item_info.get("Path"),
+                   "json": str(item_info)}
         yield {}
 
     def get_playing_sessions(self):
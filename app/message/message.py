@@ -7,6 +7,7 @@ import log
 from app.conf import ModuleConf
 from app.helper import DbHelper, SubmoduleHelper
 from app.message.message_center import MessageCenter
+from app.message.message_queue import MessageQueue
 from app.utils import StringUtils, ExceptionUtils
 from app.utils.commons import singleton
 from app.utils.types import SearchType, MediaType
@@ -22,6 +23,7 @@ class Message(object):
     _active_clients = []
     _active_interactive_clients = {}
     _client_configs = {}
+    _message_queues = {}
     _domain = None
 
     def __init__(self):
@@ -44,6 +46,10 @@ class Message(object):
                     client = active_client.get("client")
                     if client and hasattr(client, "stop_service"):
                         client.stop_service()
+        # 停止旧的发送队列，已入队的消息发送完后退出
+        for message_queue in self._message_queues.values():
+            message_queue.stop()
+        self._message_queues = {}
         # 活跃的客户端
         self._active_clients = []
         # 活跃的交互客户端
@@ -74,6 +80,9 @@ class Message(object):
             }
             client.update(client_conf)
             self._active_clients.append(client)
+            self._message_queues[str(client_config.ID)] = MessageQueue(
+                name=client_config.NAME,
+                sender=lambda _client=client, **kwargs: self.__sendmsg(client=_client, **kwargs))
             if client.get("interactive"):
                 self._active_interactive_clients[client.get("search_type")] = client
 
@@ -150,6 +159,29 @@ class Message(object):
                 return state
         return True
 
+    def __queue_msg(self, client, title, text="", image="", url="", user_id="", coalesce=None):
+        """
+        消息放入渠道的发送队列，由队列线程异步发送
+        :param coalesce: 合并类型，短时间内相同类型的消息会合并发送
+        """
+        if not client or not client.get('client'):
+            return None
+        message_queue = self._message_queues.get(str(client.get("id")))
+        if not message_queue:
+            return self.__sendmsg(client=client, title=title, text=text, image=image, url=url, user_id=user_id)
+        return message_queue.put(title=title,
+                                 text=text,
+                                 image=image,
+                                 url=url,
+                                 user_id=user_id,
+                                 coalesce=coalesce)
+
+    def get_queue_status(self):
+        """
+        查询各消息渠道待发送的消息数
+        """
+        return {cid: message_queue.qsize() for cid, message_queue in self._message_queues.items()}
+
     def send_channel_msg(self, channel, title, text="", image="", url="", user_id=""):
         """
         按渠道发送消息，用于消息交互
@@ -267,7 +299,7 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "download_start" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=msg_title,
                     text=msg_text,
@@ -304,12 +336,13 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "transfer_finished" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=msg_title,
                     text=msg_str,
                     image=media_info.get_message_image(),
-                    url='history'
+                    url='history',
+                    coalesce="transfer_finished"
                 )
 
     def send_transfer_tv_message(self, message_medias: dict, in_from: Enum):
@@ -340,12 +373,13 @@ class Message(object):
             # 发送消息
             for client in self._active_clients:
                 if "transfer_finished" in client.get("switchs"):
-                    self.__sendmsg(
+                    self.__queue_msg(
                         client=client,
                         title=msg_title,
                         text=msg_str,
                         image=item_info.get_message_image(),
-                        url='history')
+                        url='history',
+                        coalesce="transfer_finished")
 
     def send_simplify_transfer_movie_message(self, in_from: Enum, media_info, exist_filenum, category_flag):
         """
@@ -394,12 +428,13 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "transfer_finished" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=msg_title,
                     text=msg_str,
                     image=media_info.get_message_image(),
-                    url='history'
+                    url='history',
+                    coalesce="transfer_finished"
                 )
 
     def send_simplify_transfer_tv_message(self, message_medias: dict, in_from: Enum):
@@ -448,12 +483,13 @@ class Message(object):
             # 发送消息
             for client in self._active_clients:
                 if "transfer_finished" in client.get("switchs"):
-                    self.__sendmsg(
+                    self.__queue_msg(
                         client=client,
                         title=msg_title,
                         text=msg_str,
                         image=item_info.get_message_image(),
-                        url='history')
+                        url='history',
+                        coalesce="transfer_finished")
 
     def send_download_fail_message(self, item, error_msg):
         """
@@ -466,7 +502,7 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "download_fail" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=title,
                     text=text,
@@ -492,7 +528,7 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "rss_added" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=msg_title,
                     text=msg_str,
@@ -519,7 +555,7 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "rss_finished" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=msg_title,
                     text=msg_str,
@@ -540,7 +576,7 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "site_signin" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=title,
                     text=text
@@ -559,7 +595,7 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "site_message" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=title,
                     text=text
@@ -578,7 +614,7 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "transfer_fail" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=title,
                     text=text,
@@ -596,7 +632,7 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "auto_remove_torrents" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=title,
                     text=text,
@@ -614,7 +650,7 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "brushtask_remove" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=title,
                     text=text,
@@ -632,7 +668,7 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "brushtask_added" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=title,
                     text=text,
@@ -710,7 +746,7 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "mediaserver_message" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=message_title,
                     text=message_content,
@@ -729,7 +765,7 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "custom_message" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=title,
                     text=text,
@@ -749,7 +785,7 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if str(client.get("id")) in clients:
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=title,
                     text=text,
@@ -795,7 +831,7 @@ class Message(object):
         # 发送消息
         for client in self._active_clients:
             if "ptrefresh_date_message" in client.get("switchs"):
-                self.__sendmsg(
+                self.__queue_msg(
                     client=client,
                     title=title,
                     text=text
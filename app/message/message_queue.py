@@ -0,0 +1,161 @@
+import time
+from queue import Queue, Empty, Full
+from threading import Thread, Lock
+
+import log
+
+
+class MessageQueue(object):
+    """
+    单个消息渠道的发送队列，由独立线程按顺序发送，支持失败重试、发送限速及突发消息合并
+    """
+    # 队列最大长度
+    _maxsize = 1000
+    # 两条消息之间的最小发送间隔（秒）
+    _interval = 1
+    # 失败重试次数
+    _retry_times = 3
+    # 重试初始等待时间（秒），每次重试翻倍
+    _retry_delay = 2
+    # 合并窗口（秒），窗口内同类消息合并发送
+    _coalesce_window = 10
+    # 窗口内同类消息达到该数量时合并为一条摘要
+    _coalesce_threshold = 3
+    # 摘要中每条消息内容的最大长度
+    _digest_text_length = 200
+
+    def __init__(self, name, sender):
+        """
+        :param name: 渠道名称
+        :param sender: 发送函数，参数为title/text/image/url/user_id，返回是否发送成功
+        """
+        self._name = name
+        self._sender = sender
+        self._queue = Queue(maxsize=self._maxsize)
+        self._last_send_time = 0
+        # 合并缓冲：合并类型 -> {"until": 窗口结束时间, "msgs": 缓冲的消息}
+        self._buffers = {}
+        self._lock = Lock()
+        self._thread = Thread(target=self.__run, daemon=True)
+        self._thread.start()
+
+    def put(self, title, text="", image="", url="", user_id="", coalesce=None):
+        """
+        消息入队，不阻塞调用方，队列满时丢弃
+        :param coalesce: 合并类型，相同类型的突发消息会被合并为一条摘要
+        """
+        try:
+            self._queue.put_nowait({
+                "title": title,
+                "text": text,
+                "image": image,
+                "url": url,
+                "user_id": user_id,
+                "coalesce": coalesce
+            })
+            return True
+        except Full:
+            log.warn(f"【Message】{self._name} 发送队列已满，消息被丢弃：{title}")
+            return False
+
+    def qsize(self):
+        """
+        待发送消息数
+        """
+        with self._lock:
+            return self._queue.qsize() + sum(len(buffer.get("msgs")) for buffer in self._buffers.values())
+
+    def stop(self):
+        """
+        停止发送线程，已入队的消息发送完后退出
+        """
+        self._queue.put(None)
+
+    def __run(self):
+        while True:
+            timeout = None
+            with self._lock:
+                if self._buffers:
+                    timeout = max(min(buffer.get("until") for buffer in self._buffers.values()) - time.time(), 0)
+            try:
+                msg = self._queue.get(timeout=timeout)
+            except Empty:
+                msg = {}
+            # 窗口结束的缓冲
+            with self._lock:
+                keys = [key for key, buffer in self._buffers.items() if buffer.get("until") <= time.time()]
+            for key in keys:
+                self.__flush(key)
+            if msg is None:
+                with self._lock:
+                    keys = list(self._buffers)
+                for key in keys:
+                    self.__flush(key)
+                break
+            if not msg:
+                continue
+            key = msg.get("coalesce")
+            with self._lock:
+                if key and key in self._buffers:
+                    self._buffers[key]["msgs"].append(msg)
+                    continue
+            self.__send(msg)
+            if key:
+                with self._lock:
+                    self._buffers[key] = {"until": time.time() + self._coalesce_window, "msgs": []}
+
+    def __flush(self, key):
+        """
+        发送合并缓冲中的消息，有消息时开启新的窗口，否则结束合并
+        """
+        with self._lock:
+            msgs = self._buffers.pop(key, {}).get("msgs")
+        if not msgs:
+            return
+        if len(msgs) >= self._coalesce_threshold:
+            self.__send({
+                "title": f"{msgs[0].get('title')} 等{len(msgs)}条消息",
+                "text": "\n\n".join([self.__digest_text(msg) for msg in msgs]),
+                "image": msgs[0].get("image"),
+                "url": msgs[0].get("url"),
+                "user_id": msgs[0].get("user_id")
+            })
+        else:
+            for msg in msgs:
+                self.__send(msg)
+        with self._lock:
+            self._buffers[key] = {"until": time.time() + self._coalesce_window, "msgs": []}
+
+    def __digest_text(self, msg):
+        """
+        摘要中的单条消息：标题及截断后的内容
+        """
+        text = str(msg.get("text") or "").strip()
+        if len(text) > self._digest_text_length:
+            text = text[:self._digest_text_length] + "..."
+        return f"{msg.get('title')}\n{text}" if text else msg.get("title")
+
+    def __send(self, msg):
+        """
+        限速发送，失败时按退避时间重试
+        """
+        delay = self._retry_delay
+        for i in range(self._retry_times + 1):
+            wait = self._last_send_time + self._interval - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_send_time = time.time()
+            try:
+                if self._sender(title=msg.get("title"),
+                                text=msg.get("text"),
+                                image=msg.get("image"),
+                                url=msg.get("url"),
+                                user_id=msg.get("user_id")):
+                    return True
+            except Exception as err:
+                log.error(f"【Message】{self._name} 消息发送出错：{str(err)}")
+            if i < self._retry_times:
+                time.sleep(delay)
+                delay *= 2
+        log.error(f"【Message】{self._name} 消息重试{self._retry_times}次后仍发送失败：{msg.get('title')}")
+        return False
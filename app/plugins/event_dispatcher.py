@@ -0,0 +1,337 @@
+import threading
+import time
+import traceback
+from collections import deque
+
+import log
+from app.utils.types import EventType
+
+
+class BackPressure:
+    """
+    插件事件队列已满时的处理策略
+    """
+    # 丢弃新事件
+    Drop = "drop"
+    # 合并：队列中已有相同类型、相同数据的待处理事件时不再重复加入，队列满时丢弃新事件
+    Coalesce = "coalesce"
+    # 阻塞分发线程直到队列有空位，超时后丢弃
+    Block = "block"
+
+
+# 事件类型 -> 队列满时的处理策略，未配置的按阻塞处理
+EVENT_POLICIES = {
+    # Webhook 中的播放类事件高频且有时效性，积压时丢弃；入库、删除等事件按阻塞处理
+    EventType.EmbyWebhook.value: BackPressure.Drop,
+    EventType.JellyfinWebhook.value: BackPressure.Drop,
+    EventType.PlexWebhook.value: BackPressure.Drop,
+    # 触发类事件重复执行没有意义，合并
+    EventType.PluginReload.value: BackPressure.Coalesce,
+    EventType.RefreshMediaServer.value: BackPressure.Coalesce,
+    EventType.DoubanSync.value: BackPressure.Coalesce,
+    EventType.AutoSeedStart.value: BackPressure.Coalesce,
+    EventType.SiteSignin.value: BackPressure.Coalesce,
+    EventType.CookieCloud.value: BackPressure.Coalesce,
+    EventType.MediaScrapStart.value: BackPressure.Coalesce,
+}
+
+
+# 媒体服务器 Webhook 事件类型
+WEBHOOK_EVENTS = [
+    EventType.EmbyWebhook.value,
+    EventType.JellyfinWebhook.value,
+    EventType.PlexWebhook.value
+]
+
+# 播放类 Webhook 事件名称前缀：Emby、Jellyfin、Plex
+PLAYBACK_WEBHOOK_EVENTS = ("playback.", "Playback", "media.play", "media.pause", "media.resume", "media.stop",
+                           "media.scrobble")
+
+
+def get_event_policy(event_type, event_data=None):
+    """
+    获取事件队列满时的处理策略，Webhook 只有播放类事件按配置丢弃
+    """
+    policy = EVENT_POLICIES.get(event_type, BackPressure.Block)
+    if event_type in WEBHOOK_EVENTS:
+        event_data = event_data if isinstance(event_data, dict) else {}
+        event_name = event_data.get("Event") or event_data.get("NotificationType") or event_data.get("event")
+        if not str(event_name or "").startswith(PLAYBACK_WEBHOOK_EVENTS):
+            return BackPressure.Block
+    return policy
+
+
+class PluginExecutor(object):
+    """
+    插件事件执行器：每个插件一个有界队列和一个工作线程，同一插件的事件按顺序处理，不同插件互不阻塞。
+    处理超时的事件无法强制中止，超时后由新的工作线程继续处理后续事件，原线程执行完当前事件后退出；
+    超时未结束的线程数达到上限后不再替换，等待当前事件处理完毕
+    """
+
+    def __init__(self, pid, runner, max_pending=100, timeout=300, block_timeout=30, max_stuck=2):
+        """
+        :param pid: 插件ID
+        :param runner: 执行事件的函数，参数为 (插件ID, 方法名, 事件)
+        :param max_pending: 最多积压的事件数
+        :param timeout: 单个事件处理超时时间（秒），0为不限制
+        :param block_timeout: 阻塞策略下最长等待队列空位的时间（秒）
+        :param max_stuck: 最多允许的超时未结束的工作线程数
+        """
+        self.pid = pid
+        self._runner = runner
+        self._max_pending = max_pending
+        self._timeout = timeout
+        self._block_timeout = block_timeout
+        self._max_stuck = max_stuck
+        # 超时被替换但仍未结束的工作线程数
+        self._stuck = 0
+        # 已提示达到线程上限的工作线程代数，避免重复提示
+        self._stuck_warned = None
+        self._cond = threading.Condition()
+        # 待处理的 (方法名, 事件)
+        self._pending = deque()
+        # 正在处理的 (方法名, 开始时间, 工作线程代数)
+        self._running = None
+        # 工作线程代数，超时替换工作线程时加一，旧线程发现代数变化后退出
+        self._generation = 0
+        self._active = True
+        self._max_depth = 0
+        # 方法名 -> 统计数据
+        self._metrics = {}
+        self.__start_worker()
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, timeout):
+        with self._cond:
+            self._timeout = timeout
+
+    def submit(self, method, event, policy=BackPressure.Block):
+        """
+        提交事件
+        :return: 是否加入队列
+        """
+        with self._cond:
+            if not self._active:
+                return False
+            if policy == BackPressure.Coalesce:
+                for pending_method, pending_event in self._pending:
+                    if pending_method == method \
+                            and pending_event.event_type == event.event_type \
+                            and pending_event.event_data == event.event_data:
+                        self.__metric(method)["coalesced"] += 1
+                        return False
+            if len(self._pending) >= self._max_pending:
+                if policy == BackPressure.Block:
+                    self._cond.wait_for(lambda: len(self._pending) < self._max_pending or not self._active,
+                                        self._block_timeout)
+                if len(self._pending) >= self._max_pending or not self._active:
+                    self.__metric(method)["dropped"] += 1
+                    log.warn(f"【Plugin】插件 {self.pid} 事件积压过多，已丢弃事件：{event.event_type}")
+                    return False
+            self._pending.append((method, event))
+            self._max_depth = max(self._max_depth, len(self._pending))
+            self._cond.notify_all()
+            return True
+
+    def check_timeout(self):
+        """
+        检查正在处理的事件是否超时，超时则启动新的工作线程处理后续事件
+        """
+        if not self._timeout:
+            return False
+        with self._cond:
+            if not self._running or not self._active:
+                return False
+            method, start, generation = self._running
+            if generation != self._generation or time.time() - start < self._timeout:
+                return False
+            if self._stuck >= self._max_stuck:
+                if self._stuck_warned != generation:
+                    self._stuck_warned = generation
+                    log.warn(f"【Plugin】插件 {self.pid} 处理事件超时：{method}，已运行 {int(time.time() - start)} 秒，"
+                             f"超时未结束的线程过多，等待当前事件处理完毕")
+                return False
+            self.__metric(method)["timeouts"] += 1
+            log.warn(f"【Plugin】插件 {self.pid} 处理事件超时：{method}，已运行 {int(time.time() - start)} 秒，"
+                     f"后续事件由新线程处理")
+            self._running = None
+            self._stuck += 1
+            self._generation += 1
+            self.__start_worker()
+            self._cond.notify_all()
+            return True
+
+    def shutdown(self, timeout=5):
+        """
+        停止执行器，丢弃未处理的事件，等待正在处理的事件结束
+        """
+        with self._cond:
+            self._active = False
+            self._pending.clear()
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: not self._running, timeout)
+
+    def get_metrics(self):
+        with self._cond:
+            handlers = {}
+            for method, metric in self._metrics.items():
+                handlers[method] = dict(metric,
+                                        avg_ms=round(metric["total_ms"] / metric["count"], 1)
+                                        if metric["count"] else 0)
+            return {
+                "pending": len(self._pending),
+                "max_pending": self._max_depth,
+                "running": self._running[0] if self._running else None,
+                "handlers": handlers
+            }
+
+    def __metric(self, method):
+        """
+        获取方法的统计数据，需在加锁后调用
+        """
+        metric = self._metrics.get(method)
+        if not metric:
+            metric = self._metrics[method] = {
+                "count": 0,
+                "errors": 0,
+                "timeouts": 0,
+                "dropped": 0,
+                "coalesced": 0,
+                "total_ms": 0,
+                "max_ms": 0,
+                "last_ms": 0
+            }
+        return metric
+
+    def __start_worker(self):
+        """
+        启动工作线程，需在加锁后调用
+        """
+        threading.Thread(target=self.__work,
+                         args=(self._generation,),
+                         name=f"PluginExecutor-{self.pid}",
+                         daemon=True).start()
+
+    def __work(self, generation):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending
+                                    or not self._active
+                                    or generation != self._generation)
+                if not self._active or generation != self._generation:
+                    return
+                method, event = self._pending.popleft()
+                start = time.time()
+                self._running = (method, start, generation)
+                self._cond.notify_all()
+            error = False
+            try:
+                self._runner(self.pid, method, event)
+            except Exception as e:
+                error = True
+                log.error(f"【Plugin】插件 {self.pid} 事件处理出错：{str(e)} - {traceback.format_exc()}")
+            elapsed = round((time.time() - start) * 1000)
+            with self._cond:
+                metric = self.__metric(method)
+                metric["count"] += 1
+                metric["total_ms"] += elapsed
+                metric["max_ms"] = max(metric["max_ms"], elapsed)
+                metric["last_ms"] = elapsed
+                if error:
+                    metric["errors"] += 1
+                if generation != self._generation:
+                    # 已被超时替换
+                    self._stuck -= 1
+                    return
+                self._running = None
+                self._cond.notify_all()
+
+
+class EventDispatcher(object):
+    """
+    插件事件分发：按插件分发到各自的执行器，并定期检查处理超时
+    """
+
+    def __init__(self, runner, max_pending=100, timeout=300, check_interval=5):
+        """
+        :param runner: 执行事件的函数，参数为 (插件ID, 方法名, 事件)
+        :param max_pending: 每个插件最多积压的事件数
+        :param timeout: 默认的事件处理超时时间（秒），插件可通过 module_event_timeout 属性覆盖
+        :param check_interval: 检查超时的间隔（秒）
+        """
+        self._runner = runner
+        self._max_pending = max_pending
+        self._timeout = timeout
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        # 插件ID -> 执行器
+        self._executors = {}
+        self._stop_event = None
+        self._monitor = None
+
+    def dispatch(self, event, handlers, timeouts=None):
+        """
+        分发事件
+        :param event: 事件
+        :param handlers: 事件处理函数列表
+        :param timeouts: 插件ID -> 超时时间（秒）
+        """
+        policy = get_event_policy(event.event_type, event.event_data)
+        for handler in handlers:
+            pid, method = handler.__qualname__.split(".")[-2:]
+            self.__get_executor(pid, (timeouts or {}).get(pid)).submit(method, event, policy)
+
+    def shutdown(self):
+        with self._lock:
+            executors, self._executors = list(self._executors.values()), {}
+            if self._stop_event:
+                self._stop_event.set()
+            self._monitor = None
+        for executor in executors:
+            executor.shutdown()
+
+    def get_metrics(self):
+        """
+        获取各插件的事件处理统计
+        """
+        with self._lock:
+            executors = list(self._executors.values())
+        return {executor.pid: executor.get_metrics() for executor in executors}
+
+    def __get_executor(self, pid, timeout=None):
+        timeout = self._timeout if timeout is None else timeout
+        with self._lock:
+            executor = self._executors.get(pid)
+            if not executor:
+                executor = self._executors[pid] = PluginExecutor(
+                    pid=pid,
+                    runner=self._runner,
+                    max_pending=self._max_pending,
+                    timeout=timeout
+                )
+            elif executor.timeout != timeout:
+                # 插件重新加载后超时时间可能变化
+                executor.timeout = timeout
+            if not self._monitor:
+                self._stop_event = threading.Event()
+                self._monitor = threading.Thread(target=self.__check_timeouts,
+                                                 args=(self._stop_event,),
+                                                 name="PluginEventMonitor",
+                                                 daemon=True)
+                self._monitor.start()
+            return executor
+
+    def __check_timeouts(self, stop_event):
+        while not stop_event.wait(self._check_interval):
+            with self._lock:
+                executors = list(self._executors.values())
+            for executor in executors:
+                executor.check_timeout()
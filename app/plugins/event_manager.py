@@ -1,6 +1,7 @@
 from queue import Queue, Empty
 
 import log
+from app.helper import ExistsCacheHelper
 from app.utils.commons import singleton
 from app.utils.types import EventType
 
@@ -68,6 +69,8 @@ class EventManager:
         event = Event(etype.value)
         event.event_data = data or {}
         log.debug(f"发送事件：{etype.value} - {event.event_data}")
+        # 媒体库发生变化时使存在性查询缓存失效
+        ExistsCacheHelper().invalidate_by_event(etype, event.event_data)
         self._eventQueue.put(event)
 
     def register(self, etype: [EventType, list]):
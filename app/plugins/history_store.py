@@ -0,0 +1,231 @@
+import json
+import threading
+
+import log
+from app.helper import DbHelper
+from app.utils import ExceptionUtils
+from app.utils.commons import singleton
+
+
+def is_obj(obj):
+    if isinstance(obj, list) or isinstance(obj, dict):
+        return True
+    else:
+        return str(obj).startswith("{") or str(obj).startswith("[")
+
+
+def encode_value(value):
+    """
+    对象转换为入库的字符串
+    """
+    if isinstance(value, str):
+        return value
+    if is_obj(value):
+        return json.dumps(value)
+    return str(value)
+
+
+def decode_value(value):
+    """
+    入库的字符串自动识别转换为对象
+    """
+    if is_obj(value):
+        try:
+            return json.loads(value)
+        except Exception as err:
+            print(str(err))
+    return value
+
+
+@singleton
+class PluginHistoryStore(object):
+    """
+    插件运行数据存储：按插件首次访问时一次性加载到内存，读取直接命中缓存，
+    写入和删除先更新缓存，由后台线程定期在一个事务中批量写回数据库
+    缓存中保存入库的字符串，每次读取都转换为新的对象，修改返回的对象不影响缓存
+    """
+    # 写回间隔（秒）
+    _flush_interval = 5
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # 写回串行执行
+        self._flush_lock = threading.Lock()
+        # 插件ID -> {KEY: 入库的字符串}，按入库顺序
+        self._caches = {}
+        # 插件ID -> 数据库中已存在的KEY
+        self._stored = {}
+        # 插件ID -> {KEY: 待写入的字符串，None为待删除}
+        self._dirty = {}
+        self._flusher = None
+        self._flush_event = threading.Event()
+
+    def get(self, plugin_id, key):
+        """
+        查询一条数据，不存在返回None
+        """
+        with self._lock:
+            value = self.__load(plugin_id).get(str(key))
+        return None if value is None else decode_value(value)
+
+    def get_many(self, plugin_id, keys):
+        """
+        批量查询
+        :return: {KEY: 对象}，不存在的KEY不返回
+        """
+        with self._lock:
+            cache = self.__load(plugin_id)
+            values = {str(key): cache[str(key)] for key in keys if str(key) in cache}
+        return {key: decode_value(value) for key, value in values.items()}
+
+    def get_all(self, plugin_id):
+        """
+        查询插件的所有数据
+        """
+        with self._lock:
+            values = list(self.__load(plugin_id).values())
+        return [decode_value(value) for value in values]
+
+    def scan(self, plugin_id, prefix):
+        """
+        按KEY前缀查询
+        :return: {KEY: 对象}
+        """
+        prefix = str(prefix or "")
+        with self._lock:
+            values = {key: value for key, value in self.__load(plugin_id).items() if key.startswith(prefix)}
+        return {key: decode_value(value) for key, value in values.items()}
+
+    def put(self, plugin_id, key, value):
+        """
+        写入一条数据，已存在时覆盖
+        """
+        self.put_many(plugin_id, {key: value})
+
+    def put_many(self, plugin_id, items):
+        """
+        批量写入，已存在时覆盖
+        :param items: {KEY: 对象}
+        """
+        if not items:
+            return
+        with self._lock:
+            cache = self.__load(plugin_id)
+            dirty = self._dirty.setdefault(plugin_id, {})
+            for key, value in items.items():
+                value = encode_value(value)
+                cache[str(key)] = value
+                dirty[str(key)] = value
+            self.__start_flusher()
+
+    def update(self, plugin_id, key, value):
+        """
+        更新已存在的数据
+        :return: 是否存在
+        """
+        with self._lock:
+            if str(key) not in self.__load(plugin_id):
+                return False
+            self.put(plugin_id, key, value)
+            return True
+
+    def delete(self, plugin_id, key):
+        """
+        删除一条数据
+        :return: 是否存在
+        """
+        with self._lock:
+            cache = self.__load(plugin_id)
+            if str(key) not in cache:
+                return False
+            cache.pop(str(key))
+            self._dirty.setdefault(plugin_id, {})[str(key)] = None
+            self.__start_flusher()
+            return True
+
+    def flush(self):
+        """
+        将所有待写入的数据在一个事务中写回数据库
+        """
+        with self._flush_lock:
+            return self.__flush()
+
+    def __flush(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            stored = {plugin_id: set(self._stored.get(plugin_id) or []) for plugin_id in dirty}
+        if not dirty:
+            return True
+        histories = []
+        for plugin_id, items in dirty.items():
+            inserts, updates, deletes = {}, {}, []
+            for key, value in items.items():
+                if value is None:
+                    if key in stored[plugin_id]:
+                        deletes.append(key)
+                elif key in stored[plugin_id]:
+                    updates[key] = value
+                else:
+                    inserts[key] = value
+            histories.append((plugin_id, inserts, updates, deletes))
+        if DbHelper().save_plugin_histories(histories):
+            with self._lock:
+                for plugin_id, inserts, _, deletes in histories:
+                    keys = self._stored.setdefault(plugin_id, set())
+                    keys.update(inserts.keys())
+                    keys.difference_update(deletes)
+            return True
+        # 写入失败时放回，后写入的数据优先
+        log.error("【Plugin】插件运行数据写入数据库失败，稍后重试")
+        with self._lock:
+            for plugin_id, items in dirty.items():
+                self._dirty[plugin_id] = dict(items, **self._dirty.get(plugin_id, {}))
+        return False
+
+    def stop(self):
+        """
+        停止后台写回，并写回所有数据
+        """
+        self._flush_event.set()
+        self.flush()
+
+    def __load(self, plugin_id):
+        """
+        加载插件的所有数据，需在加锁后调用
+        """
+        cache = self._caches.get(plugin_id)
+        if cache is not None:
+            return cache
+        cache = {}
+        for history in DbHelper().get_plugin_history(plugin_id=plugin_id, key=None) or []:
+            # 存在重复KEY时与原来一样以第一条为准
+            if history.KEY in cache:
+                continue
+            cache[history.KEY] = history.VALUE
+        self._caches[plugin_id] = cache
+        self._stored[plugin_id] = set(cache.keys())
+        return cache
+
+    def __start_flusher(self):
+        """
+        启动后台写回线程，需在加锁后调用
+        """
+        if self._flusher and self._flusher.is_alive():
+            return
+        self._flush_event.clear()
+        self._flusher = threading.Thread(target=self.__flush_loop, name="PluginHistoryFlusher", daemon=True)
+        self._flusher.start()
+
+    def __flush_loop(self):
+        """
+        定期写回，没有待写入的数据后退出
+        """
+        while not self._flush_event.wait(self._flush_interval):
+            try:
+                self.flush()
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+            with self._lock:
+                if not self._dirty:
+                    self._flusher = None
+                    return
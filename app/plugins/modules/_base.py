@@ -1,11 +1,10 @@
-import json
 import os
 from abc import ABCMeta, abstractmethod
 
 import log
 from app.conf import SystemConfig
-from app.helper import DbHelper
 from app.message import Message
+from app.plugins.history_store import PluginHistoryStore
 from config import Config
 
 
@@ -29,8 +28,12 @@ class _IPluginModule(metaclass=ABCMeta):
     - get_data_path() 获取插件数据保存目录
     - history() 记录插件运行数据，key需要唯一，value为对象
     - get_history() 获取插件运行数据
+    - get_histories() 批量获取插件运行数据
+    - scan_history() 按key前缀获取插件运行数据
+    - put_histories() 批量记录插件运行数据
     - update_history() 更新插件运行数据
     - delete_history() 删除插件运行数据
+    插件运行数据缓存在内存中，由后台定期批量写入数据库
     - get_command() 获取插件命令，使用消息机制通过远程控制
 
     """
@@ -54,6 +57,8 @@ class _IPluginModule(metaclass=ABCMeta):
     module_order = 0
     # 可使用的用户级别
     auth_level = 1
+    # 事件处理超时时间（秒），None为使用默认值，0为不限制
+    module_event_timeout = None
 
     @staticmethod
     @abstractmethod
@@ -85,13 +90,6 @@ class _IPluginModule(metaclass=ABCMeta):
         """
         pass
 
-    @staticmethod
-    def __is_obj(obj):
-        if isinstance(obj, list) or isinstance(obj, dict):
-            return True
-        else:
-            return str(obj).startswith("{") or str(obj).startswith("[")
-
     def update_config(self, config: dict, plugin_id=None):
         """
         更新配置信息
@@ -128,11 +126,9 @@ class _IPluginModule(metaclass=ABCMeta):
         """
         if not key or not value:
             return
-        if self.__is_obj(value):
-            value = json.dumps(value)
-        DbHelper().insert_plugin_history(plugin_id=self.__class__.__name__,
-                                         key=key,
-                                         value=value)
+        PluginHistoryStore().put(plugin_id=self.__class__.__name__,
+                                 key=key,
+                                 value=value)
 
     def get_history(self, key=None, plugin_id=None):
         """
@@ -140,28 +136,37 @@ class _IPluginModule(metaclass=ABCMeta):
         """
         if not plugin_id:
             plugin_id = self.__class__.__name__
+        if key:
+            return PluginHistoryStore().get(plugin_id=plugin_id, key=key)
+        return PluginHistoryStore().get_all(plugin_id=plugin_id)
+
+    def get_histories(self, keys, plugin_id=None):
+        """
+        批量获取插件运行数据
+        :return: {key: 对象}，不存在的key不返回
+        """
+        if not plugin_id:
+            plugin_id = self.__class__.__name__
+        return PluginHistoryStore().get_many(plugin_id=plugin_id, keys=keys or [])
+
+    def scan_history(self, prefix, plugin_id=None):
+        """
+        按key前缀获取插件运行数据
+        :return: {key: 对象}
+        """
+        if not plugin_id:
+            plugin_id = self.__class__.__name__
+        return PluginHistoryStore().scan(plugin_id=plugin_id, prefix=prefix)
 
-        historys = DbHelper().get_plugin_history(plugin_id=plugin_id, key=key)
-        if not isinstance(historys, list):
-            historys = [historys]
-        result = []
-        for history in historys:
-            if not history:
-                continue
-            if self.__is_obj(history.VALUE):
-                try:
-                    if key:
-                        return json.loads(history.VALUE)
-                    else:
-                        result.append(json.loads(history.VALUE))
-                    continue
-                except Exception as err:
-                    print(str(err))
-            if key:
-                return history.VALUE
-            else:
-                result.append(history.VALUE)
-        return None if key else result
+    def put_histories(self, items, plugin_id=None):
+        """
+        批量记录插件运行数据，已存在的key覆盖
+        :param items: {key: 对象}
+        """
+        if not plugin_id:
+            plugin_id = self.__class__.__name__
+        PluginHistoryStore().put_many(plugin_id=plugin_id,
+                                      items={key: value for key, value in (items or {}).items() if key and value})
 
     def update_history(self, key, value, plugin_id=None):
         """
@@ -171,9 +176,7 @@ class _IPluginModule(metaclass=ABCMeta):
             return False
         if not plugin_id:
             plugin_id = self.__class__.__name__
-        if self.__is_obj(value):
-            value = json.dumps(value)
-        return DbHelper().update_plugin_history(plugin_id=plugin_id, key=key, value=value)
+        return PluginHistoryStore().update(plugin_id=plugin_id, key=key, value=value)
 
     def delete_history(self, key, plugin_id=None):
         """
@@ -183,7 +186,7 @@ class _IPluginModule(metaclass=ABCMeta):
             return False
         if not plugin_id:
             plugin_id = self.__class__.__name__
-        return DbHelper().delete_plugin_history(plugin_id=plugin_id, key=key)
+        return PluginHistoryStore().delete(plugin_id=plugin_id, key=key)
 
     @staticmethod
     def send_message(title, text=None, image=None):
@@ -45,6 +45,8 @@ class AutoSignIn(_IPluginModule):
     module_order = 0
     # 可使用的用户级别
     auth_level = 2
+    # 事件处理耗时较长，不限制处理超时
+    module_event_timeout = 0
 
     # 私有属性
     eventmanager = None
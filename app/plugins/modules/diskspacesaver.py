@@ -1,11 +1,61 @@
-import copy
-import datetime
 import hashlib
-import json
 import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from app.plugins.modules._base import _IPluginModule
-from app.utils import SystemUtils
+from app.utils import ExceptionUtils
+
+
+class HashIndex(object):
+    """
+    文件哈希索引，以 (设备, inode) 为键保存快速指纹和完整SHA1，文件大小或修改时间变化后原有哈希失效
+    """
+
+    def __init__(self, db_path):
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS FILE_HASH ("
+                           "DEV INTEGER, INO INTEGER, SIZE INTEGER, MTIME INTEGER, PATH TEXT, "
+                           "FAST_HASH TEXT, FULL_HASH TEXT, SCAN_TIME INTEGER, "
+                           "PRIMARY KEY (DEV, INO))")
+        self._conn.commit()
+
+    def load(self):
+        """
+        加载所有索引
+        :return: {(设备, inode): 记录}
+        """
+        records = {}
+        for dev, ino, size, mtime, path, fast_hash, full_hash in self._conn.execute(
+                "SELECT DEV, INO, SIZE, MTIME, PATH, FAST_HASH, FULL_HASH FROM FILE_HASH"):
+            records[(dev, ino)] = {"dev": dev, "ino": ino, "size": size, "mtime": mtime, "path": path,
+                                   "fast": fast_hash, "full": full_hash}
+        return records
+
+    def save(self, records, scan_time):
+        """
+        在一个事务中保存本次扫描到的文件
+        """
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO FILE_HASH "
+                                   "(DEV, INO, SIZE, MTIME, PATH, FAST_HASH, FULL_HASH, SCAN_TIME) "
+                                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                   [(record["dev"], record["ino"], record["size"], record["mtime"],
+                                     record["path"], record["fast"], record["full"], scan_time)
+                                    for record in records])
+
+    def prune(self, folder_path, scan_time):
+        """
+        删除目录下本次扫描没有出现的文件
+        """
+        prefix = os.path.join(folder_path, "")
+        with self._conn:
+            self._conn.execute("DELETE FROM FILE_HASH WHERE SUBSTR(PATH, 1, ?) = ? AND SCAN_TIME < ?",
+                               (len(prefix), prefix, scan_time))
+
+    def close(self):
+        self._conn.close()
 
 
 class DiskSpaceSaver(_IPluginModule):
@@ -18,7 +68,7 @@ class DiskSpaceSaver(_IPluginModule):
     # 主题色
     module_color = "#FE9003"
     # 插件版本
-    module_version = "1.0"
+    module_version = "1.1"
     # 插件作者
     module_author = "link2fun"
     # 作者主页
@@ -33,6 +83,8 @@ class DiskSpaceSaver(_IPluginModule):
     # 私有属性
     _path = ''
     _size = 100
+    # 并行计算哈希的线程数
+    _hash_workers = 4
 
     @staticmethod
     def get_fields():
@@ -118,13 +170,9 @@ class DiskSpaceSaver(_IPluginModule):
         file_size = config.get('file_size')
         # config.get('ext_list') 用 , 分割为 list 并去除重复值
         ext_list = list(set(config.get('ext_list').split(',')))
-        result_path = os.path.join(self.get_data_path(), "sha1.json")
-        # 兼容旧配置
-        old_result_path = config.get("result_path")
-        if old_result_path:
-            del config["result_path"]
-            if os.path.exists(old_result_path) and not os.path.exists(result_path):
-                SystemUtils.move(old_result_path, result_path)
+        index_path = os.path.join(self.get_data_path(), "hash_index.db")
+        # 兼容旧配置，处理结果已改为保存到哈希索引
+        config.pop("result_path", None)
 
         dry_run = config.get('dry_run', False)
         fast = config.get('fast', False)
@@ -137,13 +185,22 @@ class DiskSpaceSaver(_IPluginModule):
         self.update_config(config)
 
         # 如果没有配置信息， 则不处理
-        if not path_list or not file_size or not ext_list or not result_path:
+        if not path_list or not file_size or not ext_list:
             self.info(f"磁盘空间释放配置信息不完整，不进行处理")
             return
 
         self.info(f"磁盘空间释放配置信息：{config}")
 
-        # 依次处理每个目录
+        index = HashIndex(index_path)
+        try:
+            self.__process_paths(index, path_list, ext_list, int(file_size), dry_run, fast)
+        finally:
+            index.close()
+
+    def __process_paths(self, index, path_list, ext_list, file_size, dry_run, fast):
+        """
+        依次处理每个目录
+        """
         for path in path_list:
             self.info(f"开始处理目录：{path}")
             # 如果目录不存在， 则不处理
@@ -161,14 +218,10 @@ class DiskSpaceSaver(_IPluginModule):
                 self.info(f"目录不是绝对路径，不进行处理")
                 continue
 
-            _last_result = self.load_last_result(result_path)
-            self.info(f"加载上次处理结果，共有 {len(_last_result['file_info'])} 个文件。")
-            _duplicates = self.find_duplicates(path, ext_list, int(file_size), _last_result, fast)
+            _duplicates = self.find_duplicates(path, ext_list, file_size, index, fast)
             self.info(f"找到 {len(_duplicates)} 个重复文件。")
             self.process_duplicates(_duplicates, dry_run)
             self.info(f"处理完毕。")
-            self.save_last_result(result_path, _last_result)
-            self.info(f"保存处理结果。")
 
     def get_state(self):
         return False
@@ -210,86 +263,104 @@ class DiskSpaceSaver(_IPluginModule):
                     h.update(buffer_view[:n])
         return h.hexdigest()
 
-    def find_duplicates(self, folder_path, _ext_list, _file_size, last_result, fast=False):
+    @staticmethod
+    def scan_files(folder_path):
+        """
+        遍历目录下的所有文件，返回文件路径和stat信息，stat由目录遍历结果缓存，不重复调用
+        """
+        dirs = [folder_path]
+        while dirs:
+            try:
+                with os.scandir(dirs.pop()) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                dirs.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                yield entry.path, entry.stat(follow_symlinks=False)
+                        except OSError as err:
+                            print(str(err))
+            except OSError as err:
+                print(str(err))
+
+    def __hash_records(self, records, fast):
+        """
+        使用线程池并行计算文件哈希，计算失败的文件不返回
+        :param fast: True 计算快速指纹，False 计算完整SHA1
+        :return: 计算成功的记录
+        """
+        def _hash(_record):
+            return self.get_sha1(_record["path"], fast=fast)
+
+        hashed = []
+        field = "fast" if fast else "full"
+        with ThreadPoolExecutor(max_workers=self._hash_workers) as executor:
+            for record, future in [(record, executor.submit(_hash, record)) for record in records]:
+                try:
+                    record[field] = future.result()
+                    hashed.append(record)
+                except Exception as err:
+                    ExceptionUtils.exception_traceback(err)
+                    self.warn(f'计算文件 {record["path"]} 的 SHA1 值出错：{str(err)}')
+        return hashed
+
+    def find_duplicates(self, folder_path, _ext_list, _file_size, index, fast=False):
         """
         查找重复的文件，返回字典，key 为文件的 SHA1 值，value 为文件路径的列表
+        大小相同的文件先比较文件头部/中间/尾部的快速指纹，快速指纹也相同时才计算完整SHA1（快速模式不计算），
+        大小和修改时间未变化的文件直接使用哈希索引中的结果
         """
-        duplicates = {}
+        scan_time = time.time_ns()
+        ext_list = [ext.strip().lower() for ext in _ext_list]
+        indexed = index.load()
+        # 文件大小 -> {(设备, inode): 记录}，硬链接的文件只保留一个
         file_group_by_size = {}
-        # 先进行依次过滤
-        for dirpath, dirnames, filenames in os.walk(folder_path):
-            for filename in filenames:
-                file_path = os.path.join(dirpath, filename)
-                file_ext = os.path.splitext(file_path)[1]
-                file_stat = os.stat(file_path)
-                file_size = file_stat.st_size
-                file_ino = f"{file_stat.st_dev}_{file_stat.st_ino}"
-                if file_ext.lower() not in _ext_list:
-                    continue
-
-                if file_size < _file_size * 1024 * 1024:
-                    continue
-                file_mtime = datetime.datetime.fromtimestamp(os.path.getmtime(file_path))
-                if file_group_by_size.get(file_size) is None:
-                    file_group_by_size[file_size] = []
-
-                file_group_by_size[file_size].append(
-                    {'filePath': file_path, 'fileExt': file_ext, 'fileSize': file_size,
-                     'fileModifyTime': str(file_mtime), 'fileIno': file_ino, 'sameIno': False})
-
-        # 循环 file_group_by_size
-        for file_size, file_list in file_group_by_size.items():
-            # 如果文件数量大于1，进行sha1计算
-            if len(file_list) <= 1:
-                # 没有大小一样的 不需要处理
-                self.debug(f'{file_list[0]["filePath"]} 大小相同的文件数量为1，无需计算sha1')
+        for file_path, file_stat in self.scan_files(folder_path):
+            if os.path.splitext(file_path)[1].lower() not in ext_list:
                 continue
-
-            file_list = copy.deepcopy(file_list)
-            # file_list中fileIno相同的文件，只保留一个
-            for file_info in file_list:
-                if file_info['sameIno']:
-                    continue
-                file_ino = file_info['fileIno']
-                for info in file_list:
-                    if file_ino == info['fileIno'] and file_info['filePath'] != info['filePath']:
-                        info['sameIno'] = True
-            file_list = [file_info for file_info in file_list if not file_info['sameIno']]
-            # 如果文件数量大于1，进行sha1计算
-            if len(file_list) <= 1:
-                # 没有大小一样的 不需要处理
-                self.debug(f'{file_list[0]["filePath"]} 排除硬链接后大小相同的文件数量为1，无需计算sha1')
+            file_size = file_stat.st_size
+            if file_size < _file_size * 1024 * 1024:
+                continue
+            file_key = (file_stat.st_dev, file_stat.st_ino)
+            group = file_group_by_size.setdefault(file_size, {})
+            if file_key in group:
+                self.debug(f'{file_path} 与 {group[file_key]["path"]} 是同一个文件')
                 continue
+            record = indexed.get(file_key)
+            if not record or record["size"] != file_size or record["mtime"] != file_stat.st_mtime_ns:
+                record = {"dev": file_stat.st_dev, "ino": file_stat.st_ino, "size": file_size,
+                          "mtime": file_stat.st_mtime_ns, "fast": None, "full": None}
+            record["path"] = file_path
+            group[file_key] = record
+
+        # 大小相同的文件计算快速指纹
+        candidates = [record for group in file_group_by_size.values() if len(group) > 1
+                      for record in group.values()]
+        pending = [record for record in candidates if not record["fast"]]
+        self.info(f"共有 {len(candidates)} 个大小相同的文件，需计算快速指纹 {len(pending)} 个")
+        self.__hash_records(pending, fast=True)
+        file_group_by_fast = {}
+        for record in candidates:
+            if record["fast"]:
+                file_group_by_fast.setdefault((record["size"], record["fast"]), []).append(record)
+
+        # 快速指纹也相同的文件计算完整SHA1
+        candidates = [record for group in file_group_by_fast.values() if len(group) > 1 for record in group]
+        if not fast:
+            pending = [record for record in candidates if not record["full"]]
+            self.info(f"共有 {len(candidates)} 个快速指纹相同的文件，需计算完整 SHA1 {len(pending)} 个")
+            self.__hash_records(pending, fast=False)
 
-            for file_info in file_list:
-                file_path = file_info['filePath']
-                file_mtime = file_info['fileModifyTime']
-                file_size = file_info['fileSize']
-                sha1 = None
-
-                # 查找是否存在相同路径的文件
-                for info in last_result['file_info']:
-                    if file_path == info['filePath']:
-                        # 如果文件大小和修改时间都一致，则直接使用之前计算的 sha1 值
-                        if file_size == info['fileSize'] and str(file_mtime) == info['fileModifyTime']:
-                            self.info(
-                                f'文件 {file_path} 的大小和修改时间与上次处理结果一致，直接使用上次处理结果')
-                            sha1 = info['fileSha1']
-                        break
-
-                if sha1 is None:
-                    self.info(f'计算文件 {file_path} 的 SHA1 值')
-                    sha1 = self.get_sha1(file_path, fast=fast)
-                    file_info = {'filePath': file_path,
-                                 'fileSize': file_size,
-                                 'fileModifyTime': str(file_mtime),
-                                 'fileSha1': sha1}
-                    last_result['file_info'].append(file_info)
-
-                if sha1 in duplicates:
-                    duplicates[sha1].append(file_path)
-                else:
-                    duplicates[sha1] = [file_path]
+        duplicates = {}
+        for record in candidates:
+            # 快速指纹只在大小相同时可比
+            sha1 = f'{record["size"]}_{record["fast"]}' if fast else record["full"]
+            if record["fast"] and (fast or record["full"]):
+                duplicates.setdefault(sha1, []).append(record["path"])
+
+        # 保存本次扫描结果，删除已不存在的文件
+        index.save([record for group in file_group_by_size.values() for record in group.values()], scan_time)
+        index.prune(folder_path, scan_time)
         return duplicates
 
     def process_duplicates(self, duplicates, dry_run=False):
@@ -327,22 +398,3 @@ class DiskSpaceSaver(_IPluginModule):
                     else:
                         self.info(f'文件 {files[0]} 和 {file_path} 不在同一个磁盘，无法用硬链接替换')
                         continue
-
-    @staticmethod
-    def load_last_result(last_result_path):
-        """
-        加载上次处理的结果
-        """
-        if os.path.exists(last_result_path):
-            with open(last_result_path, 'r') as f:
-                return json.load(f)
-        else:
-            return {'file_info': [], 'inode_info': []}
-
-    @staticmethod
-    def save_last_result(last_result_path, last_result):
-        """
-        保存处理结果到文件
-        """
-        with open(last_result_path, 'w') as f:
-            json.dump(last_result, f)
@@ -1,14 +1,13 @@
-import random
 from datetime import datetime, timedelta
 from threading import Event, Lock
-from time import sleep
 
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
 from jinja2 import Template
 
 from app.downloader import Downloader
-from app.media import DouBan
+from app.helper import DbHelper, DictHelper
+from app.media import DouBan, Media
 from app.media.meta import MetaInfo
 from app.plugins import EventHandler
 from app.plugins.modules._base import _IPluginModule
@@ -43,6 +42,8 @@ class DoubanSync(_IPluginModule):
     module_order = 17
     # 可使用的用户级别
     auth_level = 2
+    # 事件处理耗时较长，不限制处理超时
+    module_event_timeout = 0
 
     # 退出事件
     _event = Event()
@@ -63,6 +64,8 @@ class DoubanSync(_IPluginModule):
     _types = []
     _cookie = None
     _scheduler = None
+    # 同步位置的字典类型
+    _watermark_dtype = "DoubanSyncWatermark"
 
     def init_config(self, config: dict = None):
         self.douban = DouBan()
@@ -461,6 +464,8 @@ class DoubanSync(_IPluginModule):
         with lock:
             # 拉取豆瓣数据
             medias = self.__get_all_douban_movies()
+            # 已识别过的豆瓣条目
+            douban_medias = DbHelper().get_douban_medias([media.douban_id for media in medias])
             # 开始搜索
             for media in medias:
                 if not media or not media.get_name():
@@ -471,9 +476,7 @@ class DoubanSync(_IPluginModule):
                     if not history or history.get("state") == "NEW":
                         if self._auto_search:
                             # 需要搜索
-                            media_info = WebUtils.get_mediainfo_from_id(mtype=media.type,
-                                                                        mediaid=f"DB:{media.douban_id}",
-                                                                        wait=True)
+                            media_info = self.__get_media_info(media, douban_medias.get(str(media.douban_id)))
                             # 不需要自动加订阅，则直接搜索
                             if not media_info or not media_info.tmdb_info:
                                 self.warn("%s 未查询到媒体信息" % media.get_name())
@@ -550,6 +553,35 @@ class DoubanSync(_IPluginModule):
                     continue
             self.info("豆瓣数据同步完成")
 
+    @staticmethod
+    def __get_media_info(media, douban_media=None):
+        """
+        识别豆瓣条目，已识别过的直接按TMDBID查询，首次识别后记录TMDBID
+        """
+        if douban_media and douban_media.TMDB_ID:
+            media_info = WebUtils.get_mediainfo_from_id(mtype=media.type, mediaid=douban_media.TMDB_ID)
+            if media_info and media_info.tmdb_info:
+                media_info.douban_id = media.douban_id
+                return media_info
+        # 直接使用已保存的豆瓣标题、年份和类型识别，不再重复查询豆瓣详情，优先使用原始标题
+        media_info = None
+        for title in dict.fromkeys([media.original_title, media.get_name()]):
+            if not title:
+                continue
+            media_info = Media().get_media_info(title=f"{title} {media.year or ''}".strip(),
+                                                mtype=media.type,
+                                                append_to_response="all")
+            if media_info and media_info.tmdb_info:
+                break
+        if (not media_info or not media_info.tmdb_info) and media.imdb_id:
+            tmdbid = Media().get_tmdbid_by_imdbid(media.imdb_id)
+            if tmdbid:
+                media_info = WebUtils.get_mediainfo_from_id(mtype=media.type, mediaid=tmdbid)
+        if media_info and media_info.tmdb_info:
+            media_info.douban_id = media.douban_id
+            DbHelper().update_douban_media_tmdbid(douban_id=media.douban_id, tmdb_id=media_info.tmdb_id)
+        return media_info
+
     def __update_history(self, media, state):
         """
         插入历史记录
@@ -598,11 +630,19 @@ class DoubanSync(_IPluginModule):
                 for mtype in self._types:
                     if not mtype:
                         continue
-                    self.info(f"开始获取 {user_name or user} 的 {mtype} 数据...")
+                    # 上次同步到的标记日期，早于该日期的数据已处理过，不再翻页
+                    watermark_key = f"{user}:{mtype}:{self._days or 0}"
+                    watermark = DictHelper().get(self._watermark_dtype, watermark_key)
+                    self.info(f"开始获取 {user_name or user} 的 {mtype} 数据"
+                              f"{f'，上次同步至 {watermark}' if watermark else ''}...")
                     # 开始序号
                     start_number = 0
                     # 类型成功数量
                     user_type_succnum = 0
+                    # 本次获取到的最新标记日期
+                    latest_date = None
+                    # 是否已完整获取到上次同步的位置
+                    completed = False
                     # 每一页
                     while True:
                         # 页数
@@ -623,12 +663,20 @@ class DoubanSync(_IPluginModule):
                                 date = item.get("date")
                                 if not date:
                                     continue_next_page = False
+                                    completed = True
                                     break
                                 else:
+                                    if watermark and date < watermark:
+                                        continue_next_page = False
+                                        completed = True
+                                        break
                                     mark_date = datetime.strptime(date, '%Y-%m-%d')
                                     if self._days and not (datetime.now() - mark_date).days < int(self._days):
                                         continue_next_page = False
+                                        completed = True
                                         break
+                                    if not latest_date or date > latest_date:
+                                        latest_date = date
                                 doubanid = item.get("id")
                                 if str(doubanid).isdigit():
                                     self.info("解析到媒体：%s" % doubanid)
@@ -639,6 +687,10 @@ class DoubanSync(_IPluginModule):
                                     sucess_urlnum += 1
                                     user_type_succnum += 1
                                     user_succnum += 1
+                            # 不足一页说明已到最后一页
+                            if len(items) < perpage_number:
+                                completed = True
+                                continue_next_page = False
                             self.debug(
                                 f"{user_name or user} 第 {page_number} 页解析完成，共获取到 {sucess_urlnum} 个媒体")
                         except Exception as err:
@@ -650,6 +702,9 @@ class DoubanSync(_IPluginModule):
                             start_number += perpage_number
                         else:
                             break
+                    # 完整获取后才记录同步位置，中途出错的下次重新获取
+                    if completed and latest_date and latest_date != watermark:
+                        DictHelper().set(self._watermark_dtype, watermark_key, latest_date)
                     # 当前类型解析结束
                     self.debug(f"用户 {user_name or user} 的 {mtype} 解析完成，共获取到 {user_type_succnum} 个媒体")
                 self.info(f"用户 {user_name or user} 解析完成，共获取到 {user_succnum} 个媒体")
@@ -684,32 +739,55 @@ class DoubanSync(_IPluginModule):
                     self.debug(f"用户 {user_name or user} 的 {mtype} 解析完成，共获取到 {user_type_succnum} 个媒体")
                 self.debug(f"用户 {user_name or user} 解析完成，共获取到 {user_succnum} 个媒体")
 
+        # 未识别到媒体信息的条目不在本次获取的范围内时，重新识别
+        if self._auto_search:
+            for history in self.get_history():
+                if isinstance(history, dict) and history.get("state") == "NEW" and str(history.get("id")).isdigit() \
+                        and history.get("id") not in douban_ids:
+                    douban_ids[history.get("id")] = {}
         self.info(f"所有用户解析完成，共获取到 {len(douban_ids)} 个媒体")
-        # 查询豆瓣详情
+        # 已保存的豆瓣条目不再查询详情
+        douban_medias = DbHelper().get_douban_medias(list(douban_ids))
         for doubanid, info in douban_ids.items():
-            douban_info = self.douban.get_douban_detail(doubanid=doubanid, wait=True)
-            # 组装媒体信息
-            if not douban_info:
-                self.warn("%s 未正确获取豆瓣详细信息，尝试使用网页获取" % doubanid)
-                douban_info = self.douban.get_media_detail_from_web(doubanid)
+            douban_media = douban_medias.get(str(doubanid))
+            if douban_media:
+                meta_info = MetaInfo(title="%s %s" % (douban_media.TITLE, douban_media.YEAR or ""))
+                meta_info.type = MediaType.TV if douban_media.TYPE == MediaType.TV.value else MediaType.MOVIE
+                meta_info.original_title = douban_media.ORIGINAL_TITLE
+                meta_info.overview = douban_media.OVERVIEW
+                meta_info.poster_path = douban_media.IMAGE
+                meta_info.vote_average = douban_media.RATING or ""
+                meta_info.imdb_id = douban_media.IMDB_ID
+            else:
+                douban_info = self.douban.get_douban_detail(doubanid=doubanid, wait=True)
+                # 组装媒体信息
                 if not douban_info:
-                    self.warn("%s 无权限访问，需要配置豆瓣Cookie" % doubanid)
-                    # 随机休眠
-                    sleep(round(random.uniform(1, 5), 1))
-                    continue
-            media_type = MediaType.TV if douban_info.get("episodes_count") else MediaType.MOVIE
-            self.info("%s：%s %s".strip() % (media_type.value, douban_info.get("title"), douban_info.get("year")))
-            meta_info = MetaInfo(title="%s %s" % (douban_info.get("title"), douban_info.get("year") or ""))
+                    self.warn("%s 未正确获取豆瓣详细信息，尝试使用网页获取" % doubanid)
+                    douban_info = self.douban.get_media_detail_from_web(doubanid)
+                    if not douban_info:
+                        self.warn("%s 无权限访问，需要配置豆瓣Cookie" % doubanid)
+                        continue
+                media_type = MediaType.TV if douban_info.get("episodes_count") else MediaType.MOVIE
+                self.info("%s：%s %s".strip() % (media_type.value, douban_info.get("title"), douban_info.get("year")))
+                meta_info = MetaInfo(title="%s %s" % (douban_info.get("title"), douban_info.get("year") or ""))
+                meta_info.type = media_type
+                meta_info.original_title = douban_info.get("original_title")
+                meta_info.overview = douban_info.get("intro")
+                meta_info.poster_path = douban_info.get("cover_url")
+                rating = douban_info.get("rating", {}) or {}
+                meta_info.vote_average = rating.get("value") or ""
+                meta_info.imdb_id = douban_info.get("imdbid")
+                DbHelper().insert_douban_media(douban_id=doubanid,
+                                               mtype=media_type.value,
+                                               title=douban_info.get("title"),
+                                               original_title=meta_info.original_title,
+                                               year=douban_info.get("year"),
+                                               imdb_id=meta_info.imdb_id,
+                                               rating=str(meta_info.vote_average),
+                                               image=meta_info.poster_path,
+                                               overview=meta_info.overview)
             meta_info.douban_id = doubanid
-            meta_info.type = media_type
-            meta_info.overview = douban_info.get("intro")
-            meta_info.poster_path = douban_info.get("cover_url")
-            rating = douban_info.get("rating", {}) or {}
-            meta_info.vote_average = rating.get("value") or ""
-            meta_info.imdb_id = douban_info.get("imdbid")
             meta_info.user_name = info.get("user_name")
             if meta_info not in media_list:
                 media_list.append(meta_info)
-            # 随机休眠
-            sleep(round(random.uniform(1, 5), 1))
         return media_list
@@ -1,6 +1,7 @@
 import hashlib
 import json
 import time
+from threading import Lock
 
 from app.utils import RequestUtils
 from app.utils.commons import singleton
@@ -13,6 +14,8 @@ class IyuuHelper(object):
     _sites = {}
     _token = None
     _sid_sha1 = None
+    # 并发查询时站点列表只初始化一次
+    _init_lock = Lock()
 
     def __init__(self, token):
         self._token = token
@@ -91,8 +94,9 @@ class IyuuHelper(object):
     def get_torrent_url(self, sid):
         if not sid:
             return None, None
-        if not self._sites:
-            self._sites = self.__get_sites()
+        with self._init_lock:
+            if not self._sites:
+                self._sites = self.__get_sites()
         if not self._sites.get(sid):
             return None, None
         site = self._sites.get(sid)
@@ -166,8 +170,9 @@ class IyuuHelper(object):
             "version": "1.0.0"
         }
         """
-        if not self._sid_sha1:
-            self._sid_sha1 = self.__report_existing()
+        with self._init_lock:
+            if not self._sid_sha1:
+                self._sid_sha1 = self.__report_existing()
         info_hashs.sort()
         json_data = json.dumps(info_hashs, separators=(',', ':'), ensure_ascii=False)
         sha1 = self.get_sha1(json_data)
@@ -1,7 +1,8 @@
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from copy import deepcopy
 from datetime import datetime, timedelta
-from threading import Event
+from threading import Event, Lock
 
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -82,6 +83,15 @@ class IYUUAutoSeed(_IPluginModule):
     exist = 0
     fail = 0
     cached = 0
+    _count_lock = Lock()
+    # 每次查询IYUU的种子数
+    _chunk_size = 200
+    # 同时查询IYUU的请求数
+    _iyuu_workers = 3
+    # 同时处理的站点数，同一站点的种子按顺序处理
+    _site_workers = 4
+    # 同一站点两次下载种子的最小间隔（秒）
+    _site_interval = 1
 
     @staticmethod
     def get_fields():
@@ -427,14 +437,12 @@ class IYUUAutoSeed(_IPluginModule):
                 })
             if hash_strs:
                 self.info(f"总共需要辅种的种子数：{len(hash_strs)}")
-                # 分组处理，减少IYUU Api请求次数
-                chunk_size = 200
-                for i in range(0, len(hash_strs), chunk_size):
-                    # 切片操作
-                    chunk = hash_strs[i:i + chunk_size]
-                    # 处理分组
-                    self.__seed_torrents(hash_strs=chunk,
-                                         downloader=downloader)
+                self.__seed_torrents(hash_strs=hash_strs,
+                                     downloader=downloader,
+                                     downloader_type=downloader_type)
+                if self._event.is_set():
+                    self.info(f"辅种服务停止")
+                    return
                 # 触发校验检查
                 self.check_recheck()
             else:
@@ -496,70 +504,179 @@ class IYUUAutoSeed(_IPluginModule):
                 self._recheck_torrents[downloader] = []
         self._is_recheck_running = False
 
-    def __seed_torrents(self, hash_strs: list, downloader):
+    def __count(self, **kwargs):
+        """
+        辅种计数，站点线程并发调用
+        """
+        with self._count_lock:
+            for name, value in kwargs.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def __get_downloader_hashs(self, downloader, downloader_type):
         """
-        执行一批种子的辅种
+        一次查询下载器中所有种子的hash，用于判断辅种是否已存在，查询失败返回None
+        """
+        torrents = self.downloader.get_torrents(downloader_id=downloader)
+        if torrents is None:
+            self.warn(f"下载器 {downloader} 查询种子列表失败，将逐个检查种子是否存在")
+            return None
+        return {self.__get_hash(torrent, downloader_type) for torrent in torrents}
+
+    def __query_seeds(self, hashs):
+        """
+        分组并发查询IYUU可辅种数据
+        :param hashs: 下载器中已完成种子的hash
+        :return: [(当前种子hash, 可辅种种子)]，同一个种子只返回一次
+        """
+        chunks = [hashs[i:i + self._chunk_size] for i in range(0, len(hashs), self._chunk_size)]
+        seeds = []
+        seen = set(hashs)
+        with ThreadPoolExecutor(max_workers=self._iyuu_workers) as executor:
+            for seed_list, msg in executor.map(self.iyuuhelper.get_seed_info, chunks):
+                if not isinstance(seed_list, dict):
+                    self.warn(f"当前种子列表没有可辅种的站点：{msg}")
+                    continue
+                self.info(f"IYUU返回可辅种数：{len(seed_list)}")
+                for current_hash, seed_info in seed_list.items():
+                    if not seed_info:
+                        continue
+                    seed_torrents = seed_info.get("torrent")
+                    if not isinstance(seed_torrents, list):
+                        seed_torrents = [seed_torrents]
+                    for seed in seed_torrents:
+                        if not seed:
+                            continue
+                        if not isinstance(seed, dict):
+                            continue
+                        if not seed.get("sid") or not seed.get("info_hash"):
+                            continue
+                        info_hash = seed.get("info_hash")
+                        if info_hash in seen:
+                            self.debug(f"{info_hash} 已在下载器中，跳过 ...")
+                            continue
+                        if info_hash in self._success_caches:
+                            self.info(f"{info_hash} 已处理过辅种，跳过 ...")
+                            continue
+                        if info_hash in self._error_caches or info_hash in self._permanent_error_caches:
+                            self.info(f"种子 {info_hash} 辅种失败且已缓存，跳过 ...")
+                            continue
+                        seen.add(info_hash)
+                        seeds.append((current_hash, seed))
+        return seeds
+
+    def __seed_torrents(self, hash_strs: list, downloader, downloader_type):
+        """
+        执行下载器的辅种：分组并发查询IYUU，按站点分组后由各站点线程按顺序下载，
+        已存在的种子使用下载器种子列表快照判断，校验和历史记录在最后批量处理
         """
         if not hash_strs:
             return
         self.info(f"下载器 {downloader} 开始查询辅种，数量：{len(hash_strs)} ...")
-        # 下载器中的Hashs
-        hashs = [item.get("hash") for item in hash_strs]
         # 每个Hash的保存目录
         save_paths = {}
         for item in hash_strs:
             save_paths[item.get("hash")] = item.get("save_path")
+        # 下载器中所有种子的Hash
+        exist_hashs = self.__get_downloader_hashs(downloader, downloader_type)
         # 查询可辅种数据
-        seed_list, msg = self.iyuuhelper.get_seed_info(hashs)
-        if not isinstance(seed_list, dict):
-            self.warn(f"当前种子列表没有可辅种的站点：{msg}")
+        seeds = self.__query_seeds(hashs=list(save_paths.keys()))
+        if self._event.is_set():
             return
-        else:
-            self.info(f"IYUU返回可辅种数：{len(seed_list)}")
-        # 遍历
-        for current_hash, seed_info in seed_list.items():
-            if not seed_info:
+        # 按站点分组
+        site_tasks = {}
+        for current_hash, seed in seeds:
+            self.total += 1
+            # 获取种子站点及下载地址模板
+            site_url, download_page = self.iyuuhelper.get_torrent_url(seed.get("sid"))
+            if not site_url or not download_page:
+                # 加入缓存
+                self._error_caches.append(seed.get("info_hash"))
+                self.fail += 1
+                self.cached += 1
                 continue
-            seed_torrents = seed_info.get("torrent")
-            if not isinstance(seed_torrents, list):
-                seed_torrents = [seed_torrents]
-
-            # 本次辅种成功的种子
-            success_torrents = []
-
-            for seed in seed_torrents:
-                if not seed:
-                    continue
-                if not isinstance(seed, dict):
-                    continue
-                if not seed.get("sid") or not seed.get("info_hash"):
-                    continue
-                if seed.get("info_hash") in hashs:
-                    self.info(f"{seed.get('info_hash')} 已在下载器中，跳过 ...")
-                    continue
-                if seed.get("info_hash") in self._success_caches:
-                    self.info(f"{seed.get('info_hash')} 已处理过辅种，跳过 ...")
-                    continue
-                if seed.get("info_hash") in self._error_caches or seed.get("info_hash") in self._permanent_error_caches:
-                    self.info(f"种子 {seed.get('info_hash')} 辅种失败且已缓存，跳过 ...")
-                    continue
-                # 添加任务
-                success = self.__download_torrent(seed=seed,
-                                                  downloader=downloader,
-                                                  save_path=save_paths.get(current_hash))
-                if success:
-                    success_torrents.append(seed.get("info_hash"))
-
-            # 辅种成功的去重放入历史
-            if len(success_torrents) > 0:
-                self.__save_history(current_hash=current_hash,
-                                    downloader=downloader,
-                                    success_torrents=success_torrents)
+            # 查询站点
+            site_info = self.sites.get_sites(siteurl=site_url)
+            if not site_info:
+                self.debug(f"没有维护种子对应的站点：{site_url}")
+                continue
+            if self._sites and str(site_info.get("id")) not in self._sites:
+                self.info("当前站点不在选择的辅助站点范围，跳过 ...")
+                continue
+            self.realtotal += 1
+            # 查询hash值是否已经在下载器中
+            if exist_hashs is not None:
+                exists = seed.get("info_hash") in exist_hashs
+            else:
+                exists = self.downloader.get_torrents(downloader_id=downloader, ids=[seed.get("info_hash")])
+            if exists:
+                self.debug(f"{seed.get('info_hash')} 已在下载器中，跳过 ...")
+                self.exist += 1
+                continue
+            site_tasks.setdefault(site_info.get("id"), []).append({
+                "current_hash": current_hash,
+                "seed": seed,
+                "site": site_info,
+                "download_page": download_page,
+                "save_path": save_paths.get(current_hash)
+            })
+        if not site_tasks:
+            self.info(f"下载器 {downloader} 没有需要辅种的种子")
+            return
+        self.info(f"下载器 {downloader} 共 {sum(len(tasks) for tasks in site_tasks.values())} 个种子需要辅种，"
+                  f"涉及 {len(site_tasks)} 个站点")
+        # 本次辅种成功的种子：当前种子hash -> 辅种hash列表
+        success_torrents = {}
+        download_ids = []
+        with ThreadPoolExecutor(max_workers=self._site_workers) as executor:
+            futures = [executor.submit(self.__seed_site, tasks, downloader) for tasks in site_tasks.values()]
+            for future in as_completed(futures):
+                for current_hash, info_hash, download_id in future.result():
+                    success_torrents.setdefault(current_hash, []).append(info_hash)
+                    download_ids.append(download_id)
+        if download_ids:
+            # 追加校验任务
+            self.info(f"添加校验检查任务：{len(download_ids)} 个 ...")
+            self._recheck_torrents.setdefault(downloader, []).extend(download_ids)
+            # TR会自动校验
+            if downloader_type == DownloaderType.QB:
+                # 开始校验种子
+                self.downloader.recheck_torrents(downloader_id=downloader, ids=download_ids)
+        # 辅种成功的去重放入历史
+        if success_torrents:
+            self.__save_history(downloader=downloader,
+                                success_torrents=success_torrents)
 
         self.info(f"下载器 {downloader} 辅种完成")
 
-    def __save_history(self, current_hash, downloader, success_torrents):
+    def __seed_site(self, tasks, downloader):
+        """
+        按顺序下载同一站点的种子
+        :return: [(当前种子hash, 辅种hash, 下载任务ID)]
+        """
+        results = []
+        for i, task in enumerate(tasks):
+            if i and self._event.wait(self._site_interval):
+                break
+            if self._event.is_set():
+                break
+            try:
+                download_id = self.__download_torrent(seed=task.get("seed"),
+                                                      site_info=task.get("site"),
+                                                      download_page=task.get("download_page"),
+                                                      downloader=downloader,
+                                                      save_path=task.get("save_path"))
+            except Exception as e:
+                self.error(f"辅种出错：{str(e)}")
+                self.__count(fail=1)
+                continue
+            if download_id:
+                results.append((task.get("current_hash"), task.get("seed").get("info_hash"), download_id))
+        return results
+
+    def __save_history(self, downloader, success_torrents):
         """
+        批量保存辅种历史
+        :param success_torrents: 当前种子hash -> 辅种成功的hash列表
         [
             {
                 "downloader":"2",
@@ -579,38 +696,40 @@ class IYUUAutoSeed(_IPluginModule):
         """
         try:
             # 查询当前Hash的辅种历史
-            seed_history = self.get_history(key=current_hash) or []
+            seed_historys = self.get_histories(keys=list(success_torrents.keys()))
+            historys = {}
+            for current_hash, torrents in success_torrents.items():
+                seed_history = seed_historys.get(current_hash) or []
+                new_history = True
+                if len(seed_history) > 0:
+                    for history in seed_history:
+                        if not history:
+                            continue
+                        if not isinstance(history, dict):
+                            continue
+                        if not history.get("downloader"):
+                            continue
+                        # 如果本次辅种下载器之前有过记录则继续添加
+                        if int(history.get("downloader")) == downloader:
+                            history_torrents = history.get("torrents") or []
+                            history["torrents"] = list(set(history_torrents + torrents))
+                            new_history = False
+                            break
 
-            new_history = True
-            if len(seed_history) > 0:
-                for history in seed_history:
-                    if not history:
-                        continue
-                    if not isinstance(history, dict):
-                        continue
-                    if not history.get("downloader"):
-                        continue
-                    # 如果本次辅种下载器之前有过记录则继续添加
-                    if int(history.get("downloader")) == downloader:
-                        history_torrents = history.get("torrents") or []
-                        history["torrents"] = list(set(history_torrents + success_torrents))
-                        new_history = False
-                        break
-
-            # 本次辅种下载器之前没有成功记录则新增
-            if new_history:
-                seed_history.append({
-                    "downloader": downloader,
-                    "torrents": list(set(success_torrents))
-                })
+                # 本次辅种下载器之前没有成功记录则新增
+                if new_history:
+                    seed_history.append({
+                        "downloader": downloader,
+                        "torrents": list(set(torrents))
+                    })
+                historys[current_hash] = seed_history
 
             # 保存历史
-            self.history(key=current_hash,
-                         value=seed_history)
+            self.put_histories(items=historys)
         except Exception as e:
             print(str(e))
 
-    def __download_torrent(self, seed, downloader, save_path):
+    def __download_torrent(self, seed, site_info, download_page, downloader, save_path):
         """
         下载种子
         torrent: {
@@ -618,36 +737,12 @@ class IYUUAutoSeed(_IPluginModule):
                     "torrent_id": 377467,
                     "info_hash": "a444850638e7a6f6220e2efdde94099c53358159"
                 }
+        :return: 下载任务ID，失败返回None
         """
-        self.total += 1
-        # 获取种子站点及下载地址模板
-        site_url, download_page = self.iyuuhelper.get_torrent_url(seed.get("sid"))
-        if not site_url or not download_page:
-            # 加入缓存
-            self._error_caches.append(seed.get("info_hash"))
-            self.fail += 1
-            self.cached += 1
-            return False
-        # 查询站点
-        site_info = self.sites.get_sites(siteurl=site_url)
-        if not site_info:
-            self.debug(f"没有维护种子对应的站点：{site_url}")
-            return False
-        if self._sites and str(site_info.get("id")) not in self._sites:
-            self.info("当前站点不在选择的辅助站点范围，跳过 ...")
-            return False
-        self.realtotal += 1
-        # 查询hash值是否已经在下载器中
-        torrent_info = self.downloader.get_torrents(downloader_id=downloader,
-                                                    ids=[seed.get("info_hash")])
-        if torrent_info:
-            self.debug(f"{seed.get('info_hash')} 已在下载器中，跳过 ...")
-            self.exist += 1
-            return False
         # 站点流控
         if self.sites.check_ratelimit(site_info.get("id")):
-            self.fail += 1
-            return False
+            self.__count(fail=1)
+            return None
         # 下载种子
         torrent_url = self.__get_download_url(seed=seed,
                                               site=site_info,
@@ -655,9 +750,8 @@ class IYUUAutoSeed(_IPluginModule):
         if not torrent_url:
             # 加入失败缓存
             self._error_caches.append(seed.get("info_hash"))
-            self.fail += 1
-            self.cached += 1
-            return False
+            self.__count(fail=1, cached=1)
+            return None
         # 强制使用Https
         if "?" in torrent_url:
             torrent_url += "&https=1"
@@ -680,32 +774,21 @@ class IYUUAutoSeed(_IPluginModule):
             self.warn(f"添加下载任务出错，"
                       f"错误原因：{retmsg or '下载器添加任务失败'}，"
                       f"种子链接：{torrent_url}")
-            self.fail += 1
+            self.__count(fail=1)
             # 加入失败缓存
             if retmsg and ('无法打开链接' in retmsg or '触发站点流控' in retmsg):
                 self._error_caches.append(seed.get("info_hash"))
             else:
                 # 种子不存在的情况
                 self._permanent_error_caches.append(seed.get("info_hash"))
-            return False
+            return None
         else:
-            self.success += 1
-            # 追加校验任务
-            self.info(f"添加校验检查任务：{download_id} ...")
-            if not self._recheck_torrents.get(downloader):
-                self._recheck_torrents[downloader] = []
-            self._recheck_torrents[downloader].append(download_id)
+            self.__count(success=1)
             # 下载成功
             self.info(f"成功添加辅种下载，站点：{site_info.get('name')}，种子链接：{torrent_url}")
-            # TR会自动校验
-            downloader_type = self.downloader.get_downloader_type(downloader_id=downloader)
-            if downloader_type == DownloaderType.QB:
-                # 开始校验种子
-                self.downloader.recheck_torrents(downloader_id=downloader, ids=[download_id])
-
             # 成功也加入缓存，有一些改了路径校验不通过的，手动删除后，下一次又会辅上
             self._success_caches.append(seed.get("info_hash"))
-            return True
+            return download_id
 
     @staticmethod
     def __get_hash(torrent, dl_type):
@@ -33,6 +33,8 @@ class LibraryScraper(_IPluginModule):
     module_order = 7
     # 可使用的用户级别
     user_level = 1
+    # 事件处理耗时较长，不限制处理超时
+    module_event_timeout = 0
 
     # 私有属性
     _scheduler = None
@@ -30,6 +30,8 @@ class MediaSyncDel(_IPluginModule):
     module_order = 15
     # 可使用的用户级别
     auth_level = 1
+    # 事件处理耗时较长，不限制处理超时
+    module_event_timeout = 0
 
     # 私有属性
     filetransfer = None
@@ -9,7 +9,9 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import log
 from app.conf import SystemConfig
 from app.helper import SubmoduleHelper
+from app.plugins.event_dispatcher import EventDispatcher
 from app.plugins.event_manager import EventManager
+from app.plugins.history_store import PluginHistoryStore
 from app.utils import SystemUtils, PathUtils, ImageUtils, RequestUtils, ExceptionUtils
 from app.utils.commons import singleton
 from app.utils.types import SystemConfigKey
@@ -37,6 +39,8 @@ class PluginManager:
     _config_key = "plugin.%s"
     # 事件处理线程
     _thread = None
+    # 插件事件分发
+    _dispatcher = None
     # 开关
     _active = False
 
@@ -70,12 +74,26 @@ class PluginManager:
             event, handlers = self.eventmanager.get_event()
             if event:
                 log.info(f"处理事件：{event.event_type} - {handlers}")
-                for handler in handlers:
-                    try:
-                        names = handler.__qualname__.split(".")
-                        self.run_plugin(names[0], names[1], event)
-                    except Exception as e:
-                        log.error(f"事件处理出错：{str(e)} - {traceback.format_exc()}")
+                try:
+                    self._dispatcher.dispatch(event, handlers, self.__get_event_timeouts())
+                except Exception as e:
+                    log.error(f"事件分发出错：{str(e)} - {traceback.format_exc()}")
+
+    def __run_event(self, pid, method, event):
+        """
+        在插件执行器中处理事件，异常由执行器记录
+        """
+        plugin = self._running_plugins.get(pid)
+        if not plugin or not hasattr(plugin, method):
+            return
+        getattr(plugin, method)(event)
+
+    def __get_event_timeouts(self):
+        """
+        插件自定义的事件处理超时时间
+        """
+        return {pid: plugin.module_event_timeout for pid, plugin in self._running_plugins.items()
+                if getattr(plugin, "module_event_timeout", None) is not None}
 
     def start_service(self):
         """
@@ -83,6 +101,8 @@ class PluginManager:
         """
         # 加载插件
         self.__load_plugins()
+        # 每个插件独立的事件执行器
+        self._dispatcher = EventDispatcher(runner=self.__run_event)
         # 将事件管理器设为启动
         self._active = True
         self._thread = Thread(target=self.__run)
@@ -98,8 +118,13 @@ class PluginManager:
         # 等待事件处理线程退出
         if self._thread:
             self._thread.join()
+        # 停止插件事件执行器
+        if self._dispatcher:
+            self._dispatcher.shutdown()
         # 停止所有插件
         self.__stop_plugins()
+        # 写回插件运行数据
+        PluginHistoryStore().stop()
 
     def __load_plugins(self):
         """
@@ -230,6 +255,7 @@ class PluginManager:
         获取所有插件配置
         """
         all_confs = {}
+        metrics = self.get_plugin_metrics()
         for pid, plugin in self._running_plugins.items():
             # 基本属性
             conf = {}
@@ -267,10 +293,20 @@ class PluginManager:
             conf.update({"config": self.get_plugin_config(pid)})
             # 状态
             conf.update({"state": plugin.get_state()})
+            # 事件处理统计
+            conf.update({"metrics": metrics.get(pid)})
             # 汇总
             all_confs[pid] = conf
         return all_confs
 
+    def get_plugin_metrics(self):
+        """
+        获取各插件的事件处理统计：积压数、各处理函数的次数、耗时、错误、超时、丢弃和合并数
+        """
+        if not self._dispatcher:
+            return {}
+        return self._dispatcher.get_metrics()
+
     def get_plugin_apps(self, auth_level):
         """
         获取所有插件
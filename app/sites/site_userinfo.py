@@ -12,6 +12,7 @@ from app.sites.sites import Sites
 from app.utils import RequestUtils, ExceptionUtils, StringUtils
 from app.utils.commons import singleton
 from config import Config
+from app.sites.siteuserinfo._base import _ISiteUserInfo
 from app.sites.siteuserinfo.mteam_torrent import MTeamTorrentUserInfo
 
 lock = Lock()
@@ -26,6 +27,8 @@ class SiteUserInfo(object):
     _MAX_CONCURRENCY = 10
     _last_update_time = None
     _sites_data = {}
+    # 站点地址对应的解析模型
+    _sites_schema = {}
 
     def __init__(self):
 
@@ -44,11 +47,15 @@ class SiteUserInfo(object):
         self._last_update_time = None
         # 站点数据
         self._sites_data = {}
+        # 站点解析模型
+        self._sites_schema = {}
 
     def __build_class(self, html_text):
+        # 各解析模型共用同一次提取的可见文本
+        printable_text = _ISiteUserInfo.get_printable_text(html_text)
         for site_schema in self._site_schema:
             try:
-                if site_schema.match(html_text):
+                if site_schema.match(html_text, printable_text):
                     return site_schema
             except Exception as e:
                 ExceptionUtils.exception_traceback(e)
@@ -142,11 +149,14 @@ class SiteUserInfo(object):
             else:
                 log.error(f"【Sites】站点 {site_name} 无法访问：{url}")
                 return None
-        # 解析站点类型
-        site_schema = self.__build_class(html_text)
+        # 解析站点类型，识别结果按站点地址缓存
+        site_schema = self._sites_schema.get(url)
         if not site_schema:
-            log.error("【Sites】站点 %s 无法识别站点类型" % site_name)
-            return None
+            site_schema = self.__build_class(html_text)
+            if not site_schema:
+                log.error("【Sites】站点 %s 无法识别站点类型" % site_name)
+                return None
+            self._sites_schema[url] = site_schema
         return site_schema(site_name, url, site_cookie, html_text, session=session, ua=ua, emulate=emulate, proxy=proxy, apikey=apikey)
 
     def __refresh_site_data(self, site_info):
@@ -184,6 +194,8 @@ class SiteUserInfo(object):
                 # 获取不到数据时，仅返回错误信息，不做历史数据更新
                 if site_user_info.err_msg:
                     self._sites_data.update({site_name: {"err_msg": site_user_info.err_msg}})
+                    # 下次重新识别站点类型
+                    self._sites_schema.pop(site_url, None)
                     return
 
                 # 发送通知，存在未读消息
@@ -311,6 +323,8 @@ class SiteUserInfo(object):
 
             # 登记历史数据
             self.dbhelper.insert_site_statistics_history(site_user_infos)
+            # 日汇总和月汇总
+            self.dbhelper.update_site_statistics_rollup(site_user_infos)
             # 实时用户数据
             self.dbhelper.update_site_user_statistics(site_user_infos)
             # 更新站点图标
@@ -335,6 +349,22 @@ class SiteUserInfo(object):
 
         return self.dbhelper.get_site_statistics_recent_sites(days=days, end_day=end_day, strict_urls=site_urls)
 
+    def get_pt_site_monthly_statistics(self, months=12):
+        """
+        获取站点每月上传下载量
+        :param months: 最近几个月
+        :return: [{"month", "site", "upload", "download", "days"}]
+        """
+        site_urls = [site.get("strict_url") for site in self.sites.get_sites(statistic=True)
+                     if site.get("strict_url")]
+        return [{
+            "month": row.MONTH,
+            "site": row.SITE,
+            "upload": row.UPLOAD_INC,
+            "download": row.DOWNLOAD_INC,
+            "days": row.DAYS
+        } for row in self.dbhelper.get_site_statistics_monthly(months=months, strict_urls=site_urls)]
+
     def get_site_user_statistics(self, sites=None, encoding="RAW"):
         """
         获取站点用户数据
@@ -3,6 +3,7 @@ import base64
 import json
 import re
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin, urlsplit
 
 import requests
@@ -23,6 +24,8 @@ class _ISiteUserInfo(metaclass=ABCMeta):
     schema = SiteSchema.NexusPhp
     # 站点解析时判断顺序，值越小越先解析
     order = SITE_BASE_ORDER
+    # 做种页面并发预取数
+    _seeding_prefetch_workers = 4
 
     def __init__(self, site_name, url, site_cookie, index_html, session=None, ua=None, emulate=False, proxy=None, apikey=None):
         super().__init__()
@@ -68,6 +71,8 @@ class _ISiteUserInfo(metaclass=ABCMeta):
         self._site_cookie = None
         self._index_html = None
         self._addition_headers = None
+        # 已解析的页面，同一页面在各解析步骤中只解析一次
+        self._html_docs = {}
 
         # 站点页面
         self._brief_page = "index.php"
@@ -101,11 +106,31 @@ class _ISiteUserInfo(metaclass=ABCMeta):
         """
         return self.schema
 
+    @staticmethod
+    def get_printable_text(html_text):
+        """
+        获取页面的可见文本，匹配解析模型时只提取一次，传给各解析模型的match
+        """
+        html = etree.HTML(html_text)
+        return html.xpath("string(.)") if html else ""
+
+    def _get_html(self, html_text):
+        """
+        解析页面，相同内容的页面只解析一次
+        """
+        if html_text not in self._html_docs:
+            # 只保留最近解析的几个页面
+            if len(self._html_docs) >= 8:
+                self._html_docs.pop(next(iter(self._html_docs)))
+            self._html_docs[html_text] = etree.HTML(html_text)
+        return self._html_docs[html_text]
+
     @classmethod
-    def match(cls, html_text):
+    def match(cls, html_text, printable_text=""):
         """
         是否匹配当前解析模型
         :param html_text: 站点首页html
+        :param printable_text: 站点首页的可见文本
         :return: 是否匹配
         """
         return False
@@ -129,6 +154,7 @@ class _ISiteUserInfo(metaclass=ABCMeta):
 
         self._parse_seeding_pages()
         self.seeding_info = json.dumps(self.seeding_info)
+        self._html_docs = {}
 
     def _pase_unread_msgs(self):
         """
@@ -160,10 +186,20 @@ class _ISiteUserInfo(metaclass=ABCMeta):
     def _parse_seeding_pages(self):
         if self._torrent_seeding_page:
             # 第一页
-            next_page = self._parse_user_torrent_seeding_info(
-                self._get_page_content(urljoin(self._base_url, self._torrent_seeding_page),
-                                       self._torrent_seeding_params,
-                                       self._torrent_seeding_headers))
+            html_text = self._get_page_content(urljoin(self._base_url, self._torrent_seeding_page),
+                                               self._torrent_seeding_params,
+                                               self._torrent_seeding_headers)
+            next_page = self._parse_user_torrent_seeding_info(html_text)
+            # 已知总页数时并发获取其余页面
+            prefetch = self.__prefetch_seeding_pages(html_text, next_page)
+            if prefetch is not None:
+                last_page, prefetch_pages = prefetch
+                for page_html in prefetch_pages:
+                    next_page = self._parse_user_torrent_seeding_info(page_html, multi_page=True)
+                # 分页只显示部分页码时，从最后一个已获取页面的下一页开始逐页获取
+                page_match = re.search(r"[?&]page=(\d+)", next_page or "")
+                if not page_match or int(page_match.group(1)) <= last_page:
+                    return
 
             # 其他页处理
             while next_page:
@@ -173,6 +209,43 @@ class _ISiteUserInfo(metaclass=ABCMeta):
                                            self._torrent_seeding_headers),
                     multi_page=True)
 
+    def __prefetch_seeding_pages(self, html_text, next_page):
+        """
+        根据第一页的分页链接计算其余页面地址并并发获取
+        :return: 已获取的最后页码及按页码顺序排列的页面内容，无法确定总页数时返回None
+        """
+        # 浏览器仿真不支持并发，POST分页不在链接中
+        if not next_page or self._emulate or self._torrent_seeding_params:
+            return None
+        page_match = re.search(r"([?&]page=)(\d+)", next_page)
+        if not page_match:
+            return None
+        last_page = self._parse_seeding_page_count(html_text, next_page)
+        first_page = int(page_match.group(2))
+        if not last_page or last_page < first_page:
+            return None
+        page_urls = [urljoin(urljoin(self._base_url, self._torrent_seeding_page),
+                             next_page[:page_match.start(2)] + str(page) + next_page[page_match.end(2):])
+                     for page in range(first_page, last_page + 1)]
+        log.debug(f"【Sites】{self.site_name} 并发获取做种页面 {len(page_urls)} 页")
+        with ThreadPoolExecutor(max_workers=min(len(page_urls), self._seeding_prefetch_workers)) as executor:
+            return last_page, list(executor.map(
+                lambda url: self._get_page_content(url, headers=self._torrent_seeding_headers), page_urls))
+
+    def _parse_seeding_page_count(self, html_text, next_page):
+        """
+        从做种页面中与下页地址相同路径的分页链接解析最后一页的页码
+        :return: 最后一页页码，无法解析时返回None
+        """
+        html = self._get_html(str(html_text).replace(r'\/', '/'))
+        if not html:
+            return None
+        page_path = next_page.split("?")[0]
+        pages = [int(page) for href in html.xpath('//a[contains(@href, "page=")]/@href')
+                 if href.split("?")[0] == page_path
+                 for page in re.findall(r"[?&]page=(\d+)", href)]
+        return max(pages) if pages else None
+
     @staticmethod
     def _prepare_html_text(html_text):
         """
@@ -195,7 +268,7 @@ class _ISiteUserInfo(metaclass=ABCMeta):
         :param html_text:
         :return:
         """
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         if html:
             fav_link = html.xpath('//head/link[contains(@rel, "icon")]/@href')
             if fav_link:
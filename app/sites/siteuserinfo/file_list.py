@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 import re
 
-from lxml import etree
-
 from app.sites.siteuserinfo._base import _ISiteUserInfo, SITE_BASE_ORDER
 from app.utils import StringUtils
 from app.utils.types import SiteSchema
@@ -13,12 +11,7 @@ class FileListSiteUserInfo(_ISiteUserInfo):
     order = SITE_BASE_ORDER + 50
 
     @classmethod
-    def match(cls, html_text):
-        html = etree.HTML(html_text)
-        if not html:
-            return False
-
-        printable_text = html.xpath("string(.)") if html else ""
+    def match(cls, html_text, printable_text=""):
         return 'Powered by FileList' in printable_text
 
     def _parse_site_page(self, html_text):
@@ -33,7 +26,7 @@ class FileListSiteUserInfo(_ISiteUserInfo):
 
     def _parse_user_base_info(self, html_text):
         html_text = self._prepare_html_text(html_text)
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
 
         ret = html.xpath(f'//a[contains(@href, "userdetails") and contains(@href, "{self.userid}")]//text()')
         if ret:
@@ -49,7 +42,7 @@ class FileListSiteUserInfo(_ISiteUserInfo):
 
     def _parse_user_detail_info(self, html_text):
         html_text = self._prepare_html_text(html_text)
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
 
         upload_html = html.xpath('//table//tr/td[text()="Uploaded"]/following-sibling::td//text()')
         if upload_html:
@@ -80,7 +73,7 @@ class FileListSiteUserInfo(_ISiteUserInfo):
         :param multi_page: 是否多页数据
         :return: 下页地址
         """
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         if not html:
             return None
 
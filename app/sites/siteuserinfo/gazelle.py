@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 import re
 
-from lxml import etree
-
 from app.sites.siteuserinfo._base import _ISiteUserInfo, SITE_BASE_ORDER
 from app.utils import StringUtils
 from app.utils.types import SiteSchema
@@ -13,18 +11,13 @@ class GazelleSiteUserInfo(_ISiteUserInfo):
     order = SITE_BASE_ORDER
 
     @classmethod
-    def match(cls, html_text):
-        html = etree.HTML(html_text)
-        if not html:
-            return False
-
-        printable_text = html.xpath("string(.)") if html else ""
+    def match(cls, html_text, printable_text=""):
 
         return "Powered by Gazelle" in printable_text or "DIC Music" in printable_text
 
     def _parse_user_base_info(self, html_text):
         html_text = self._prepare_html_text(html_text)
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
 
         tmps = html.xpath('//a[contains(@href, "user.php?id=")]')
         if tmps:
@@ -76,7 +69,7 @@ class GazelleSiteUserInfo(_ISiteUserInfo):
         :param html_text:
         :return:
         """
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         if not html:
             return None
 
@@ -106,7 +99,7 @@ class GazelleSiteUserInfo(_ISiteUserInfo):
         :param multi_page: 是否多页数据
         :return: 下页地址
         """
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         if not html:
             return None
 
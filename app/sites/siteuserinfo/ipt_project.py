@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 import re
 
-from lxml import etree
-
 from app.sites.siteuserinfo._base import _ISiteUserInfo, SITE_BASE_ORDER
 from app.utils import StringUtils
 from app.utils.types import SiteSchema
@@ -13,12 +11,12 @@ class IptSiteUserInfo(_ISiteUserInfo):
     order = SITE_BASE_ORDER + 35
 
     @classmethod
-    def match(cls, html_text):
+    def match(cls, html_text, printable_text=""):
         return 'IPTorrents' in html_text
 
     def _parse_user_base_info(self, html_text):
         html_text = self._prepare_html_text(html_text)
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         tmps = html.xpath('//a[contains(@href, "/u/")]//text()')
         tmps_id = html.xpath('//a[contains(@href, "/u/")]/@href')
         if tmps:
@@ -44,7 +42,7 @@ class IptSiteUserInfo(_ISiteUserInfo):
         pass
 
     def _parse_user_detail_info(self, html_text):
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         if not html:
             return
 
@@ -58,7 +56,7 @@ class IptSiteUserInfo(_ISiteUserInfo):
             self.join_at = StringUtils.unify_datetime_str(join_at_text[0].split(' (')[0])
 
     def _parse_user_torrent_seeding_info(self, html_text, multi_page=False):
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         if not html:
             return
         # seeding start
@@ -30,7 +30,7 @@ class MTeamTorrentUserInfo(_ISiteUserInfo):
     order = SITE_BASE_ORDER + 100
 
     @classmethod
-    def match(cls, html_text):
+    def match(cls, html_text, printable_text=""):
         # 馒头手动绑定
         return False
 
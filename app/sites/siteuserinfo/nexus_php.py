@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 import re
 
-from lxml import etree
-
 import log
 from app.sites.siteuserinfo._base import _ISiteUserInfo, SITE_BASE_ORDER
 from app.utils import StringUtils
@@ -15,7 +13,7 @@ class NexusPhpSiteUserInfo(_ISiteUserInfo):
     order = SITE_BASE_ORDER * 2
 
     @classmethod
-    def match(cls, html_text):
+    def match(cls, html_text, printable_text=""):
         """
         默认使用NexusPhp解析
         :param html_text:
@@ -44,7 +42,7 @@ class NexusPhpSiteUserInfo(_ISiteUserInfo):
         :param html_text:
         :return:
         """
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         if not html:
             return
 
@@ -67,7 +65,7 @@ class NexusPhpSiteUserInfo(_ISiteUserInfo):
 
         self._parse_message_unread(html_text)
 
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         if not html:
             return
 
@@ -85,7 +83,7 @@ class NexusPhpSiteUserInfo(_ISiteUserInfo):
             return
 
     def __parse_user_traffic_info(self, html_text):
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         html_text = self._prepare_html_text(html_text)
         upload_match = re.search(r"[^总]上[传傳]量?[:：_<>/a-zA-Z-=\"'\s#;]+([\d,.\s]+[KMGTPI]*B)", html_text,
                                  re.IGNORECASE)
@@ -180,7 +178,7 @@ class NexusPhpSiteUserInfo(_ISiteUserInfo):
         :param multi_page: 是否多页数据
         :return: 下页地址
         """
-        html = etree.HTML(str(html_text).replace(r'\/', '/'))
+        html = self._get_html(str(html_text).replace(r'\/', '/'))
         if not html:
             return None
 
@@ -248,7 +246,7 @@ class NexusPhpSiteUserInfo(_ISiteUserInfo):
         :param html_text:
         :return:
         """
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         if not html:
             return
 
@@ -397,7 +395,7 @@ class NexusPhpSiteUserInfo(_ISiteUserInfo):
                     break
 
     def _parse_message_unread_links(self, html_text, msg_links):
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         if not html:
             return None
 
@@ -412,7 +410,7 @@ class NexusPhpSiteUserInfo(_ISiteUserInfo):
         return next_page
 
     def _parse_message_content(self, html_text):
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         if not html:
             return None, None, None
         # 标题
@@ -11,7 +11,7 @@ class NexusProjectSiteUserInfo(NexusPhpSiteUserInfo):
     order = SITE_BASE_ORDER + 25
 
     @classmethod
-    def match(cls, html_text):
+    def match(cls, html_text, printable_text=""):
         return 'Nexus Project' in html_text
 
     def _parse_site_page(self, html_text):
@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 import json
 
-from lxml import etree
-
 from app.sites.siteuserinfo._base import SITE_BASE_ORDER
 from app.sites.siteuserinfo.nexus_php import NexusPhpSiteUserInfo
 from app.utils.exception_utils import ExceptionUtils
@@ -14,12 +12,7 @@ class NexusRabbitSiteUserInfo(NexusPhpSiteUserInfo):
     order = SITE_BASE_ORDER + 5
 
     @classmethod
-    def match(cls, html_text):
-        html = etree.HTML(html_text)
-        if not html:
-            return False
-
-        printable_text = html.xpath("string(.)") if html else ""
+    def match(cls, html_text, printable_text=""):
         return 'Style by Rabbit' in printable_text
 
     def _parse_site_page(self, html_text):
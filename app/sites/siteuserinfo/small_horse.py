@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 import re
 
-from lxml import etree
-
 from app.sites.siteuserinfo._base import _ISiteUserInfo, SITE_BASE_ORDER
 from app.utils import StringUtils
 from app.utils.types import SiteSchema
@@ -13,7 +11,7 @@ class SmallHorseSiteUserInfo(_ISiteUserInfo):
     order = SITE_BASE_ORDER + 30
 
     @classmethod
-    def match(cls, html_text):
+    def match(cls, html_text, printable_text=""):
         return 'Small Horse' in html_text
 
     def _parse_site_page(self, html_text):
@@ -28,7 +26,7 @@ class SmallHorseSiteUserInfo(_ISiteUserInfo):
 
     def _parse_user_base_info(self, html_text):
         html_text = self._prepare_html_text(html_text)
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         ret = html.xpath('//a[contains(@href, "user.php")]//text()')
         if ret:
             self.username = str(ret[0])
@@ -40,7 +38,7 @@ class SmallHorseSiteUserInfo(_ISiteUserInfo):
         :return:
         """
         html_text = self._prepare_html_text(html_text)
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         tmps = html.xpath('//ul[@class = "stats nobullet"]')
         if tmps:
             if tmps[1].xpath("li") and tmps[1].xpath("li")[0].xpath("span//text()"):
@@ -67,7 +65,7 @@ class SmallHorseSiteUserInfo(_ISiteUserInfo):
          :param multi_page: 是否多页数据
          :return: 下页地址
          """
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         if not html:
             return None
 
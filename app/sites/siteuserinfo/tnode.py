@@ -12,7 +12,7 @@ class TNodeSiteUserInfo(_ISiteUserInfo):
     order = SITE_BASE_ORDER + 60
 
     @classmethod
-    def match(cls, html_text):
+    def match(cls, html_text, printable_text=""):
         return 'Powered By TNode' in html_text
 
     def _parse_site_page(self, html_text):
@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 import re
 
-from lxml import etree
-
 from app.sites.siteuserinfo._base import _ISiteUserInfo, SITE_BASE_ORDER
 from app.utils import StringUtils
 from app.utils.types import SiteSchema
@@ -13,7 +11,7 @@ class TorrentLeechSiteUserInfo(_ISiteUserInfo):
     order = SITE_BASE_ORDER + 40
 
     @classmethod
-    def match(cls, html_text):
+    def match(cls, html_text, printable_text=""):
         return 'TorrentLeech' in html_text
 
     def _parse_site_page(self, html_text):
@@ -36,7 +34,7 @@ class TorrentLeechSiteUserInfo(_ISiteUserInfo):
         :return:
         """
         html_text = self._prepare_html_text(html_text)
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         upload_html = html.xpath('//div[contains(@class,"profile-uploaded")]//span/text()')
         if upload_html:
             self.upload = StringUtils.num_filesize(upload_html[0])
@@ -71,7 +69,7 @@ class TorrentLeechSiteUserInfo(_ISiteUserInfo):
         :param multi_page: 是否多页数据
         :return: 下页地址
         """
-        html = etree.HTML(html_text)
+        html = self._get_html(html_text)
         if not html:
             return None
 
@@ -23,6 +23,12 @@ class TorrentRemover(object):
 
     _scheduler = None
     _remove_tasks = {}
+    # 删种动作名称
+    _action_names = {
+        1: "暂停种子",
+        2: "删除种子",
+        3: "删除种子及文件"
+    }
 
     def __init__(self):
         self.init_config()
@@ -86,10 +92,12 @@ class TorrentRemover(object):
             return task if task else {}
         return self._remove_tasks
 
-    def auto_remove_torrents(self, taskids=None):
+    def auto_remove_torrents(self, taskids=None, dry_run=False):
         """
         处理自动删种任务，由定时服务调用
         :param taskids: 自动删种任务的ID
+        :param dry_run: 仅生成处理报告，不实际暂停或删除种子
+        :return: 各任务的处理报告
         """
         # 获取自动删种任务
         tasks = []
@@ -107,8 +115,9 @@ class TorrentRemover(object):
         else:
             task = self._remove_tasks.get(str(taskids))
             tasks = [task] if task else []
+        reports = []
         if not tasks:
-            return
+            return reports
         for task in tasks:
             try:
                 lock.acquire()
@@ -121,53 +130,43 @@ class TorrentRemover(object):
                     config=task.get("config")
                 )
                 log.info(f"【TorrentRemover】自动删种任务：{task.get('name')} 获取符合处理条件种子数 {len(torrents)}")
+                action = task.get("action")
+                if action not in self._action_names:
+                    continue
+                action_name = self._action_names.get(action)
                 title = f"自动删种任务：{task.get('name')}"
-                text = ""
-                if task.get("action") == 1:
+                text_items = []
+                for torrent in torrents:
+                    size = round(torrent.get("size") / 1021 / 1024 / 1024, 3)
+                    text_item = f"{torrent.get('name')} 来自站点：{torrent.get('site')} 大小：{size} GB"
+                    log.info(f"【TorrentRemover】{'（演练）' if dry_run else ''}{action_name}：{text_item}")
+                    text_items.append(text_item)
+                reports.append({
+                    "id": task.get("id"),
+                    "name": task.get("name"),
+                    "action": action_name,
+                    "torrents": torrents
+                })
+                if dry_run or not torrents:
+                    continue
+                # 批量暂停、删除种子
+                ids = [torrent.get("id") for torrent in torrents]
+                if action == 1:
                     text = f"共暂停{len(torrents)}个种子"
-                    for torrent in torrents:
-                        name = torrent.get("name")
-                        site = torrent.get("site")
-                        size = round(torrent.get("size")/1021/1024/1024, 3)
-                        text_item = f"{name} 来自站点：{site} 大小：{size} GB"
-                        log.info(f"【TorrentRemover】暂停种子：{text_item}")
-                        text = f"{text}\n{text_item}"
-                        # 暂停种子
-                        self.downloader.stop_torrents(downloader_id=downloader_id,
-                                                      ids=[torrent.get("id")])
-                elif task.get("action") == 2:
+                    self.downloader.stop_torrents(downloader_id=downloader_id, ids=ids)
+                elif action == 2:
                     text = f"共删除{len(torrents)}个种子"
-                    for torrent in torrents:
-                        name = torrent.get("name")
-                        site = torrent.get("site")
-                        size = round(torrent.get("size") / 1021 / 1024 / 1024, 3)
-                        text_item = f"{name} 来自站点：{site} 大小：{size} GB"
-                        log.info(f"【TorrentRemover】删除种子：{text_item}")
-                        text = f"{text}\n{text_item}"
-                        # 删除种子
-                        self.downloader.delete_torrents(downloader_id=downloader_id,
-                                                        delete_file=False,
-                                                        ids=[torrent.get("id")])
-                elif task.get("action") == 3:
+                    self.downloader.delete_torrents(downloader_id=downloader_id, delete_file=False, ids=ids)
+                else:
                     text = f"共删除{len(torrents)}个种子（及文件）"
-                    for torrent in torrents:
-                        name = torrent.get("name")
-                        site = torrent.get("site")
-                        size = round(torrent.get("size") / 1021 / 1024 / 1024, 3)
-                        text_item = f"{name} 来自站点：{site} 大小：{size} GB"
-                        log.info(f"【TorrentRemover】删除种子及文件：{text_item}")
-                        text = f"{text}\n{text_item}"
-                        # 删除种子
-                        self.downloader.delete_torrents(downloader_id=downloader_id,
-                                                        delete_file=True,
-                                                        ids=[torrent.get("id")])
-                if torrents and title and text:
-                    self.message.send_auto_remove_torrents_message(title=title, text=text)
+                    self.downloader.delete_torrents(downloader_id=downloader_id, delete_file=True, ids=ids)
+                self.message.send_auto_remove_torrents_message(title=title, text="\n".join([text] + text_items))
             except Exception as e:
                 ExceptionUtils.exception_traceback(e)
                 log.error(f"【TorrentRemover】自动删种任务：{task.get('name')}异常：{str(e)}")
             finally:
                 lock.release()
+        return reports
 
     def update_torrent_remove_task(self, data):
         """
@@ -25,9 +25,18 @@ def singleton(cls):
         # 将实例对象返回
         return INSTANCES[cls]
 
+    _singleton.__wrapped__ = cls
     return _singleton
 
 
+def get_instance(service):
+    """
+    获取已创建的单例，未创建时返回None，不会触发初始化
+    :param service: 使用singleton注解的类
+    """
+    return INSTANCES.get(getattr(service, "__wrapped__", service))
+
+
 # 重试装饰器
 def retry(ExceptionToCheck, tries=3, delay=3, backoff=2, logger=None):
     """
@@ -6,7 +6,6 @@ import re
 from urllib import parse
 
 import cn2an
-import dateparser
 import dateutil.parser
 import zhconv
 
@@ -359,6 +358,8 @@ class StringUtils:
             return datetime_str
 
         try:
+            # dateparser加载较慢，使用时才导入
+            import dateparser
             return dateparser.parse(datetime_str).strftime('%Y-%m-%d %H:%M:%S')
         except Exception as e:
             ExceptionUtils.exception_traceback(e)
@@ -1,19 +1,130 @@
+import atexit
 import logging
 import os
 import re
 import threading
 import time
-from collections import deque
 from html import escape
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from queue import SimpleQueue
 
 from config import Config
 
 logging.getLogger('werkzeug').setLevel(logging.ERROR)
 lock = threading.Lock()
 
-LOG_QUEUE = deque(maxlen=200)
-LOG_INDEX = 0
+# 日志来源标签
+_SOURCE_RE = re.compile(r"^【(.*?)】")
+# 页面显示的日志级别名称
+_LEVEL_NAMES = {
+    logging.INFO: "INFO",
+    logging.WARNING: "WARN",
+    logging.ERROR: "ERROR"
+}
+
+
+class LogBuffer:
+    """
+    页面日志环形缓冲区，只由日志处理线程写入，读取方按序号增量读取，读写均无需加锁
+    等待新日志的读取方阻塞在条件变量上，写入后统一唤醒
+    """
+
+    def __init__(self, size=200):
+        self._size = size
+        self._slots = [None] * size
+        # 下一条日志的序号
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def append(self, item):
+        seq = self._seq
+        self._slots[seq % self._size] = (seq, item)
+        # 写入槽位后再发布序号，读取方只会读到完整写入的日志
+        with self._cond:
+            self._seq = seq + 1
+            self._cond.notify_all()
+
+    def wait(self, since=0, timeout=None):
+        """
+        等待序号since之后有新日志，超时后返回空列表
+        :return: (下次读取的序号, 日志列表)
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > since, timeout)
+        return self.read(since)
+
+    def read(self, since=0):
+        """
+        读取序号since之后的日志
+        :return: (下次读取的序号, 日志列表)
+        """
+        end = self._seq
+        start = max(since, end - self._size, 0)
+        items = []
+        for seq in range(start, end):
+            slot = self._slots[seq % self._size]
+            # 读取期间槽位被覆盖的日志跳过
+            if slot and slot[0] == seq:
+                items.append(slot[1])
+        return end, items
+
+
+LOG_BUFFER = LogBuffer(200)
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    只把原始日志记录放入队列，格式化在日志处理线程中进行
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class _DispatchHandler(logging.Handler):
+    """
+    日志处理线程中运行：写入页面日志缓冲区，并分发到各模块的终端、文件、日志服务器处理器
+    """
+
+    def handle(self, record):
+        # 单条日志出错（如格式化参数不匹配）不能中断日志处理线程
+        try:
+            if getattr(record, "console", False):
+                print(record.getMessage())
+            else:
+                for handler in Logger.get_handlers(record.name):
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            if record.levelno in _LEVEL_NAMES:
+                _append_log_buffer(record)
+        except Exception:
+            self.handleError(record)
+        return True
+
+
+def _append_log_buffer(record):
+    text = escape(record.getMessage())
+    match = _SOURCE_RE.match(text)
+    if match:
+        source = match.group(1)
+        text = text[match.end():]
+    else:
+        source = "System"
+    LOG_BUFFER.append({
+        "time": time.strftime('%H:%M:%S', time.localtime(record.created)),
+        "level": _LEVEL_NAMES.get(record.levelno),
+        "source": source,
+        "text": text})
+
+
+_LOG_QUEUE = SimpleQueue()
+_LOG_LISTENER = QueueListener(_LOG_QUEUE, _DispatchHandler())
+_LOG_LISTENER.start()
+atexit.register(_LOG_LISTENER.stop)
 
 
 class Logger:
@@ -29,10 +140,10 @@ class Logger:
 
     def __init__(self, module):
         self.logger = logging.getLogger(module)
+        self.handlers = []
         self.__config = Config()
         logtype = self.__config.get_config('app').get('logtype') or "console"
-        loglevel = self.__config.get_config('app').get('loglevel') or "info"
-        self.logger.setLevel(level=self.__loglevels.get(loglevel))
+        loglevel = self.__loglevels.get(self.__config.get_config('app').get('loglevel') or "info")
         if logtype == "server":
             logserver = self.__config.get_config('app').get('logserver', '').split(':')
             if logserver:
@@ -44,7 +155,7 @@ class Logger:
                 log_server_handler = logging.handlers.SysLogHandler((logip, logport),
                                                                     logging.handlers.SysLogHandler.LOG_USER)
                 log_server_handler.setFormatter(logging.Formatter('%(filename)s: %(message)s'))
-                self.logger.addHandler(log_server_handler)
+                self.handlers.append(log_server_handler)
         elif logtype == "file":
             # 记录日志到文件
             logpath = os.environ.get('NASTOOL_LOG') or self.__config.get_config('app').get('logpath') or ""
@@ -56,11 +167,17 @@ class Logger:
                                                        backupCount=3,
                                                        encoding='utf-8')
                 log_file_handler.setFormatter(logging.Formatter('%(asctime)s\t%(levelname)s: %(message)s'))
-                self.logger.addHandler(log_file_handler)
+                self.handlers.append(log_file_handler)
         # 记录日志到终端
         log_console_handler = logging.StreamHandler()
         log_console_handler.setFormatter(logging.Formatter('%(asctime)s\t%(levelname)s: %(message)s'))
-        self.logger.addHandler(log_console_handler)
+        self.handlers.append(log_console_handler)
+        for handler in self.handlers:
+            handler.setLevel(loglevel)
+        # 调用线程只负责入队，INFO及以上日志无论日志级别都需进入页面日志缓冲区
+        self.logger.setLevel(min(loglevel, logging.INFO))
+        self.logger.propagate = False
+        self.logger.addHandler(_LazyQueueHandler(_LOG_QUEUE))
 
     @staticmethod
     def get_instance(module):
@@ -69,46 +186,52 @@ class Logger:
         if Logger.__instance.get(module):
             return Logger.__instance.get(module)
         with lock:
-            Logger.__instance[module] = Logger(module)
+            if not Logger.__instance.get(module):
+                Logger.__instance[module] = Logger(module)
         return Logger.__instance.get(module)
 
+    @staticmethod
+    def get_handlers(module):
+        instance = Logger.__instance.get(module)
+        return instance.handlers if instance else []
+
+
+def get_logs(since=0):
+    """
+    增量读取页面日志
+    :param since: 上次读取返回的序号，为0时读取缓冲区中的全部日志
+    :return: (下次读取的序号, 日志列表)
+    """
+    return LOG_BUFFER.read(since)
+
 
-def __append_log_queue(level, text):
-    global LOG_INDEX, LOG_QUEUE
-    with lock:
-        text = escape(text)
-        if text.startswith("【"):
-            source = re.findall(r"(?<=【).*?(?=】)", text)[0]
-            text = text.replace(f"【{source}】", "")
-        else:
-            source = "System"
-        LOG_QUEUE.append({
-            "time": time.strftime('%H:%M:%S', time.localtime(time.time())),
-            "level": level,
-            "source": source,
-            "text": text})
-        LOG_INDEX += 1
+def wait_logs(since=0, timeout=None):
+    """
+    阻塞等待新的页面日志，有新日志或超时后返回
+    :param since: 上次读取返回的序号
+    :param timeout: 最长等待时间（秒）
+    :return: (下次读取的序号, 日志列表)
+    """
+    return LOG_BUFFER.wait(since, timeout)
 
 
-def debug(text, module=None):
-    return Logger.get_instance(module).logger.debug(text)
+def debug(text, *args, module=None):
+    return Logger.get_instance(module).logger.debug(text, *args)
 
 
-def info(text, module=None):
-    __append_log_queue("INFO", text)
-    return Logger.get_instance(module).logger.info(text)
+def info(text, *args, module=None):
+    return Logger.get_instance(module).logger.info(text, *args)
 
 
-def error(text, module=None):
-    __append_log_queue("ERROR", text)
-    return Logger.get_instance(module).logger.error(text)
+def error(text, *args, module=None):
+    return Logger.get_instance(module).logger.error(text, *args)
 
 
-def warn(text, module=None):
-    __append_log_queue("WARN", text)
-    return Logger.get_instance(module).logger.warning(text)
+def warn(text, *args, module=None):
+    return Logger.get_instance(module).logger.warning(text, *args)
 
 
 def console(text):
-    __append_log_queue("INFO", text)
-    print(text)
+    record = logging.LogRecord("console", logging.INFO, __file__, 0, text, None, None)
+    record.console = True
+    _LOG_QUEUE.put_nowait(record)
@@ -1,8 +1,15 @@
 import os
 import signal
 import sys
+import threading
 import warnings
 
+import startup_profiler
+
+# 启动耗时分析：python run.py --profile-startup
+if "--profile-startup" in sys.argv:
+    startup_profiler.enable()
+
 warnings.filterwarnings('ignore')
 
 # 运行环境判断
@@ -10,7 +17,6 @@ is_executable = getattr(sys, 'frozen', False)
 is_windows_exe = is_executable and (os.name == "nt")
 if is_windows_exe:
     # 托盘相关库
-    import threading
     from package.trayicon import TrayIcon, NullWriter
 
 if is_executable:
@@ -29,7 +35,7 @@ import log
 from web.action import WebAction
 from web.main import App
 from app.db import init_db, update_db, init_data
-from app.helper import init_chrome
+from app.helper import init_chrome, MetaHelper
 from initializer import update_config, check_config,  start_config_monitor, stop_config_monitor
 from version import APP_VERSION
 
@@ -111,11 +117,22 @@ def start_service():
     WebAction.create_wechat_menu()
 
 
-# 系统初始化
-init_system()
+def warmup():
+    """
+    WEB服务启动后在后台启动服务、初始化浏览器驱动、加载缓存
+    """
+    with startup_profiler.phase("启动服务"):
+        start_service()
+    with startup_profiler.phase("初始化浏览器驱动"):
+        init_chrome()
+    with startup_profiler.phase("加载TMDB缓存"):
+        MetaHelper().warmup()
+    startup_profiler.report()
+
 
-# 启动服务
-start_service()
+# 系统初始化
+with startup_profiler.phase("系统初始化"):
+    init_system()
 
 
 # 本地运行
@@ -139,8 +156,11 @@ if __name__ == '__main__':
             p1 = threading.Thread(target=traystart, daemon=True)
             p1.start()
 
-    # 初始化浏览器驱动
-    init_chrome()
+    # 服务在后台启动，WEB端口尽快可用
+    threading.Thread(target=warmup, name="Warmup", daemon=True).start()
 
     # Flask启动
     App.run(**get_run_config(is_windows_exe))
+else:
+    # 启动服务
+    start_service()
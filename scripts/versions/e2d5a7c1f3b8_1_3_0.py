@@ -0,0 +1,86 @@
+"""1.3.0
+
+Revision ID: e2d5a7c1f3b8
+Revises: b4e1c3a9d2f7
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2d5a7c1f3b8'
+down_revision = 'b4e1c3a9d2f7'
+branch_labels = None
+depends_on = None
+
+
+def _num(value, num_type=int):
+    try:
+        return num_type(float(value or 0))
+    except (TypeError, ValueError):
+        return num_type(0)
+
+
+def upgrade() -> None:
+    # 从站点数据历史回填日汇总和月汇总，仅在日汇总为空时执行
+    try:
+        conn = op.get_bind()
+        if conn.execute(sa.text("SELECT COUNT(1) FROM SITE_STATISTICS_DAILY")).scalar():
+            return
+        rows = conn.execute(sa.text("SELECT SITE, URL, DATE, UPLOAD, DOWNLOAD, SEEDING, SEEDING_SIZE, BONUS "
+                                    "FROM SITE_STATISTICS_HISTORY "
+                                    "WHERE URL IS NOT NULL AND DATE IS NOT NULL "
+                                    "ORDER BY URL, DATE")).fetchall()
+        dailies = []
+        monthlies = {}
+        prev_url, prev_upload, prev_download = None, 0, 0
+        for site, url, date, upload, download, seeding, seeding_size, bonus in rows:
+            upload, download = _num(upload), _num(download)
+            if url != prev_url:
+                prev_upload, prev_download = 0, 0
+            daily = {
+                "site": site,
+                "url": url,
+                "date": date,
+                "upload": upload,
+                "download": download,
+                "upload_inc": max(upload - prev_upload, 0) if prev_upload else 0,
+                "download_inc": max(download - prev_download, 0) if prev_download else 0,
+                "seeding": _num(seeding),
+                "seeding_size": _num(seeding_size),
+                "bonus": _num(bonus, float)
+            }
+            dailies.append(daily)
+            monthly = monthlies.get((url, date[:7]))
+            if not monthly:
+                monthly = monthlies[(url, date[:7])] = dict(daily, month=date[:7], upload_inc=0, download_inc=0,
+                                                            days=0)
+            monthly.update({key: daily[key] for key in ("site", "upload", "download", "seeding",
+                                                        "seeding_size", "bonus")})
+            monthly["upload_inc"] += daily["upload_inc"]
+            monthly["download_inc"] += daily["download_inc"]
+            monthly["days"] += 1
+            prev_url = url
+            # 总量为0（Cookie失效等）的日期不作为后续增量的基准
+            if upload or download:
+                prev_upload, prev_download = upload, download
+        if dailies:
+            conn.execute(sa.text("INSERT INTO SITE_STATISTICS_DAILY "
+                                 "(SITE, URL, DATE, UPLOAD, DOWNLOAD, UPLOAD_INC, DOWNLOAD_INC, "
+                                 "SEEDING, SEEDING_SIZE, BONUS) VALUES "
+                                 "(:site, :url, :date, :upload, :download, :upload_inc, :download_inc, "
+                                 ":seeding, :seeding_size, :bonus)"), dailies)
+        if monthlies:
+            conn.execute(sa.text("INSERT INTO SITE_STATISTICS_MONTHLY "
+                                 "(SITE, URL, MONTH, DAYS, UPLOAD, DOWNLOAD, UPLOAD_INC, DOWNLOAD_INC, "
+                                 "SEEDING, SEEDING_SIZE, BONUS) VALUES "
+                                 "(:site, :url, :month, :days, :upload, :download, :upload_inc, :download_inc, "
+                                 ":seeding, :seeding_size, :bonus)"), list(monthlies.values()))
+    except Exception as e:
+        pass
+
+
+def downgrade() -> None:
+    pass
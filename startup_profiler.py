@@ -0,0 +1,72 @@
+import builtins
+import sys
+import time
+from contextlib import contextmanager
+
+# 启动时间
+_start_time = time.time()
+# 是否启用启动耗时分析
+_enabled = False
+_original_import = builtins.__import__
+# 模块导入耗时：(模块名, 耗时)，耗时包含其导入的子模块
+_imports = []
+# 启动阶段耗时：(阶段名称, 耗时)
+_phases = []
+
+
+def enable():
+    """
+    开启启动耗时分析，需在导入其它模块前调用
+    """
+    global _enabled
+    if _enabled:
+        return
+    _enabled = True
+    builtins.__import__ = _timed_import
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """
+    记录首次导入模块的耗时，相对导入及已导入的模块不记录
+    """
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    start = time.time()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _imports.append((name, time.time() - start))
+
+
+@contextmanager
+def phase(name):
+    """
+    记录启动阶段耗时，未开启分析时不记录
+    """
+    if not _enabled:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        _phases.append((name, time.time() - start))
+
+
+def report(top=20):
+    """
+    输出启动耗时报告，并停止记录模块导入耗时
+    :param top: 输出导入耗时最长的模块数
+    """
+    if not _enabled:
+        return
+    if builtins.__import__ is _timed_import:
+        builtins.__import__ = _original_import
+    import log
+    lines = ["【Startup】启动耗时分析，总耗时 %.2f 秒" % (time.time() - _start_time)]
+    for name, elapsed in _phases:
+        lines.append("  阶段 %s：%.2f 秒" % (name, elapsed))
+    lines.append("  模块导入耗时（前%s，含子模块）：" % top)
+    for name, elapsed in sorted(_imports, key=lambda x: x[1], reverse=True)[:top]:
+        lines.append("  %8.3f 秒  %s" % (elapsed, name))
+    log.console("\n".join(lines))
@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from app.db.sqlite_engine import DEFAULT_SQLITE_CONF
+
+# 并发线程数及每个线程的操作次数
+READERS = 8
+WRITERS = 4
+OPERATIONS = 500
+
+
+def connect(db_file, tuned):
+    conn = sqlite3.connect(db_file, check_same_thread=False, timeout=30)
+    if tuned:
+        conn.execute("PRAGMA journal_mode=%s" % DEFAULT_SQLITE_CONF.get("journal_mode"))
+        conn.execute("PRAGMA synchronous=%s" % DEFAULT_SQLITE_CONF.get("synchronous"))
+        conn.execute("PRAGMA cache_size=%d" % DEFAULT_SQLITE_CONF.get("cache_size"))
+        conn.execute("PRAGMA mmap_size=%d" % DEFAULT_SQLITE_CONF.get("mmap_size"))
+        conn.execute("PRAGMA busy_timeout=%d" % DEFAULT_SQLITE_CONF.get("busy_timeout"))
+    return conn
+
+
+def run(tuned):
+    """
+    多线程并发读写，返回每秒读、写次数
+    """
+    db_file = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    conn = connect(db_file, tuned)
+    conn.execute("CREATE TABLE HISTORY (ID INTEGER PRIMARY KEY, TITLE TEXT, DATE TEXT)")
+    conn.executemany("INSERT INTO HISTORY (TITLE, DATE) VALUES (?, ?)",
+                     [("title %s" % i, time.strftime('%Y-%m-%d %H:%M:%S')) for i in range(10000)])
+    conn.commit()
+    conn.close()
+    write_lock = threading.Lock()
+    errors = []
+
+    def reader():
+        rconn = connect(db_file, tuned)
+        for i in range(OPERATIONS):
+            try:
+                rconn.execute("SELECT * FROM HISTORY WHERE ID = ?", (i * 7 % 10000 + 1,)).fetchall()
+            except Exception as err:
+                errors.append(err)
+        rconn.close()
+
+    def writer():
+        wconn = connect(db_file, tuned)
+        for i in range(OPERATIONS):
+            try:
+                with write_lock:
+                    wconn.execute("INSERT INTO HISTORY (TITLE, DATE) VALUES (?, ?)",
+                                  ("new %s" % i, time.strftime('%Y-%m-%d %H:%M:%S')))
+                    wconn.commit()
+            except Exception as err:
+                errors.append(err)
+        wconn.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(READERS)] \
+        + [threading.Thread(target=writer) for _ in range(WRITERS)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    return READERS * OPERATIONS / elapsed, WRITERS * OPERATIONS / elapsed, len(errors)
+
+
+if __name__ == '__main__':
+    for name, tuned in (("默认参数", False), ("优化参数", True)):
+        reads, writes, errors = run(tuned)
+        print("%s：读 %.0f 次/秒，写 %.0f 次/秒，错误 %s 次" % (name, reads, writes, errors))
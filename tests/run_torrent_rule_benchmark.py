@@ -0,0 +1,90 @@
+import random
+import time
+
+from app.downloader.torrent_rule import TorrentSnapshot, TorrentRule
+
+# 模拟种子数量
+TORRENTS = 20000
+# 删种配置
+CONFIG = {
+    "ratio": 1.5,
+    "seeding_time": 24,
+    "size": [1, 50],
+    "upload_avs": 100,
+    "tracker_key": "tracker[0-4]",
+    "qb_state": ["uploading", "stalledUP"]
+}
+
+
+def make_torrents(count):
+    """
+    生成模拟的qBittorrent种子
+    """
+    now = int(time.time())
+    states = ["uploading", "stalledUP", "pausedUP", "downloading"]
+    torrents = []
+    for i in range(count):
+        added_on = now - random.randint(0, 30 * 86400)
+        size = random.randint(100, 80000) * 1024 ** 2
+        torrents.append({
+            "hash": "%040x" % i,
+            "name": "torrent %s" % i,
+            "size": size,
+            "total_size": size,
+            "ratio": random.random() * 5,
+            "uploaded": random.randint(0, 5) * size,
+            "downloaded": size,
+            "added_on": added_on,
+            "completion_on": added_on + random.randint(0, 86400),
+            "last_activity": now - random.randint(0, 86400),
+            "save_path": "/downloads",
+            "tracker": "https://tracker%s.example.org/announce" % (i % 10),
+            "state": random.choice(states),
+            "category": ""
+        })
+    return torrents
+
+
+def loop_filter(torrents, config):
+    """
+    逐个种子判断，与原删种逻辑一致
+    """
+    import re
+    date_now = int(time.time())
+    minsize = config["size"][0] * 1024 ** 3
+    maxsize = config["size"][-1] * 1024 ** 3
+    tracker_re = re.compile(config["tracker_key"], re.I)
+    result = []
+    for torrent in torrents:
+        date_done = torrent["completion_on"] if torrent["completion_on"] > 0 else torrent["added_on"]
+        seeding_time = date_now - date_done if date_done else 0
+        upload_avs = torrent["uploaded"] / seeding_time if seeding_time else 0
+        if torrent["ratio"] <= config["ratio"]:
+            continue
+        if seeding_time <= config["seeding_time"] * 3600:
+            continue
+        if torrent["size"] >= maxsize or torrent["size"] <= minsize:
+            continue
+        if upload_avs >= config["upload_avs"] * 1024:
+            continue
+        if not tracker_re.search(torrent["tracker"]):
+            continue
+        if torrent["state"] not in config["qb_state"]:
+            continue
+        result.append(torrent["hash"])
+    return result
+
+
+def rule_filter(torrents, config):
+    snapshot = TorrentSnapshot.from_torrents("qbittorrent", torrents)
+    ids = snapshot.values("id")
+    return [ids[i] for i in TorrentRule.from_remove_config(config).filter(snapshot)]
+
+
+if __name__ == '__main__':
+    torrents = make_torrents(TORRENTS)
+    print("种子数量：%s" % TORRENTS)
+    for name, func in (("逐个判断", loop_filter), ("规则引擎", rule_filter)):
+        start = time.time()
+        ids = func(torrents, CONFIG)
+        print("%s：耗时 %.3f 秒，命中 %s 个" % (name, time.time() - start, len(ids)))
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from unittest import TestCase
+
+from app.helper.chrome_pool import ChromePool
+
+
+class FakeSwitchTo(object):
+    def __init__(self, driver):
+        self._driver = driver
+
+    def window(self, handle):
+        self._driver.current_handle = handle
+
+
+class FakeDriver(object):
+    def __init__(self, key):
+        self.key = key
+        self.alive = True
+        self.quitted = False
+        self.window_handles = ["main"]
+        self.current_handle = "main"
+        self.cookies = []
+        self.switch_to = FakeSwitchTo(self)
+        self.visited = []
+
+    @property
+    def current_url(self):
+        if not self.alive:
+            raise ConnectionError("browser crashed")
+        return self.visited[-1] if self.visited else "about:blank"
+
+    def execute_script(self, script):
+        return "FakeUA"
+
+    def execute_cdp_cmd(self, cmd, params):
+        if cmd == "Network.clearBrowserCookies":
+            self.cookies = []
+
+    def implicitly_wait(self, timeout):
+        pass
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def close(self):
+        self.window_handles.remove(self.current_handle)
+
+    def quit(self):
+        self.quitted = True
+
+
+class ChromePoolTest(TestCase):
+    def setUp(self) -> None:
+        self.created = []
+
+    def factory(self, key):
+        driver = FakeDriver(key)
+        self.created.append(driver)
+        return driver
+
+    def test_reuse_and_reset(self):
+        pool = ChromePool(self.factory, max_size=2)
+        driver = pool.lease("a")
+        driver.cookies = ["uid=1"]
+        driver.window_handles.append("tab")
+        pool.release(driver)
+        # 同组复用，Cookie和标签页已清理
+        self.assertIs(pool.lease("a"), driver)
+        self.assertEqual(driver.cookies, [])
+        self.assertEqual(driver.window_handles, ["main"])
+        self.assertEqual(len(self.created), 1)
+        # 不同组新建
+        other = pool.lease("b")
+        self.assertIsNot(other, driver)
+        self.assertEqual(pool.get_stats().get("leased"), 2)
+        pool.shutdown()
+
+    def test_health_check(self):
+        pool = ChromePool(self.factory, max_size=1)
+        driver = pool.lease("a")
+        pool.release(driver)
+        driver.alive = False
+        new_driver = pool.lease("a")
+        self.assertIsNot(new_driver, driver)
+        self.assertTrue(driver.quitted)
+
+    def test_wait_when_full(self):
+        pool = ChromePool(self.factory, max_size=1)
+        driver = pool.lease("a")
+        self.assertIsNone(pool.lease("a", timeout=0.05))
+        threading.Timer(0.05, pool.release, args=(driver,)).start()
+        self.assertIs(pool.lease("a", timeout=5), driver)
+        # 已达上限时关闭其它组的空闲实例
+        pool.release(driver)
+        other = pool.lease("b", timeout=0.05)
+        self.assertIsNotNone(other)
+        self.assertTrue(driver.quitted)
+
+    def test_reap(self):
+        pool = ChromePool(self.factory, max_size=3, warm_size=1, idle_timeout=0)
+        drivers = [pool.lease("a") for _ in range(3)]
+        for driver in drivers:
+            pool.release(driver)
+        time.sleep(0.01)
+        self.assertEqual(pool.reap(), 2)
+        self.assertEqual(pool.get_stats().get("idle"), 1)
+        self.assertFalse(drivers[-1].quitted)
+
+    def test_no_pool(self):
+        pool = ChromePool(self.factory, max_size=0)
+        driver = pool.lease("a")
+        pool.release(driver)
+        self.assertTrue(driver.quitted)
+        self.assertEqual(pool.get_stats().get("idle"), 0)
+
+    def test_wait_without_timeout(self):
+        pool = ChromePool(self.factory, max_size=1)
+        driver = pool.lease("a")
+        # 默认一直等待到有实例归还
+        threading.Timer(0.2, pool.release, args=(driver,)).start()
+        self.assertIs(pool.lease("a"), driver)
+        pool.shutdown()
+
+    def test_prestart(self):
+        pool = ChromePool(self.factory, max_size=3, warm_size=2)
+        self.assertEqual(pool.prestart("a"), 2)
+        self.assertEqual(pool.get_stats().get("idle"), 2)
+        self.assertEqual(pool.prestart("a"), 0)
+        # 预先启动的实例直接借出
+        self.assertIn(pool.lease("a"), self.created)
+        self.assertEqual(len(self.created), 2)
+        pool.shutdown()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from app.plugins.modules.diskspacesaver import DiskSpaceSaver, HashIndex
+
+
+class DiskSpaceSaverTest(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = self.tmpdir.name
+        self.folder = os.path.join(self.root, "media")
+        os.makedirs(os.path.join(self.folder, "sub"))
+        self.__write("a.mkv", b"x" * 4096)
+        self.__write("sub/b.mkv", b"x" * 4096)
+        self.__write("c.mkv", b"x" * 4095 + b"y")
+        self.__write("d.mkv", b"x" * 100)
+        self.__write("e.txt", b"x" * 4096)
+        os.link(os.path.join(self.folder, "a.mkv"), os.path.join(self.folder, "sub", "a_link.mkv"))
+        self.index = HashIndex(os.path.join(self.root, "hash_index.db"))
+        self.plugin = DiskSpaceSaver()
+
+    def tearDown(self) -> None:
+        self.index.close()
+        self.tmpdir.cleanup()
+
+    def __write(self, name, content):
+        with open(os.path.join(self.folder, name), "wb") as f:
+            f.write(content)
+
+    def __find(self, fast=False):
+        with mock.patch.object(DiskSpaceSaver, "get_sha1", wraps=DiskSpaceSaver.get_sha1) as get_sha1:
+            duplicates = self.plugin.find_duplicates(self.folder, [".mkv"], 0, self.index, fast)
+        return [sorted(os.path.relpath(path, self.folder) for path in paths)
+                for paths in duplicates.values() if len(paths) > 1], get_sha1.call_count
+
+    def test_find_duplicates(self):
+        duplicates, count = self.__find()
+        self.assertEqual(duplicates, [["a.mkv", "sub/b.mkv"]])
+        # 硬链接只计算一次：3个快速指纹，c的快速指纹不同，2个完整SHA1
+        self.assertEqual(count, 5)
+        # 再次扫描文件未变化，直接使用索引
+        duplicates, count = self.__find()
+        self.assertEqual(duplicates, [["a.mkv", "sub/b.mkv"]])
+        self.assertEqual(count, 0)
+        # 只重新计算变化的文件
+        self.__write("c.mkv", b"x" * 4096)
+        os.utime(os.path.join(self.folder, "c.mkv"), ns=(1, 1))
+        duplicates, count = self.__find()
+        self.assertEqual(duplicates, [["a.mkv", "c.mkv", "sub/b.mkv"]])
+        self.assertEqual(count, 2)
+        # 删除的文件从索引中清理
+        os.remove(os.path.join(self.folder, "d.mkv"))
+        self.__find()
+        self.assertEqual(len(self.index.load()), 3)
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+import time
+from unittest import TestCase
+
+from app.media.doubanapi.ratelimit import DoubanRateLimiter
+
+
+class DoubanRateLimiterTest(TestCase):
+    def test_interval(self):
+        limiter = DoubanRateLimiter(min_interval=0.05, max_interval=0.4)
+        self.assertEqual(limiter.acquire(), 0)
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+    def test_adaptive(self):
+        limiter = DoubanRateLimiter(min_interval=0.05, max_interval=0.4, interval=0.1)
+        limiter.failure()
+        self.assertAlmostEqual(limiter.interval, 0.2)
+        for _ in range(3):
+            limiter.failure()
+        self.assertAlmostEqual(limiter.interval, 0.4)
+        for _ in range(20):
+            limiter.success()
+        self.assertAlmostEqual(limiter.interval, 0.05)
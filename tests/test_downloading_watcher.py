@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase, mock
+
+from web.backend import downloading_watcher
+from web.backend.downloading_watcher import DownloadingWatcher, diff_torrents
+
+
+class DownloadingWatcherTest(TestCase):
+    def test_diff(self):
+        old_rows = {
+            "a": {"id": "a", "speed": "1", "progress": 10, "state": "Downloading"},
+            "b": {"id": "b", "speed": "2", "progress": 20, "state": "Downloading"}
+        }
+        new_rows = {
+            "a": {"id": "a", "speed": "3", "progress": 10, "state": "Downloading"},
+            "c": {"id": "c", "speed": "4", "progress": 0, "state": "Stoped"}
+        }
+        added, removed, changed = diff_torrents(old_rows, new_rows)
+        self.assertEqual(added, [new_rows["c"]])
+        self.assertEqual(removed, ["b"])
+        self.assertEqual(changed, [{"id": "a", "speed": "3"}])
+
+    def test_poll_and_stop(self):
+        rounds = [
+            [{"id": "a", "progress": 10}],
+            [{"id": "a", "progress": 20}, {"id": "b", "progress": 0}]
+        ]
+        downloader = mock.MagicMock()
+        downloader.get_downloading_progress.side_effect = lambda downloader_id: rounds.pop(0) if rounds else []
+        with mock.patch.object(downloading_watcher, "Downloader", return_value=downloader), \
+                mock.patch.object(DownloadingWatcher.__wrapped__, "_interval", 0.01):
+            watcher = DownloadingWatcher()
+            subscriber = watcher.subscribe("1")
+            first = subscriber.get(timeout=5)
+            self.assertTrue(first.get("full"))
+            self.assertEqual(first.get("added"), [{"id": "a", "progress": 10}])
+            second = subscriber.get(timeout=5)
+            self.assertEqual(second.get("added"), [{"id": "b", "progress": 0}])
+            self.assertEqual(second.get("changed"), [{"id": "a", "progress": 20}])
+            # 同一下载器只有一个轮询线程
+            other = watcher.subscribe("1")
+            self.assertTrue(other.get(timeout=5).get("full"))
+            watcher.unsubscribe(subscriber)
+            watcher.unsubscribe(other)
+            for _ in range(500):
+                if not watcher._pollers:
+                    break
+                subscriber.get(timeout=0.01)
+            self.assertEqual(watcher._pollers, {})
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from unittest import TestCase
+
+from app.plugins.event_dispatcher import BackPressure, EventDispatcher, PluginExecutor, get_event_policy
+from app.plugins.event_manager import Event
+from app.utils.types import EventType
+
+
+def _event(event_type, data=None):
+    event = Event(event_type)
+    event.event_data = data or {}
+    return event
+
+
+class EventDispatcherTest(TestCase):
+    def test_slow_plugin_not_block_others(self):
+        release = threading.Event()
+        fast_done = threading.Event()
+        handled = []
+
+        def runner(pid, method, event):
+            if pid == "Slow":
+                release.wait(5)
+            handled.append((pid, event.event_data.get("n")))
+            if pid == "Fast" and event.event_data.get("n") == 2:
+                fast_done.set()
+
+        class Slow:
+            def handle(self, event):
+                pass
+
+        class Fast:
+            def handle(self, event):
+                pass
+
+        dispatcher = EventDispatcher(runner=runner)
+        try:
+            for n in range(3):
+                dispatcher.dispatch(_event("test", {"n": n}), [Slow.handle, Fast.handle])
+            # 慢插件阻塞时快插件按顺序处理完毕
+            self.assertTrue(fast_done.wait(2))
+            self.assertEqual([item for item in handled if item[0] == "Fast"],
+                             [("Fast", 0), ("Fast", 1), ("Fast", 2)])
+            metrics = dispatcher.get_metrics()
+            self.assertEqual(metrics["Fast"]["handlers"]["handle"]["count"], 3)
+            self.assertEqual(metrics["Slow"]["pending"], 2)
+        finally:
+            release.set()
+            dispatcher.shutdown()
+
+    def test_back_pressure(self):
+        release = threading.Event()
+        executor = PluginExecutor("Test", lambda *_: release.wait(5), max_pending=1, block_timeout=0.05)
+        try:
+            self.assertTrue(executor.submit("handle", _event("a", {"n": 0})))
+            # 等待第一个事件开始处理
+            deadline = time.time() + 2
+            while executor.pending and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(executor.submit("handle", _event("a", {"n": 1})))
+            # 相同的待处理事件合并
+            self.assertFalse(executor.submit("handle", _event("a", {"n": 1}), BackPressure.Coalesce))
+            # 队列已满时丢弃，阻塞超时后也丢弃
+            self.assertFalse(executor.submit("handle", _event("a", {"n": 2}), BackPressure.Drop))
+            self.assertFalse(executor.submit("handle", _event("a", {"n": 3}), BackPressure.Block))
+            metric = executor.get_metrics()["handlers"]["handle"]
+            self.assertEqual((metric["coalesced"], metric["dropped"]), (1, 2))
+        finally:
+            release.set()
+            executor.shutdown()
+
+    def test_webhook_policy(self):
+        # 播放类 Webhook 积压时丢弃
+        self.assertEqual(get_event_policy(EventType.EmbyWebhook.value, {"Event": "playback.start"}),
+                         BackPressure.Drop)
+        self.assertEqual(get_event_policy(EventType.JellyfinWebhook.value, {"NotificationType": "PlaybackStop"}),
+                         BackPressure.Drop)
+        self.assertEqual(get_event_policy(EventType.PlexWebhook.value, {"event": "media.play"}),
+                         BackPressure.Drop)
+        # 入库、删除等 Webhook 阻塞等待
+        self.assertEqual(get_event_policy(EventType.EmbyWebhook.value, {"Event": "library.new"}),
+                         BackPressure.Block)
+        self.assertEqual(get_event_policy(EventType.EmbyWebhook.value, {"event_type": "media_del"}),
+                         BackPressure.Block)
+        self.assertEqual(get_event_policy(EventType.JellyfinWebhook.value, {"NotificationType": "ItemAdded"}),
+                         BackPressure.Block)
+        self.assertEqual(get_event_policy(EventType.PlexWebhook.value, {"event": "library.new"}),
+                         BackPressure.Block)
+        self.assertEqual(get_event_policy(EventType.DoubanSync.value), BackPressure.Coalesce)
+
+    def test_timeout(self):
+        release = threading.Event()
+        done = threading.Event()
+
+        def runner(pid, method, event):
+            if event.event_data.get("slow"):
+                release.wait(5)
+            else:
+                done.set()
+
+        executor = PluginExecutor("Test", runner, timeout=0.05)
+        try:
+            executor.submit("handle", _event("a", {"slow": True}))
+            executor.submit("handle", _event("a"))
+            time.sleep(0.1)
+            # 超时后由新的工作线程处理后续事件
+            self.assertTrue(executor.check_timeout())
+            self.assertTrue(done.wait(2))
+            self.assertEqual(executor.get_metrics()["handlers"]["handle"]["timeouts"], 1)
+        finally:
+            release.set()
+            executor.shutdown()
+
+    def test_timeout_limit(self):
+        release = threading.Event()
+        executor = PluginExecutor("Test", lambda *_: release.wait(5), timeout=0.05, max_stuck=1)
+        try:
+            executor.submit("handle", _event("a", {"n": 0}))
+            executor.submit("handle", _event("a", {"n": 1}))
+            time.sleep(0.1)
+            self.assertTrue(executor.check_timeout())
+            time.sleep(0.1)
+            # 超时未结束的线程达到上限后不再替换
+            self.assertFalse(executor.check_timeout())
+            self.assertEqual(executor.get_metrics()["handlers"]["handle"]["timeouts"], 1)
+            # 修改超时时间对已有执行器生效
+            executor.timeout = 0
+            self.assertFalse(executor.check_timeout())
+        finally:
+            release.set()
+            executor.shutdown()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from unittest import TestCase
+
+from app.helper.exists_cache_helper import ExistsCacheHelper
+from app.utils.types import EventType
+
+
+class ExistsCacheTest(TestCase):
+    def setUp(self) -> None:
+        self.cache = ExistsCacheHelper.__wrapped__()
+        self.calls = 0
+
+    def __loader(self, value=None, delay=0):
+        def _load():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+        return _load
+
+    def test_cache_and_invalidate(self):
+        self.assertEqual(self.cache.get((1, 1, 10), self.__loader([1, 2])), [1, 2])
+        self.assertEqual(self.cache.get((1, 1, 10), self.__loader([3])), [1, 2])
+        # None 结果同样缓存
+        self.assertIsNone(self.cache.get((2, None), self.__loader()))
+        self.assertIsNone(self.cache.get((2, None), self.__loader([1])))
+        self.assertEqual(self.calls, 2)
+        # 转移完成后对应媒体失效
+        self.cache.invalidate_by_event(EventType.TransferFinished, {"media_info": {"tmdb_id": 1}})
+        self.assertEqual(self.cache.get((1, 1, 10), self.__loader([3])), [3])
+        self.assertIsNone(self.cache.get((2, None), self.__loader([1])))
+        # 媒体库文件删除后只有对应媒体失效
+        self.cache.invalidate_by_event(EventType.LibraryFileDeleted, {"media_info": {"tmdbid": 1}})
+        self.assertEqual(self.cache.get((1, 1, 10), self.__loader([4])), [4])
+        self.assertIsNone(self.cache.get((2, None), self.__loader([1])))
+        # 播放通知不影响缓存，入库通知全部失效
+        self.cache.invalidate_by_event(EventType.EmbyWebhook, {"Event": "playback.start"})
+        self.assertIsNone(self.cache.get((2, None), self.__loader([1])))
+        self.cache.invalidate_by_event(EventType.EmbyWebhook, {"Event": "library.new"})
+        self.assertEqual(self.cache.get((2, None), self.__loader([1])), [1])
+        # 没有TMDBID时不缓存
+        self.cache.get((None, None), self.__loader())
+        self.cache.get((None, None), self.__loader())
+        self.assertEqual(self.calls, 7)
+
+    def test_share_in_flight(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get((1, 1), self.__loader([1], 0.1))))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [[1]] * 5)
+        self.assertEqual(self.calls, 1)
+
+    def test_invalidate_in_flight(self):
+        thread = threading.Thread(target=self.cache.get, args=((1, 1), self.__loader([1], 0.1)))
+        thread.start()
+        time.sleep(0.05)
+        self.cache.invalidate(1)
+        thread.join()
+        # 查询期间失效的结果不缓存
+        self.assertEqual(self.cache.get((1, 1), self.__loader([2])), [2])
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase, mock
+
+from app.plugins.modules.iyuuautoseed import IYUUAutoSeed
+from app.utils.types import DownloaderType
+
+
+class IYUUAutoSeedTest(TestCase):
+    def setUp(self) -> None:
+        self.plugin = IYUUAutoSeed()
+        self.plugin._chunk_size = 2
+        self.plugin._site_interval = 0
+        self.plugin._sites = []
+        self.plugin._success_caches = []
+        self.plugin._error_caches = []
+        self.plugin._permanent_error_caches = []
+        self.plugin._recheck_torrents = {}
+        self.plugin.downloader = mock.Mock()
+        self.plugin.downloader.get_torrents.return_value = [{"hash": "h1"}, {"hash": "h2"}, {"hash": "h3"},
+                                                            {"hash": "e1"}]
+        self.plugin.downloader.download.side_effect = lambda **kwargs: ("qb", kwargs["media_info"].enclosure, "")
+        self.plugin.iyuuhelper = mock.Mock()
+        self.plugin.iyuuhelper.get_seed_info.side_effect = lambda hashs: ({
+            current_hash: {"torrent": [{"sid": 1, "torrent_id": f"{current_hash}-1", "info_hash": f"{current_hash}-a"},
+                                       {"sid": 2, "torrent_id": f"{current_hash}-2", "info_hash": "e1"}]}
+            for current_hash in hashs
+        }, "")
+        self.plugin.iyuuhelper.get_torrent_url.side_effect = lambda sid: (f"site{sid}", "download.php?id={}")
+        self.plugin.sites = mock.Mock()
+        self.plugin.sites.get_sites.side_effect = lambda siteurl: {"id": siteurl, "name": siteurl,
+                                                                    "strict_url": f"https://{siteurl}"}
+        self.plugin.sites.check_ratelimit.return_value = False
+
+    def test_seed_torrents(self):
+        with mock.patch.object(IYUUAutoSeed, "put_histories") as put_histories, \
+                mock.patch.object(IYUUAutoSeed, "get_histories", return_value={}):
+            self.plugin._IYUUAutoSeed__seed_torrents(
+                hash_strs=[{"hash": h, "save_path": "/data"} for h in ("h1", "h2", "h3")],
+                downloader=1,
+                downloader_type=DownloaderType.QB)
+        # 分2组查询IYUU，下载器种子列表只查询一次
+        self.assertEqual(self.plugin.iyuuhelper.get_seed_info.call_count, 2)
+        self.assertEqual(self.plugin.downloader.get_torrents.call_count, 1)
+        # e1 已在下载器中，多个种子返回时只计一次已存在
+        self.assertEqual((self.plugin.total, self.plugin.exist, self.plugin.success), (4, 1, 3))
+        # 校验和历史批量处理
+        self.plugin.downloader.recheck_torrents.assert_called_once()
+        self.assertEqual(len(self.plugin._recheck_torrents[1]), 3)
+        self.assertEqual(sorted(put_histories.call_args.kwargs["items"]), ["h1", "h2", "h3"])
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase, mock
+
+from app.mediaserver.client.emby import Emby
+from app.mediaserver.client.jellyfin import Jellyfin
+
+
+class _Response(object):
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class MediaServerItemsTest(TestCase):
+    def setUp(self) -> None:
+        self.items = [{"Id": str(i), "Type": "Movie" if i % 2 else "Series", "Name": f"t{i}",
+                       "ProviderIds": {"Tmdb": str(i)}, "Path": f"/media/{i}"} for i in range(450)]
+        self.requests = []
+
+    def __get_res(self, url, params=None):
+        self.requests.append((url, params))
+        start, limit = params.get("StartIndex"), params.get("Limit")
+        return _Response({"Items": self.items[start:start + limit], "TotalRecordCount": len(self.items)})
+
+    def __get_items(self, client_class):
+        client = client_class.__new__(client_class)
+        client._host = "http://server/"
+        client._apikey = "key"
+        client._user = "user"
+        with mock.patch("app.mediaserver.client._base.RequestUtils") as request_utils:
+            request_utils.return_value.get_res.side_effect = self.__get_res
+            return [item for item in client.get_items("lib") if item]
+
+    def test_paged_items(self):
+        for client_class in (Emby, Jellyfin):
+            self.requests = []
+            items = self.__get_items(client_class)
+            # 分页顺序返回，不再逐个查询详情
+            self.assertEqual([item.get("id") for item in items], [str(i) for i in range(450)])
+            self.assertEqual(items[3].get("tmdbid"), "3")
+            self.assertEqual(items[3].get("path"), "/media/3")
+            self.assertEqual(sorted(params.get("StartIndex") for _, params in self.requests), [0, 200, 400])
+            self.assertEqual(self.requests[0][1].get("Recursive"), "true")
+            self.assertIn("ProviderIds", self.requests[0][1].get("Fields"))
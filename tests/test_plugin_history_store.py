@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+import uuid
+from unittest import TestCase
+
+from app.plugins.history_store import PluginHistoryStore
+
+
+class PluginHistoryStoreTest(TestCase):
+    def setUp(self) -> None:
+        self.plugin_id = "Test%s" % uuid.uuid4().hex
+        self.store = PluginHistoryStore.__wrapped__()
+
+    def tearDown(self) -> None:
+        for key in list(self.store.scan(self.plugin_id, "")):
+            self.store.delete(self.plugin_id, key)
+        self.store.stop()
+
+    def test_cache_and_flush(self):
+        self.store.put_many(self.plugin_id, {"a-1": {"n": 1}, "a-2": [1, 2], "b-1": "text", 3: 4})
+        # 写回前直接从缓存读取
+        self.assertEqual(self.store.get(self.plugin_id, "a-1"), {"n": 1})
+        self.assertEqual(self.store.get(self.plugin_id, 3), "4")
+        self.assertEqual(self.store.get_many(self.plugin_id, ["a-2", "c"]), {"a-2": [1, 2]})
+        # 修改返回的对象不影响缓存
+        self.store.get(self.plugin_id, "a-1")["n"] = 2
+        self.store.get_all(self.plugin_id)[1].append(3)
+        self.assertEqual(self.store.get(self.plugin_id, "a-1"), {"n": 1})
+        self.assertEqual(self.store.get(self.plugin_id, "a-2"), [1, 2])
+        self.assertEqual(sorted(self.store.scan(self.plugin_id, "a-")), ["a-1", "a-2"])
+        self.assertFalse(self.store.update(self.plugin_id, "c", "x"))
+        self.assertTrue(self.store.update(self.plugin_id, "b-1", {"m": 1}))
+        self.assertTrue(self.store.flush())
+        # 新实例从数据库加载
+        store = PluginHistoryStore.__wrapped__()
+        self.assertEqual(store.get_all(self.plugin_id), [{"n": 1}, [1, 2], {"m": 1}, "4"])
+        # 删除后再写入
+        self.assertTrue(self.store.delete(self.plugin_id, "a-1"))
+        self.store.put(self.plugin_id, "a-2", {"n": 2})
+        self.assertTrue(self.store.flush())
+        store = PluginHistoryStore.__wrapped__()
+        self.assertEqual(store.scan(self.plugin_id, "a-"), {"a-2": {"n": 2}})
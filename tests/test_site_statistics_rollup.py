@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import importlib.util
+import os
+from types import SimpleNamespace
+from unittest import TestCase
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Base, SITESTATISTICSDAILY, SITESTATISTICSHISTORY, SITESTATISTICSMONTHLY
+from app.helper.db_helper import DbHelper
+
+URL = "https://example.com/"
+
+# 首日、正常增长、Cookie失效（总量为0）、跳过一天后恢复、次月
+DAYS = [
+    ("2026-09-29", 100, 10),
+    ("2026-09-30", 150, 20),
+    ("2026-10-01", 0, 0),
+    ("2026-10-03", 200, 25),
+    ("2026-10-04", 260, 25)
+]
+
+
+class _SessionDb:
+    """
+    以内存数据库会话代替MainDb，供DbHelper读写使用
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def query(self, *obj):
+        return self.session.query(*obj)
+
+    def insert(self, data):
+        self.session.add(data)
+
+
+class SiteStatisticsRollupTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine, tables=[SITESTATISTICSHISTORY.__table__,
+                                                      SITESTATISTICSDAILY.__table__,
+                                                      SITESTATISTICSMONTHLY.__table__])
+        self.session = sessionmaker(bind=self.engine)()
+        self.helper = DbHelper()
+        self.helper._db = _SessionDb(self.session)
+
+    def tearDown(self) -> None:
+        self.session.close()
+        self.engine.dispose()
+
+    def __dailies(self):
+        return {row.DATE: (row.UPLOAD, row.UPLOAD_INC, row.DOWNLOAD_INC)
+                for row in self.session.query(SITESTATISTICSDAILY).filter(SITESTATISTICSDAILY.URL == URL)}
+
+    def __monthlies(self):
+        return {row.MONTH: (row.DAYS, row.UPLOAD_INC, row.DOWNLOAD_INC)
+                for row in self.session.query(SITESTATISTICSMONTHLY).filter(SITESTATISTICSMONTHLY.URL == URL)}
+
+    def __assert_rollup(self):
+        self.assertEqual(self.__dailies(), {
+            # 首日没有基准
+            "2026-09-29": (100, 0, 0),
+            "2026-09-30": (150, 50, 10),
+            # Cookie失效
+            "2026-10-01": (0, 0, 0),
+            # 以失效前的数据为基准，包含缺失的日期
+            "2026-10-03": (200, 50, 5),
+            "2026-10-04": (260, 60, 0)
+        })
+        self.assertEqual(self.__monthlies(), {
+            "2026-09": (2, 50, 10),
+            "2026-10": (3, 110, 5)
+        })
+
+    def test_update_rollup(self):
+        for date, upload, download in DAYS:
+            self.helper.update_site_statistics_rollup([SimpleNamespace(site_name="test",
+                                                                       site_url=URL,
+                                                                       upload=upload,
+                                                                       download=download,
+                                                                       seeding=1,
+                                                                       seeding_size=1024,
+                                                                       bonus="1.5")],
+                                                      date=date)
+            self.session.commit()
+        self.__assert_rollup()
+
+    def test_update_rollup_same_day(self):
+        # 同一天多次刷新只保留一条日汇总
+        for upload in [100, 120]:
+            self.helper.update_site_statistics_rollup([SimpleNamespace(site_name="test",
+                                                                       site_url=URL,
+                                                                       upload=upload,
+                                                                       download=0,
+                                                                       seeding=0,
+                                                                       seeding_size=0,
+                                                                       bonus=0)],
+                                                      date="2026-10-01")
+            self.session.commit()
+        self.assertEqual(self.__dailies(), {"2026-10-01": (120, 0, 0)})
+        self.assertEqual(self.__monthlies(), {"2026-10": (1, 0, 0)})
+
+    def test_migration_backfill(self):
+        self.session.add_all([SITESTATISTICSHISTORY(SITE="test", URL=URL, DATE=date,
+                                                    UPLOAD=upload, DOWNLOAD=download,
+                                                    SEEDING=1, SEEDING_SIZE=1024, BONUS=1.5)
+                              for date, upload, download in DAYS])
+        self.session.commit()
+        spec = importlib.util.spec_from_file_location(
+            "migration_1_3_0",
+            os.path.join(os.path.dirname(__file__), os.pardir, "scripts", "versions", "e2d5a7c1f3b8_1_3_0.py"))
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+        with self.engine.begin() as conn:
+            with Operations.context(MigrationContext.configure(conn)):
+                migration.upgrade()
+        self.__assert_rollup()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+import re
+from unittest import TestCase
+
+from app.sites.siteuserinfo._base import _ISiteUserInfo
+
+
+class _WindowedSeedingUserInfo(_ISiteUserInfo):
+    """
+    做种列表共10页，每页只显示当前页附近的3个页码及下一页链接
+    """
+    total_pages = 10
+
+    def __init__(self):
+        super().__init__("test", "https://example.com/", "", "")
+        self._torrent_seeding_page = "torrents.php?type=seeding"
+        self.pages = []
+
+    def _get_page_content(self, url, params=None, headers=None):
+        page = int(re.search(r"page=(\d+)", url).group(1)) if "page=" in url else 0
+        self.pages.append(page)
+        links = "".join(f'<a href="torrents.php?type=seeding&page={p}">{p}</a>'
+                        for p in range(max(page - 1, 0), min(page + 3, self.total_pages)))
+        if page + 1 < self.total_pages:
+            links += f'<a class="next" href="torrents.php?type=seeding&page={page + 1}">next</a>'
+        return f'<html><body><span class="seed">{page}</span>{links}</body></html>'
+
+    def _parse_user_torrent_seeding_info(self, html_text, multi_page=False):
+        self.seeding += 1
+        next_page = re.search(r'class="next" href="([^"]+)"', html_text)
+        return next_page.group(1).replace("&amp;", "&") if next_page else None
+
+    def _parse_message_unread_links(self, html_text, msg_links):
+        return None
+
+    def _parse_site_page(self, html_text):
+        pass
+
+    def _parse_user_base_info(self, html_text):
+        pass
+
+    def _parse_user_traffic_info(self, html_text):
+        pass
+
+    def _parse_user_detail_info(self, html_text):
+        pass
+
+    def _parse_message_content(self, html_text):
+        return None, None, None
+
+
+class SiteUserInfoSeedingTest(TestCase):
+    def test_windowed_paginator(self):
+        userinfo = _WindowedSeedingUserInfo()
+        userinfo._parse_seeding_pages()
+        # 分页只显示到第3页，其余页面逐页获取，每页只获取一次
+        self.assertEqual(userinfo.seeding, userinfo.total_pages)
+        self.assertEqual(sorted(userinfo.pages), list(range(userinfo.total_pages)))
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+import logging
+from unittest import TestCase, mock
+
+import log
+from log import LogBuffer
+from app.helper.progress_helper import ProgressHelper
+
+
+class StreamWaitTest(TestCase):
+    def test_log_buffer_wait(self):
+        buffer = LogBuffer(size=4)
+        # 没有新日志时超时返回空列表
+        self.assertEqual(buffer.wait(0, timeout=0.01), (0, []))
+        threading.Timer(0.05, buffer.append, args=("a",)).start()
+        start = time.time()
+        seq, items = buffer.wait(0, timeout=5)
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual((seq, items), (1, ["a"]))
+        # 各读取方按各自的序号读取，互不影响
+        for item in ("b", "c"):
+            buffer.append(item)
+        self.assertEqual(buffer.wait(1, timeout=0.01), (3, ["b", "c"]))
+        self.assertEqual(buffer.wait(0, timeout=0.01), (3, ["a", "b", "c"]))
+
+    def test_progress_wait(self):
+        progress = ProgressHelper()
+        version = progress.wait("test", None, timeout=0.01)
+        self.assertEqual(progress.wait("test", version, timeout=0.01), version)
+        progress.start("test")
+        version = progress.wait("test", version, timeout=0.01)
+        threading.Timer(0.05, progress.update, kwargs={"value": 50, "ptype": "test"}).start()
+        start = time.time()
+        new_version = progress.wait("test", version, timeout=5)
+        self.assertLess(time.time() - start, 1)
+        self.assertNotEqual(new_version, version)
+        self.assertEqual(progress.get_process("test").get("value"), 50)
+        progress.end("test")
+
+    def test_bad_log_record(self):
+        seq, _ = log.get_logs()
+        # 格式化出错的日志不能中断日志处理线程
+        with mock.patch.object(logging, "raiseExceptions", False):
+            log.info("【Test】bad %d", "x")
+            log.info("【Test】after bad record")
+            deadline = time.time() + 5
+            texts = []
+            while "after bad record" not in texts and time.time() < deadline:
+                seq, items = log.wait_logs(seq, timeout=0.5)
+                texts += [item.get("text") for item in items]
+        self.assertIn("after bad record", texts)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase
+
+from app.downloader.torrent_rule import TorrentSnapshot, TorrentRule, Condition
+
+NOW = 1700000000
+
+
+def qb_torrent(hash_str, **kwargs):
+    torrent = {
+        "hash": hash_str,
+        "name": hash_str,
+        "size": 10 * 1024 ** 3,
+        "total_size": 10 * 1024 ** 3,
+        "ratio": 0,
+        "uploaded": 0,
+        "downloaded": 10 * 1024 ** 3,
+        "added_on": NOW - 48 * 3600,
+        "completion_on": NOW - 47 * 3600,
+        "last_activity": NOW - 60,
+        "save_path": "/downloads/movie",
+        "tracker": "https://tracker.example.org/announce",
+        "state": "uploading",
+        "category": "movie"
+    }
+    torrent.update(kwargs)
+    return torrent
+
+
+class TorrentRuleTest(TestCase):
+    def setUp(self) -> None:
+        self.snapshot = TorrentSnapshot.from_torrents("qbittorrent", [
+            qb_torrent("a", ratio=3, uploaded=30 * 1024 ** 3),
+            qb_torrent("b", ratio=0.5, completion_on=0, added_on=NOW - 3600),
+            qb_torrent("c", ratio=2, state="pausedUP", tracker="https://other.org/announce"),
+            qb_torrent("d", ratio=2, size=100 * 1024 ** 3)
+        ], date_now=NOW)
+
+    def __ids(self, indexes):
+        return [self.snapshot.values("id")[i] for i in indexes]
+
+    def test_remove_config(self):
+        rule = TorrentRule.from_remove_config({"ratio": 1, "seeding_time": 24, "size": [1, 50]})
+        self.assertEqual(self.__ids(rule.filter(self.snapshot)), ["a", "c"])
+        rule = TorrentRule.from_remove_config({"tracker_key": "example", "qb_state": ["uploading"]})
+        self.assertEqual(self.__ids(rule.filter(self.snapshot)), ["a", "b", "d"])
+        self.assertEqual(len(TorrentRule.from_remove_config({}).filter(self.snapshot)), 4)
+
+    def test_first_match(self):
+        rules = [TorrentRule([Condition("uploaded", ">", 1024 ** 3, nonzero=True)], result="uploadsize"),
+                 TorrentRule([Condition("ratio", ">", 1, nonzero=True)], result="ratio"),
+                 TorrentRule([Condition("seeding_time", ">", 24 * 3600, nonzero=True)], result="time")]
+        matches = TorrentRule.first_match(self.snapshot, rules)
+        self.assertEqual([rule.result if rule else None for rule in matches],
+                         ["uploadsize", None, "ratio", "ratio"])
+
+    def test_row(self):
+        row = self.snapshot.row(1)
+        self.assertEqual(row.get("seeding_time"), 0)
+        self.assertEqual(row.get("done_time"), 3600)
+        self.assertEqual(row.get("dltime"), 3600)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Base, TRANSFERHISTORY
+from app.helper.db_helper import DbHelper
+
+
+class _SessionDb:
+    """
+    以内存数据库会话代替MainDb，供DbHelper查询使用
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def query(self, *obj):
+        return self.session.query(*obj)
+
+
+class TransferHistoryIndexTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine, tables=[TRANSFERHISTORY.__table__])
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add_all([
+            TRANSFERHISTORY(TMDBID=1399, SEASON_EPISODE="S01 E01-E03", SEASON=1, EPISODE_START=1, EPISODE_END=3),
+            TRANSFERHISTORY(TMDBID=1399, SEASON_EPISODE="S01 E04-E06", SEASON=1, EPISODE_START=4, EPISODE_END=6),
+            TRANSFERHISTORY(TMDBID=1399, SEASON_EPISODE="S02 E05", SEASON=2, EPISODE_START=5, EPISODE_END=5),
+            TRANSFERHISTORY(TMDBID=1400, SEASON_EPISODE="S01 E05", SEASON=1, EPISODE_START=5, EPISODE_END=5)
+        ])
+        self.session.commit()
+        self.helper = DbHelper()
+        self.helper._db = _SessionDb(self.session)
+        # 记录DbHelper实际执行的查询语句
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self.__record_statement)
+
+    def tearDown(self) -> None:
+        event.remove(self.engine, "before_cursor_execute", self.__record_statement)
+        self.session.close()
+        self.engine.dispose()
+
+    def __record_statement(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+    def __query_plan(self):
+        statement, parameters = self.statements[-1]
+        with self.engine.connect() as conn:
+            rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN %s" % statement, parameters).fetchall()
+        return " ".join(str(row[-1]) for row in rows)
+
+    def test_parse_season_episode(self):
+        self.assertEqual(DbHelper.parse_season_episode("S01"), (1, None, None))
+        self.assertEqual(DbHelper.parse_season_episode("S01-S03"), (1, None, None))
+        self.assertEqual(DbHelper.parse_season_episode("S02 E05"), (2, 5, 5))
+        self.assertEqual(DbHelper.parse_season_episode("S02 E05-E08"), (2, 5, 8))
+        self.assertEqual(DbHelper.parse_season_episode(""), (None, None, None))
+
+    def test_season_query_plan(self):
+        rows = self.helper.get_transfer_info_by(tmdbid=1399, season="S01")
+        self.assertEqual(sorted(row.SEASON_EPISODE for row in rows), ["S01 E01-E03", "S01 E04-E06"])
+        plan = self.__query_plan()
+        self.assertIn("INDX_TRANSFER_HISTORY_TMDBID_SEASON", plan)
+        self.assertNotIn("SCAN", plan)
+
+    def test_episode_query_plan(self):
+        rows = self.helper.get_transfer_info_by(tmdbid=1399, season_episode="S01 E05")
+        self.assertEqual([row.SEASON_EPISODE for row in rows], ["S01 E04-E06"])
+        plan = self.__query_plan()
+        self.assertIn("INDX_TRANSFER_HISTORY_TMDBID_SEASON", plan)
+        self.assertNotIn("SCAN", plan)
@@ -8,6 +8,7 @@ import re
 import shutil
 import signal
 import sqlite3
+import threading
 import time
 from math import floor
 from pathlib import Path
@@ -28,6 +29,7 @@ from app.helper import DbHelper, ProgressHelper, ThreadHelper, \
 from app.helper import RssHelper, PluginHelper
 from app.indexer import Indexer
 from app.media import Category, Media, Bangumi, DouBan, Scraper
+from app.media.doubanapi import DoubanApi
 from app.media.meta import MetaInfo, MetaBase
 from app.mediaserver import MediaServer
 from app.message import Message, MessageCenter
@@ -42,9 +44,12 @@ from app.sync import Sync
 from app.torrentremover import TorrentRemover
 from app.utils import StringUtils, EpisodeFormat, RequestUtils, PathUtils, \
     SystemUtils, ExceptionUtils, Torrent
+from app.utils.commons import get_instance
 from app.utils.types import RmtMode, OsType, SearchType, SyncType, MediaType, MovieTypes, TvTypes, \
     EventType, SystemConfigKey, RssType
 from config import RMT_MEDIAEXT, RMT_SUBEXT, RMT_AUDIO_TRACK_EXT, Config
+from web.backend.action_metrics import ActionMetrics
+from web.backend.dashboard import Dashboard, get_library_spacesize, get_library_mediacount
 from web.backend.search_torrents import search_medias_for_web, search_media_by_message
 from web.backend.user import User
 from web.backend.user_pro import UserPro
@@ -53,10 +58,26 @@ from app.apis import MTeamApi
 
 
 class WebAction:
+    # 所有请求共用同一实例，请求响应表只在首次创建时生成
+    _instance = None
+    _instance_lock = threading.Lock()
     _actions = {}
+    # 请求响应函数是否需要传入参数
+    _action_params = {}
     _commands = {}
-
-    def __init__(self):
+    # 请求耗时统计
+    _metrics = ActionMetrics()
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            with cls._instance_lock:
+                if not cls._instance:
+                    instance = super().__new__(cls)
+                    instance.__init_actions()
+                    cls._instance = instance
+        return cls._instance
+
+    def __init_actions(self):
         # WEB请求响应
         self._actions = {
             "sch": self.__sch,
@@ -117,6 +138,7 @@ class WebAction:
             "filterrule_detail": self.__filterrule_detail,
             "get_site_activity": self.__get_site_activity,
             "get_site_history": self.__get_site_history,
+            "get_site_monthly_history": self.__get_site_monthly_history,
             "get_recommend": self.get_recommend,
             "get_downloaded": self.get_downloaded,
             "get_site_seeding_info": self.__get_site_seeding_info,
@@ -159,6 +181,7 @@ class WebAction:
             "get_transfer_statistics": self.get_transfer_statistics,
             "get_library_spacesize": self.get_library_spacesize,
             "get_library_mediacount": self.get_library_mediacount,
+            "refresh_dashboard": self.__refresh_dashboard,
             "get_library_playhistory": self.get_library_playhistory,
             "get_search_result": self.get_search_result,
             "search_media_infos": self.search_media_infos,
@@ -238,8 +261,10 @@ class WebAction:
             "get_external_plugin_apps": self.get_external_plugin_apps,
             "save_external_source_settings": self.save_external_source_settings,
             "install_external_plugin": self.install_external_plugin,
-            "uninstall_external_plugin": self.uninstall_external_plugin
+            "uninstall_external_plugin": self.uninstall_external_plugin,
+            "get_action_metrics": self.__get_action_metrics
         }
+        self._action_params = {cmd: bool(inspect.signature(func).parameters) for cmd, func in self._actions.items()}
         # 远程命令响应
         self._commands = {
             "/ptr": {"func": TorrentRemover().auto_remove_torrents, "desc": "自动删种", "category": "站点"},
@@ -261,10 +286,14 @@ class WebAction:
         func = self._actions.get(cmd)
         if not func:
             return {"code": -1, "msg": "非授权访问！"}
-        elif inspect.signature(func).parameters:
-            return func(data)
-        else:
-            return func(**{})
+        start_time = time.time()
+        error = True
+        try:
+            result = func(data) if self._action_params.get(cmd) else func()
+            error = False
+            return result
+        finally:
+            self._metrics.record(cmd, time.time() - start_time, error)
 
     def api_action(self, cmd, data=None):
         """
@@ -298,22 +327,12 @@ class WebAction:
         """
         关闭服务
         """
-        # 停止定时服务
-        Scheduler().stop_service()
-        # 停止监控
-        Sync().stop_service()
-        # 关闭虚拟显示
-        DisplayHelper().stop_service()
-        # 关闭刷流
-        BrushTask().stop_service()
-        # 关闭自定义订阅
-        RssChecker().stop_service()
-        # 关闭自动删种
-        TorrentRemover().stop_service()
-        # 关闭下载器监控
-        Downloader().stop_service()
-        # 关闭插件
-        PluginManager().stop_service()
+        # 定时服务、监控、虚拟显示、刷流、自定义订阅、自动删种、下载器监控、插件，未启动的服务不处理
+        for service in [Scheduler, Sync, DisplayHelper, BrushTask, RssChecker,
+                        TorrentRemover, Downloader, PluginManager]:
+            instance = get_instance(service)
+            if instance:
+                instance.stop_service()
 
     @staticmethod
     def start_service():
@@ -1337,6 +1356,10 @@ class WebAction:
         # 保存配置
         if not config_test:
             Config().save_config(cfg)
+            # 媒体服务器或媒体库配置变化时，首页面板不再使用原来的缓存
+            if any(str(key).split(".")[0] in ["media", "emby", "jellyfin", "plex"] for key, _ in cfgs):
+                MediaServer().init_config()
+                Dashboard().clear()
 
         return {"code": 0}
 
@@ -2254,6 +2277,23 @@ class WebAction:
         resp.update({"dataset": dataset})
         return resp
 
+    @staticmethod
+    def __get_site_monthly_history(data):
+        """
+        查询site 每月上传下载量
+        :param data: {"months":最近几个月}
+        :return:
+        """
+        months = (data or {}).get("months") or 12
+        if not isinstance(months, int):
+            return {"code": 1, "msg": "查询参数错误"}
+
+        # 调整为dataset组织数据
+        dataset = [["month", "site", "upload", "download"]]
+        dataset.extend([[item.get("month"), item.get("site"), item.get("upload"), item.get("download")]
+                        for item in SiteUserInfo().get_pt_site_monthly_statistics(months)])
+        return {"code": 0, "dataset": dataset}
+
     @staticmethod
     def __get_site_seeding_info(data):
         """
@@ -2607,6 +2647,8 @@ class WebAction:
         """
         try:
             MetaHelper().clear_meta_data()
+            Media().clear_tmdb_request_cache()
+            DoubanApi().clear_cache()
             os.remove(MetaHelper().get_meta_data_path())
         except Exception as e:
             ExceptionUtils.exception_traceback(e)
@@ -3425,50 +3467,7 @@ class WebAction:
         """
         查询媒体库存储空间
         """
-        # 磁盘空间
-        UsedSapce = 0
-        UsedPercent = 0
-        media = Config().get_config('media')
-        # 电影目录
-        movie_paths = media.get('movie_path')
-        if not isinstance(movie_paths, list):
-            movie_paths = [movie_paths]
-        # 电视目录
-        tv_paths = media.get('tv_path')
-        if not isinstance(tv_paths, list):
-            tv_paths = [tv_paths]
-        # 动漫目录
-        anime_paths = media.get('anime_path')
-        if not isinstance(anime_paths, list):
-            anime_paths = [anime_paths]
-        # 总空间、剩余空间
-        TotalSpace, FreeSpace = SystemUtils.calculate_space_usage(movie_paths + tv_paths + anime_paths)
-        if TotalSpace:
-            # 已使用空间
-            UsedSapce = TotalSpace - FreeSpace
-            # 百分比格式化
-            UsedPercent = "%0.1f" % ((UsedSapce / TotalSpace) * 100)
-            # 总剩余空间 格式化
-            if FreeSpace > 1024:
-                FreeSpace = "{:,} TB".format(round(FreeSpace / 1024, 2))
-            else:
-                FreeSpace = "{:,} GB".format(round(FreeSpace, 2))
-            # 总使用空间 格式化
-            if UsedSapce > 1024:
-                UsedSapce = "{:,} TB".format(round(UsedSapce / 1024, 2))
-            else:
-                UsedSapce = "{:,} GB".format(round(UsedSapce, 2))
-            # 总空间 格式化
-            if TotalSpace > 1024:
-                TotalSpace = "{:,} TB".format(round(TotalSpace / 1024, 2))
-            else:
-                TotalSpace = "{:,} GB".format(round(TotalSpace, 2))
-
-        return {"code": 0,
-                "UsedPercent": UsedPercent,
-                "FreeSpace": FreeSpace,
-                "UsedSapce": UsedSapce,
-                "TotalSpace": TotalSpace}
+        return get_library_spacesize()
 
     @staticmethod
     def get_transfer_statistics():
@@ -3509,21 +3508,23 @@ class WebAction:
         """
         查询媒体库统计数据
         """
-        MediaServerClient = MediaServer()
-        media_counts = MediaServerClient.get_medias_count()
-        UserCount = MediaServerClient.get_user_count()
-        if media_counts:
-            return {
-                "code": 0,
-                "Movie": "{:,}".format(media_counts.get('MovieCount')),
-                "Series": "{:,}".format(media_counts.get('SeriesCount')),
-                "Episodes": "{:,}".format(media_counts.get('EpisodeCount')) if media_counts.get(
-                    'EpisodeCount') else "",
-                "Music": "{:,}".format(media_counts.get('SongCount')),
-                "User": UserCount
-            }
-        else:
-            return {"code": -1, "msg": "媒体库服务器连接失败"}
+        return get_library_mediacount()
+
+    @staticmethod
+    def __refresh_dashboard():
+        """
+        等待首页面板后台刷新完成，返回已更新的面板名称
+        """
+        return {"code": 0, "panels": Dashboard().wait_refresh()}
+
+    def __get_action_metrics(self, data=None):
+        """
+        查询WEB请求耗时统计
+        """
+        metrics = self._metrics.get_metrics()
+        if data and data.get("clear"):
+            self._metrics.clear()
+        return {"code": 0, **metrics}
 
     @staticmethod
     def get_library_playhistory():
@@ -4465,6 +4466,8 @@ class WebAction:
         执行自动删种任务
         """
         tid = data.get("tid")
+        if data.get("dry_run"):
+            return {"code": 0, "data": TorrentRemover().auto_remove_torrents(taskids=tid, dry_run=True)}
         TorrentRemover().auto_remove_torrents(taskids=tid)
         return {"code": 0}
 
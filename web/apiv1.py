@@ -1016,6 +1016,19 @@ class SystemProgress(ClientResource):
         return WebAction().api_action(cmd='refresh_process', data=self.parser.parse_args())
 
 
+@system.route('/metrics')
+class SystemMetrics(ClientResource):
+    parser = reqparse.RequestParser()
+    parser.add_argument('clear', type=int, help='查询后清空统计（0/1）', location='form')
+
+    @system.doc(parser=parser)
+    def post(self):
+        """
+        查询接口耗时统计
+        """
+        return WebAction().api_action(cmd='get_action_metrics', data=self.parser.parse_args())
+
+
 @config.route('/update')
 class ConfigUpdate(ClientResource):
     parser = reqparse.RequestParser()
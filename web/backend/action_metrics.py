@@ -0,0 +1,55 @@
+import threading
+import time
+
+
+class ActionMetrics(object):
+    """
+    WEB请求耗时统计，按命令累计调用次数、异常次数、总耗时和最大耗时
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 命令 -> [调用次数, 异常次数, 总耗时, 最大耗时]
+        self._metrics = {}
+        self._since = time.time()
+
+    def record(self, cmd, elapsed, error=False):
+        """
+        记录一次请求
+        :param cmd: 命令
+        :param elapsed: 耗时（秒）
+        :param error: 是否发生异常
+        """
+        with self._lock:
+            metric = self._metrics.get(cmd)
+            if not metric:
+                metric = self._metrics[cmd] = [0, 0, 0.0, 0.0]
+            metric[0] += 1
+            if error:
+                metric[1] += 1
+            metric[2] += elapsed
+            if elapsed > metric[3]:
+                metric[3] = elapsed
+
+    def get_metrics(self):
+        """
+        查询统计数据，按总耗时倒序，耗时单位为毫秒
+        """
+        with self._lock:
+            metrics = [(cmd, list(metric)) for cmd, metric in self._metrics.items()]
+        return {
+            "since": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self._since)),
+            "actions": [{
+                "cmd": cmd,
+                "count": count,
+                "errors": errors,
+                "total": round(total * 1000, 1),
+                "avg": round(total * 1000 / count, 1),
+                "max": round(max_elapsed * 1000, 1)
+            } for cmd, (count, errors, total, max_elapsed) in sorted(metrics, key=lambda x: x[1][2], reverse=True)]
+        }
+
+    def clear(self):
+        with self._lock:
+            self._metrics = {}
+            self._since = time.time()
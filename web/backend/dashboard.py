@@ -0,0 +1,183 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import log
+from app.mediaserver import MediaServer
+from app.utils import ExceptionUtils, SystemUtils
+from app.utils.commons import singleton
+from config import Config
+
+
+def get_library_spacesize():
+    """
+    查询媒体库存储空间
+    """
+    # 磁盘空间
+    UsedSapce = 0
+    UsedPercent = 0
+    media = Config().get_config('media')
+    # 电影目录
+    movie_paths = media.get('movie_path')
+    if not isinstance(movie_paths, list):
+        movie_paths = [movie_paths]
+    # 电视目录
+    tv_paths = media.get('tv_path')
+    if not isinstance(tv_paths, list):
+        tv_paths = [tv_paths]
+    # 动漫目录
+    anime_paths = media.get('anime_path')
+    if not isinstance(anime_paths, list):
+        anime_paths = [anime_paths]
+    # 总空间、剩余空间
+    TotalSpace, FreeSpace = SystemUtils.calculate_space_usage(movie_paths + tv_paths + anime_paths)
+    if TotalSpace:
+        # 已使用空间
+        UsedSapce = TotalSpace - FreeSpace
+        # 百分比格式化
+        UsedPercent = "%0.1f" % ((UsedSapce / TotalSpace) * 100)
+        # 总剩余空间 格式化
+        if FreeSpace > 1024:
+            FreeSpace = "{:,} TB".format(round(FreeSpace / 1024, 2))
+        else:
+            FreeSpace = "{:,} GB".format(round(FreeSpace, 2))
+        # 总使用空间 格式化
+        if UsedSapce > 1024:
+            UsedSapce = "{:,} TB".format(round(UsedSapce / 1024, 2))
+        else:
+            UsedSapce = "{:,} GB".format(round(UsedSapce, 2))
+        # 总空间 格式化
+        if TotalSpace > 1024:
+            TotalSpace = "{:,} TB".format(round(TotalSpace / 1024, 2))
+        else:
+            TotalSpace = "{:,} GB".format(round(TotalSpace, 2))
+
+    return {"code": 0,
+            "UsedPercent": UsedPercent,
+            "FreeSpace": FreeSpace,
+            "UsedSapce": UsedSapce,
+            "TotalSpace": TotalSpace}
+
+
+def get_library_mediacount():
+    """
+    查询媒体库统计数据
+    """
+    MediaServerClient = MediaServer()
+    media_counts = MediaServerClient.get_medias_count()
+    UserCount = MediaServerClient.get_user_count()
+    if media_counts:
+        return {
+            "code": 0,
+            "Movie": "{:,}".format(media_counts.get('MovieCount')),
+            "Series": "{:,}".format(media_counts.get('SeriesCount')),
+            "Episodes": "{:,}".format(media_counts.get('EpisodeCount')) if media_counts.get(
+                'EpisodeCount') else "",
+            "Music": "{:,}".format(media_counts.get('SongCount')),
+            "User": UserCount
+        }
+    else:
+        return {"code": -1, "msg": "媒体库服务器连接失败"}
+
+
+@singleton
+class Dashboard:
+    """
+    首页面板数据：各面板并发获取，按面板缓存，过期后先返回旧数据并在后台刷新
+    """
+    # 面板名称：(获取函数, 缓存时间（秒）, 获取失败时的默认值)
+    _panels = {
+        "mediacount": (get_library_mediacount, 300, {"code": -1}),
+        "playhistory": (lambda: MediaServer().get_activity_log(30), 60, []),
+        "spacesize": (get_library_spacesize, 300, {}),
+        "libraries": (lambda: MediaServer().get_libraries(), 600, []),
+        "resume": (lambda: MediaServer().get_resume(), 60, []),
+        "latest": (lambda: MediaServer().get_latest(), 120, [])
+    }
+    # 首次加载时等待面板数据的最长时间（秒）
+    _wait_timeout = 15
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=len(self._panels), thread_name_prefix="Dashboard")
+        # 面板缓存：名称 -> (获取时间, 数据)
+        self._cache = {}
+        # 正在刷新的面板：名称 -> Future
+        self._refreshing = {}
+        # 缓存版本，清空缓存后旧版本的刷新结果不再写入
+        self._version = 0
+
+    def get_panels(self, timeout=None):
+        """
+        获取全部面板数据，有缓存的面板直接返回，没有缓存的并发获取
+        :return: (面板数据, 是否有面板已过期正在后台刷新)
+        """
+        panels = {}
+        futures = {}
+        stale = False
+        with self._lock:
+            for name, (_, ttl, _) in self._panels.items():
+                cached = self._cache.get(name)
+                if cached:
+                    panels[name] = cached[1]
+                    if time.time() - cached[0] > ttl:
+                        self.__refresh(name)
+                        stale = True
+                else:
+                    futures[name] = self.__refresh(name)
+        if futures:
+            wait(futures.values(), timeout=timeout or self._wait_timeout)
+            for name, future in futures.items():
+                if future.done() and not future.exception():
+                    panels[name] = future.result()
+                else:
+                    panels[name] = self._panels[name][2]
+                    stale = True
+        return panels, stale
+
+    def wait_refresh(self, timeout=None):
+        """
+        等待后台刷新完成
+        :return: 数据已更新的面板名称
+        """
+        with self._lock:
+            futures = dict(self._refreshing)
+        if not futures:
+            return []
+        wait(futures.values(), timeout=timeout or self._wait_timeout)
+        return [name for name, future in futures.items() if future.done() and not future.exception()]
+
+    def clear(self):
+        """
+        清空面板缓存，媒体服务器配置或当前用户变化时调用
+        """
+        with self._lock:
+            self._cache = {}
+            self._version += 1
+
+    def __refresh(self, name):
+        """
+        提交面板刷新任务，同一面板同时只刷新一次，需在加锁后调用
+        """
+        future = self._refreshing.get(name)
+        if not future:
+            future = self._refreshing[name] = self._executor.submit(self.__fetch, name, self._version)
+        return future
+
+    def __fetch(self, name, version):
+        try:
+            data = self._panels[name][0]()
+            # 媒体服务器连接失败时不缓存
+            if isinstance(data, dict) and data.get("code", 0) != 0:
+                return data
+            with self._lock:
+                if version == self._version:
+                    self._cache[name] = (time.time(), data)
+            return data
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            log.error(f"【Dashboard】{name} 面板数据获取失败：{str(err)}")
+            raise err
+        finally:
+            with self._lock:
+                self._refreshing.pop(name, None)
@@ -0,0 +1,148 @@
+import threading
+import time
+from queue import Queue, Empty, Full
+
+import log
+from app.downloader import Downloader
+from app.utils import ExceptionUtils
+from app.utils.commons import singleton
+
+
+def diff_torrents(old_rows, new_rows):
+    """
+    计算种子变化
+    :param old_rows: 上次的 {种子ID: 种子信息}
+    :param new_rows: 本次的 {种子ID: 种子信息}
+    :return: (新增的种子, 删除的种子ID, 变化的字段)
+    """
+    added = []
+    changed = []
+    for tid, row in new_rows.items():
+        old_row = old_rows.get(tid)
+        if old_row is None:
+            added.append(row)
+            continue
+        fields = {key: value for key, value in row.items() if old_row.get(key) != value}
+        if fields:
+            fields["id"] = tid
+            changed.append(fields)
+    removed = [tid for tid in old_rows if tid not in new_rows]
+    return added, removed, changed
+
+
+class DownloadingSubscriber(object):
+    """
+    正在下载页面的订阅方，按顺序接收变化，积压过多时丢弃并在下次推送全量数据
+    """
+    # 最多积压的推送数
+    _max_pending = 50
+
+    def __init__(self, downloader_id):
+        self.downloader_id = downloader_id
+        self._queue = Queue(maxsize=self._max_pending)
+        # 是否需要推送全量数据
+        self.resync = True
+
+    def put(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except Full:
+            self.resync = True
+
+    def get(self, timeout=None):
+        """
+        等待下一条推送，超时返回None
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except Empty:
+            return None
+
+
+@singleton
+class DownloadingWatcher(object):
+    """
+    正在下载任务推送：每个下载器只有一个轮询线程，计算种子变化后推送给所有订阅方，没有订阅方时停止轮询
+    推送格式：{"added": [新增或全量种子], "removed": [删除的种子ID], "changed": [{"id": 种子ID, 变化的字段...}], "full": 是否全量}
+    """
+    # 轮询间隔（秒）
+    _interval = 2
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 下载器ID -> 订阅方列表
+        self._subscribers = {}
+        # 下载器ID -> 轮询线程
+        self._pollers = {}
+        # 下载器ID -> {种子ID: 种子信息}，最近一次轮询结果
+        self._snapshots = {}
+
+    def subscribe(self, downloader_id=None):
+        """
+        订阅下载器的正在下载任务，订阅后首次推送为全量数据
+        """
+        downloader_id = downloader_id or Downloader().default_downloader_id
+        subscriber = DownloadingSubscriber(downloader_id)
+        with self._lock:
+            self._subscribers.setdefault(downloader_id, []).append(subscriber)
+            snapshot = self._snapshots.get(downloader_id)
+            if snapshot is not None:
+                subscriber.resync = False
+                subscriber.put(self.__full_message(snapshot))
+            if downloader_id not in self._pollers:
+                poller = threading.Thread(target=self.__poll,
+                                          args=(downloader_id,),
+                                          name=f"DownloadingWatcher-{downloader_id}",
+                                          daemon=True)
+                self._pollers[downloader_id] = poller
+                poller.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """
+        取消订阅，最后一个订阅方退出后轮询线程在下一轮结束
+        """
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.downloader_id) or []
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+
+    @staticmethod
+    def __full_message(snapshot):
+        return {"added": list(snapshot.values()), "removed": [], "changed": [], "full": True}
+
+    def __poll(self, downloader_id):
+        """
+        轮询下载器，有订阅方时持续运行
+        """
+        while True:
+            with self._lock:
+                if not self._subscribers.get(downloader_id):
+                    self._subscribers.pop(downloader_id, None)
+                    self._pollers.pop(downloader_id, None)
+                    self._snapshots.pop(downloader_id, None)
+                    return
+            try:
+                torrents = Downloader().get_downloading_progress(downloader_id=downloader_id)
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+                log.error(f"【Downloader】查询正在下载任务出错：{str(err)}")
+                torrents = None
+            if torrents is not None:
+                self.__publish(downloader_id, {torrent.get("id"): torrent for torrent in torrents})
+            time.sleep(self._interval)
+
+    def __publish(self, downloader_id, rows):
+        with self._lock:
+            old_rows = self._snapshots.get(downloader_id)
+            self._snapshots[downloader_id] = rows
+            added, removed, changed = diff_torrents(old_rows or {}, rows)
+            message = {"added": added, "removed": removed, "changed": changed, "full": False}
+            full_message = None
+            for subscriber in self._subscribers.get(downloader_id) or []:
+                if subscriber.resync or old_rows is None:
+                    subscriber.resync = False
+                    full_message = full_message or self.__full_message(rows)
+                    subscriber.put(full_message)
+                elif added or removed or changed:
+                    subscriber.put(message)
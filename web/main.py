@@ -29,8 +29,9 @@ from app.brushtask import BrushTask
 from app.conf import ModuleConf, SystemConfig
 from app.downloader import Downloader
 from app.filter import Filter
-from app.helper import SecurityHelper, MetaHelper, ChromeHelper, ThreadHelper
+from app.helper import SecurityHelper, MetaHelper, ChromeHelper, ThreadHelper, ProgressHelper
 from app.indexer import Indexer
+from app.media import Media
 from app.media.meta import MetaInfo
 from app.mediaserver import MediaServer
 from app.message import Message
@@ -46,6 +47,8 @@ from config import PT_TRANSFER_INTERVAL, Config, TMDB_API_DOMAINS
 from web.action import WebAction
 from web.apiv1 import apiv1_bp
 from web.backend.WXBizMsgCrypt3 import WXBizMsgCrypt
+from web.backend.dashboard import Dashboard
+from web.backend.downloading_watcher import DownloadingWatcher
 from web.backend.user import User
 from web.backend.user_pro import UserPro
 from web.backend.wallpaper import get_login_wallpaper
@@ -55,6 +58,11 @@ from web.security import require_auth
 # 配置文件锁
 ConfigLock = Lock()
 
+# 实时日志、进度推送无数据时保持连接的间隔（秒）
+_STREAM_KEEPALIVE = 15
+# 实时进度最小推送间隔（秒）
+_STREAM_PROGRESS_INTERVAL = 0.2
+
 # Flask App
 App = Flask(__name__)
 App.wsgi_app = ProxyFix(App.wsgi_app)
@@ -75,10 +83,6 @@ LoginManager = LoginManager()
 LoginManager.login_view = "login"
 LoginManager.init_app(App)
 
-# SSE
-LoggingSource = ""
-LoggingLock = Lock()
-
 # 路由注册
 App.register_blueprint(apiv1_bp, url_prefix="/api/v1")
 
@@ -141,6 +145,7 @@ def login():
         Config().current_user = current_user.username
         # 让当前用户生效
         MediaServer().init_config()
+        Dashboard().clear()
         # 跳转页面
         if GoPage and GoPage != 'web':
             return redirect('/web#' + GoPage)
@@ -247,28 +252,30 @@ def web():
 def index():
     # 媒体服务器类型
     MSType = Config().get_config('media').get('media_server')
+    # 并发获取各面板数据，优先使用缓存
+    Panels, PanelsStale = Dashboard().get_panels()
     # 获取媒体数量
-    MediaCounts = WebAction().get_library_mediacount()
+    MediaCounts = Panels.get("mediacount")
     if MediaCounts.get("code") == 0:
         ServerSucess = True
     else:
         ServerSucess = False
 
     # 获得活动日志
-    Activity = WebAction().get_library_playhistory().get("result")
+    Activity = Panels.get("playhistory")
 
     # 磁盘空间
-    LibrarySpaces = WebAction().get_library_spacesize()
+    LibrarySpaces = Panels.get("spacesize")
 
     # 媒体库
-    Librarys = MediaServer().get_libraries()
+    Librarys = Panels.get("libraries")
     LibrarySyncConf = SystemConfig().get(SystemConfigKey.SyncLibrary) or []
 
     # 继续观看
-    Resumes = MediaServer().get_resume()
+    Resumes = Panels.get("resume")
 
     # 最近添加
-    Latests = MediaServer().get_latest()
+    Latests = Panels.get("latest")
 
     return render_template("index.html",
                            ServerSucess=ServerSucess,
@@ -286,7 +293,8 @@ def index():
                            Librarys=Librarys,
                            LibrarySyncConf=LibrarySyncConf,
                            Resumes=Resumes,
-                           Latests=Latests
+                           Latests=Latests,
+                           PanelsStale=PanelsStale
                            )
 
 
@@ -787,8 +795,13 @@ def tmdbcache():
     total_page = floor(total_count / page_num) + 1
     page_range = WebUtils.get_page_range(current_page=current_page,
                                          total_page=total_page)
+    request_cache_stats = Media().get_tmdb_request_cache_stats()
+    if request_cache_stats:
+        request_cache_stats["size"] = StringUtils.str_filesize(request_cache_stats.get("size"))
+        request_cache_stats["max_size"] = StringUtils.str_filesize(request_cache_stats.get("max_size"))
 
     return render_template("rename/tmdbcache.html",
+                           RequestCacheStats=request_cache_stats,
                            TotalCount=total_count,
                            Count=len(tmdb_caches),
                            TmdbCaches=tmdb_caches,
@@ -967,7 +980,8 @@ def notification():
                            Channels=Channels,
                            Switchs=Switchs,
                            ClientCount=len(MessageClients),
-                           MessageClients=MessageClients)
+                           MessageClients=MessageClients,
+                           QueueStatus=Message().get_queue_status())
 
 
 # 用户管理页面
@@ -1687,24 +1701,18 @@ def stream_logging():
 
     def __logging(_source=""):
         """
-        实时日志
+        实时日志，每个连接按序号增量读取，没有新日志时阻塞等待，超时后发送空数据保持连接
         """
-        global LoggingSource
-
+        seq = 0
+        last_send = 0
         while True:
-            with LoggingLock:
-                if _source != LoggingSource:
-                    LoggingSource = _source
-                    log.LOG_INDEX = len(log.LOG_QUEUE)
-                if log.LOG_INDEX > 0:
-                    logs = list(log.LOG_QUEUE)[-log.LOG_INDEX:]
-                    log.LOG_INDEX = 0
-                    if _source:
-                        logs = [lg for lg in logs if lg.get("source") == _source]
-                else:
-                    logs = []
-                time.sleep(1)
-                yield 'data: %s\n\n' % json.dumps(logs)
+            seq, logs = log.wait_logs(seq, timeout=_STREAM_KEEPALIVE)
+            if _source:
+                logs = [lg for lg in logs if lg.get("source") == _source]
+            if not logs and time.time() - last_send < _STREAM_KEEPALIVE:
+                continue
+            yield 'data: %s\n\n' % json.dumps(logs)
+            last_send = time.time()
 
     return Response(
         __logging(request.args.get("source") or ""),
@@ -1716,18 +1724,24 @@ def stream_logging():
 @login_required
 def stream_progress():
     """
-    实时日志EventSources响应
+    实时进度EventSources响应
     """
 
     def __progress(_type):
         """
-        实时日志
+        实时进度，进度变化时推送，推送间隔不小于_STREAM_PROGRESS_INTERVAL，超时后重发当前进度保持连接
         """
         WA = WebAction()
+        version = None
         while True:
-            time.sleep(0.2)
+            start = time.time()
+            version = ProgressHelper().wait(_type, version, timeout=_STREAM_KEEPALIVE)
             detail = WA.refresh_process({"type": _type})
             yield 'data: %s\n\n' % json.dumps(detail)
+            # 进度频繁变化时合并推送
+            elapsed = time.time() - start
+            if elapsed < _STREAM_PROGRESS_INTERVAL:
+                time.sleep(_STREAM_PROGRESS_INTERVAL - elapsed)
 
     return Response(
         __progress(request.args.get("type")),
@@ -1783,6 +1797,25 @@ def message_handler(ws):
             })))
 
 
+@Sock.route('/downloading')
+@login_required
+def downloading_handler(ws):
+    """
+    正在下载任务WebSocket，推送下载器中种子的变化
+    """
+    watcher = DownloadingWatcher()
+    subscriber = watcher.subscribe()
+    try:
+        while ws.connected:
+            message = subscriber.get(timeout=10)
+            if message:
+                ws.send(json.dumps(message))
+    except ConnectionClosed:
+        pass
+    finally:
+        watcher.unsubscribe(subscriber)
+
+
 # base64模板过滤器
 @App.template_filter('b64encode')
 def b64encode(s):
@@ -26,6 +26,8 @@ let LoggingSource = "";
 let LoggingES;
 // 消息WebSocket
 let MessageWS;
+// 正在下载WebSocket
+let DownloadingWS;
 // 当前协议
 let WSProtocol = "ws://";
 if (window.location.protocol === "https:") {
@@ -53,6 +55,8 @@ function navmenu(page, newflag = false) {
   document.querySelector("#navbar-menu").update_active(page);
   // 解除滚动事件
   $(window).unbind('scroll');
+  // 停止正在下载推送
+  stop_downloading();
   // 显示进度条
   NProgress.start();
   // 停止上一次加载
@@ -135,6 +139,15 @@ function stop_logging() {
   }
 }
 
+// 停止正在下载推送
+function stop_downloading() {
+  if (DownloadingWS) {
+    DownloadingWS.onerror = undefined;
+    DownloadingWS.close();
+    DownloadingWS = undefined;
+  }
+}
+
 // 连接日志服务
 function start_logging() {
   stop_logging();